@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# Distribución concurrente de claves SSH a los nodos managed v1.3.0
+# Usa la misma lista de hosts que el inventario dinámico
+
+import argparse
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from inventory_discovery import discover_hosts
+from inventory_probe import check_host_connectivity
+
+REMOTE_USER = "ansible"
+KEY_FILE = os.environ.get("SSH_DIST_KEY_FILE", "/home/ansible/.ssh/id_rsa")
+TEMP_PASSWORD = os.environ.get("SSH_DIST_PASSWORD", "ansible123")
+MAX_WORKERS = int(os.environ.get("SSH_DIST_WORKERS", "8"))
+MAX_RETRIES = int(os.environ.get("SSH_DIST_MAX_RETRIES", "5"))
+RETRY_DELAY = float(os.environ.get("SSH_DIST_RETRY_DELAY", "5"))
+COMMAND_TIMEOUT = 30
+
+SSH_OPTIONS = [
+    "-o", "StrictHostKeyChecking=no",
+    "-o", "UserKnownHostsFile=/dev/null",
+    "-o", "ConnectTimeout=10",
+]
+
+_print_lock = threading.Lock()
+
+
+def log(message):
+    with _print_lock:
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] SSH-DIST: {message}", flush=True)
+
+
+def backoff_delay(attempt, base=RETRY_DELAY):
+    """Exponential backoff with jitter, capped at 4x the base delay"""
+    delay = min(base * 4, base * 2 ** attempt)
+    return random.uniform(delay / 2, delay)
+
+
+def run(command):
+    try:
+        return subprocess.run(
+            command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            timeout=COMMAND_TIMEOUT, check=False
+        ).returncode
+    except subprocess.TimeoutExpired:
+        return 124
+    except FileNotFoundError:
+        return 127
+
+
+def key_works(node, key_file=KEY_FILE):
+    """True if the key already logs in without a password"""
+    return run(["ssh", *SSH_OPTIONS, "-o", "BatchMode=yes", "-i", key_file,
+                f"{REMOTE_USER}@{node}", "true"]) == 0
+
+
+def copy_key(node, key_file=KEY_FILE):
+    return run(["sshpass", "-p", TEMP_PASSWORD, "ssh-copy-id", *SSH_OPTIONS,
+                "-i", f"{key_file}.pub", f"{REMOTE_USER}@{node}"]) == 0
+
+
+def distribute_key_to_node(node):
+    """Wait for a node, push the key and verify it.
+
+    Returns a dict with the node's status ("present", "distributed" or
+    "failed") and timings in seconds.
+    """
+    start = time.monotonic()
+    result = {"node": node, "status": "failed", "wait": 0.0, "total": 0.0}
+
+    # 1. Esperar a que el nodo esté disponible
+    for attempt in range(MAX_RETRIES):
+        if check_host_connectivity(node):
+            break
+        delay = backoff_delay(attempt)
+        log(f"⏳ Esperando a que {node} esté disponible ({attempt + 1}/{MAX_RETRIES}, {delay:.1f}s)...")
+        time.sleep(delay)
+    else:
+        log(f"❌ {node} no está disponible después de {MAX_RETRIES} intentos")
+        result["wait"] = result["total"] = time.monotonic() - start
+        return result
+    result["wait"] = time.monotonic() - start
+
+    # 2. Omitir nodos que ya tienen la clave
+    if key_works(node):
+        log(f"✅ {node} ya tiene la clave instalada")
+        result["status"] = "present"
+        result["total"] = time.monotonic() - start
+        return result
+
+    # 3. Distribuir la clave con sshpass y verificar
+    for attempt in range(MAX_RETRIES):
+        if copy_key(node):
+            if key_works(node):
+                log(f"✅ Clave distribuida y verificada para {node}")
+                result["status"] = "distributed"
+            else:
+                log(f"⚠️ Advertencia: Clave distribuida pero verificación SSH falló para {node}")
+            break
+        delay = backoff_delay(attempt)
+        log(f"⚠️ Intento {attempt + 1}/{MAX_RETRIES} falló para {node}, reintentando en {delay:.1f}s...")
+        time.sleep(delay)
+    else:
+        log(f"❌ Falló la distribución de la clave a {node} después de {MAX_RETRIES} intentos")
+
+    result["total"] = time.monotonic() - start
+    return result
+
+
+def distribute_keys(nodes, workers=MAX_WORKERS):
+    """Distribute the key to all nodes with a bounded worker pool"""
+    if not nodes:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(nodes)))) as pool:
+        return list(pool.map(distribute_key_to_node, nodes))
+
+
+def print_summary(results, elapsed):
+    log("📊 Resumen de distribución de claves SSH:")
+    for result in results:
+        log(f"   {result['node']:<24} {result['status']:<12} "
+            f"espera {result['wait']:6.1f}s  total {result['total']:6.1f}s")
+    failed = sum(1 for result in results if result["status"] == "failed")
+    log(f"✅ Nodos exitosos: {len(results) - failed}")
+    log(f"❌ Nodos fallidos: {failed}")
+    log(f"📋 Total de nodos: {len(results)} en {elapsed:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distribute the control node SSH key to managed nodes")
+    parser.add_argument("nodes", nargs="*", help="Nodes to process (default: discovered inventory hosts)")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Parallel workers (default: %(default)s)")
+    args = parser.parse_args()
+
+    log("🔐 Iniciando distribución de claves SSH v1.3.0...")
+    nodes = args.nodes or list(discover_hosts())
+
+    start = time.monotonic()
+    results = distribute_keys(nodes, args.workers)
+    print_summary(results, time.monotonic() - start)
+
+    failed = sum(1 for result in results if result["status"] == "failed")
+    if failed:
+        log(f"❌ Finalizado con {failed} nodos fallidos.")
+        sys.exit(1)
+    log("🎉 Distribución de claves SSH completada exitosamente para todos los nodos.")
+
+
+if __name__ == "__main__":
+    main()
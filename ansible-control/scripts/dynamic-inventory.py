@@ -2,58 +2,349 @@
 # Script de inventario dinámico para Ansible v1.3.0
 # Siguiendo las especificaciones del plan de desarrollo
 
+import argparse
 import json
-import socket
+import os
+import subprocess
+import sys
+import time
 
-def check_host_connectivity(hostname, port=22):
-    """Check if host is reachable on SSH port"""
+from inventory_discovery import discover_hosts, read_host_vars
+from inventory_facts import invalidate as invalidate_facts, prewarm as prewarm_facts
+from inventory_generator import MANAGED_NODES_VARS, base_host_vars
+from inventory_probe import PROBE_TIMEOUT, HealthState, probe_hosts
+
+# On-disk cache so back-to-back ansible runs don't reprobe the fleet.
+# Within CACHE_TTL the cache is served as-is; for CACHE_MAX_STALE seconds
+# after that it is still served while a background refresh runs.
+CACHE_FILE = os.environ.get("INVENTORY_CACHE_FILE", "/ansible/inventory/.dynamic-inventory-cache.json")
+CACHE_TTL = float(os.environ.get("INVENTORY_CACHE_TTL", "300"))
+CACHE_MAX_STALE = float(os.environ.get("INVENTORY_CACHE_MAX_STALE", "3600"))
+CACHE_LOCK_TIMEOUT = 60
+# Shorter TTL while some nodes are still starting sshd
+NOT_READY_CACHE_TTL = 15
+
+# Scheduling groups: hosts slower than SLOW_FACTOR x the fleet median
+# latency go to "slow", and hosts are split into batch_N groups of
+# BATCH_SIZE (the forks setting in ansible.cfg) for use with serial
+SLOW_FACTOR = float(os.environ.get("INVENTORY_SLOW_FACTOR", "2"))
+BATCH_SIZE = int(os.environ.get("INVENTORY_BATCH_SIZE", "10"))
+SIZE_UNITS_MB = {"K": 1 / 1024, "M": 1, "G": 1024, "T": 1024 * 1024}
+
+def get_managed_nodes(hosts=None, health=None):
+    """Probe the managed nodes and return {host: ProbeResult} for the
+    reachable ones, in discovery order.
+
+    Each host is probed with a timeout fitted to its RTT history. Hosts
+    in failure backoff are left out without being probed; the ones due
+    for a recheck are handed to a background process instead.
+    """
+    if hosts is None:
+        hosts = discover_hosts()
+    if health is None:
+        health = HealthState()
+
+    inline = [host for host in hosts if not health.is_backing_off(host)]
+    due = [host for host in hosts if health.is_backing_off(host) and health.recheck_due(host)]
+
+    results = probe_hosts(inline, timeout={host: health.timeout_for(host) for host in inline})
+    for host, result in results.items():
+        health.record(host, result)
+    if due:
+        for host in due:
+            health.defer(host, CACHE_LOCK_TIMEOUT)
+        _spawn_background(["--recheck", *due])
+    health.save()
+
+    return {host: results[host] for host in inline if results[host] is not None}
+
+def recheck_hosts(hosts):
+    """Probe backed-off hosts and refresh the cache if any came back.
+
+    A host that was down long enough to back off has probably been
+    recreated, so its cached facts are dropped as well.
+    """
+    health = HealthState()
+    results = probe_hosts(hosts, timeout=PROBE_TIMEOUT)
+    for host, result in results.items():
+        health.record(host, result)
+    health.save()
+    recovered = [host for host, result in results.items() if result is not None and result.ready]
+    if recovered:
+        invalidate_facts(recovered)
+        refresh_cache()
+
+def build_host_vars(node_id, discovered_vars=None, probe=None):
+    """Host-specific variables; node_id follows the discovery order"""
+    host_vars = base_host_vars(node_id)
+    if probe is not None:
+        host_vars["probe_latency_ms"] = round(probe.latency * 1000, 2)
+    host_vars.update(discovered_vars or {})
+    return host_vars
+
+def _median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2
+
+def parse_memory_mb(value):
+    """Parse a memory_limit like "512M" or "2G" into megabytes"""
+    text = str(value).strip().upper().rstrip("B")
+    if not text:
+        return None
+    unit = SIZE_UNITS_MB.get(text[-1])
+    number = text[:-1] if unit else text
     try:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(5)
-        result = sock.connect_ex((hostname, port))
-        sock.close()
-        return result == 0
-    except:
-        return False
-
-def get_managed_nodes():
-    """Get list of managed nodes from Docker network"""
-    nodes = []
-    managed_hosts = ["centos9-node-1", "centos9-node-2"]
-    
-    for host in managed_hosts:
-        if check_host_connectivity(host):
-            nodes.append(host)
-    
-    return nodes
+        return float(number) * (unit or 1)
+    except ValueError:
+        return None
+
+def host_capacity(host_vars):
+    """Capacity of a host from its memory_limit, or max_connections"""
+    if "memory_limit" in host_vars:
+        memory = parse_memory_mb(host_vars["memory_limit"])
+        if memory is not None:
+            return memory
+    try:
+        return float(host_vars["max_connections"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def build_scheduling_groups(latencies, capacities, batch_size=BATCH_SIZE):
+    """Group ready hosts by latency tier, capacity and fork-sized batch.
+
+    latencies maps host -> latency in seconds and capacities maps host ->
+    capacity (or None when unknown). Batches are filled fastest tier
+    first, larger hosts first within a tier, so a batch doesn't wait on
+    a straggler from another tier.
+    """
+    groups = {}
+    if not latencies:
+        return groups
+
+    threshold = _median(latencies.values()) * SLOW_FACTOR
+    tiers = {host: "slow" if latency > threshold else "fast" for host, latency in latencies.items()}
+    for tier in ("fast", "slow"):
+        hosts = [host for host in latencies if tiers[host] == tier]
+        if hosts:
+            groups[tier] = {"hosts": hosts}
+
+    known = {host: capacity for host, capacity in capacities.items() if capacity is not None}
+    if known:
+        median_capacity = _median(known.values())
+        high = [host for host in latencies if known.get(host) is not None and known[host] >= median_capacity]
+        low = [host for host in latencies if known.get(host) is not None and known[host] < median_capacity]
+        if high:
+            groups["high_capacity"] = {"hosts": high}
+        if low:
+            groups["low_capacity"] = {"hosts": low}
+
+    ordered = sorted(
+        latencies,
+        key=lambda host: (tiers[host] == "slow", -(known.get(host) or 0), latencies[host])
+    )
+    size = max(1, batch_size)
+    for number, start in enumerate(range(0, len(ordered), size), 1):
+        groups[f"batch_{number}"] = {"hosts": ordered[start:start + size]}
+    return groups
 
 def generate_inventory():
     """Generate Ansible inventory"""
-    managed_nodes = get_managed_nodes()
-    
+    discovered = discover_hosts()
+    node_ids = {host: i for i, host in enumerate(discovered, 1)}
+    probes = get_managed_nodes(discovered)
+    managed_nodes = [host for host, probe in probes.items() if probe.ready]
+    not_ready = [host for host, probe in probes.items() if not probe.ready]
+
     inventory = {
         "managed_nodes": {
             "hosts": managed_nodes,
-            "vars": {
-                "ansible_user": "ansible",
-                "ansible_ssh_private_key_file": "/home/ansible/.ssh/id_rsa",
-                "ansible_ssh_common_args": "-o StrictHostKeyChecking=no"
-            }
+            "vars": dict(MANAGED_NODES_VARS)
         },
         "_meta": {
             "hostvars": {}
         }
     }
-    
+
+    # Nodes whose sshd accepts connections but has not sent its banner
+    # yet; kept out of managed_nodes so playbooks don't spend forks on them
+    if not_ready:
+        inventory["not_ready"] = {"hosts": not_ready}
+
+    # Latency/capacity groups so playbooks can target tiers and use
+    # serial per batch instead of blocking forks on stragglers
+    inventory.update(build_scheduling_groups(
+        {host: probes[host].latency for host in managed_nodes},
+        {host: host_capacity({**read_host_vars(host), **discovered[host]}) for host in managed_nodes}
+    ))
+
     # Add host-specific variables
-    for i, node in enumerate(managed_nodes, 1):
-        inventory["_meta"]["hostvars"][node] = {
-            "node_id": i,
-            "ssh_port": 22,
-            "environment": "lab"
-        }
-    
+    for node, probe in probes.items():
+        inventory["_meta"]["hostvars"][node] = build_host_vars(node_ids[node], discovered[node], probe)
+
     return inventory
 
+def load_cache(path=CACHE_FILE):
+    """Load the cached inventory, or None if missing or unreadable"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or "inventory" not in data or "generated_at" not in data:
+        return None
+    return data
+
+def save_cache(inventory, path=CACHE_FILE, ttl=CACHE_TTL):
+    """Atomically write the inventory cache; failures are not fatal"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"generated_at": time.time(), "ttl": ttl, "inventory": inventory}, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+
+def refresh_cache(path=CACHE_FILE, owns_lock=False):
+    """Regenerate the inventory and store it in the cache.
+
+    owns_lock is only set in the background refresh spawned by
+    _revalidate_in_background, which releases the lock it was handed.
+    """
+    try:
+        inventory = generate_inventory()
+        ttl = min(CACHE_TTL, NOT_READY_CACHE_TTL) if "not_ready" in inventory else CACHE_TTL
+        save_cache(inventory, path, ttl)
+        return inventory
+    finally:
+        if owns_lock:
+            _release_refresh_lock(path)
+
+def _acquire_refresh_lock(path):
+    """Take the background refresh lock, clearing it if it was abandoned"""
+    lock_path = f"{path}.lock"
+    for _ in range(2):
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) < CACHE_LOCK_TIMEOUT:
+                    return False
+                os.unlink(lock_path)
+            except OSError:
+                pass
+        except OSError:
+            return False
+    return False
+
+def _release_refresh_lock(path):
+    try:
+        os.unlink(f"{path}.lock")
+    except OSError:
+        pass
+
+def _spawn_background(args, path=CACHE_FILE):
+    """Run this script detached from the current process"""
+    subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), *args],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+        env={**os.environ, "INVENTORY_CACHE_FILE": path},
+    )
+
+def _revalidate_in_background(path=CACHE_FILE):
+    """Spawn a detached refresh unless one is already running"""
+    if not _acquire_refresh_lock(path):
+        return
+    # The child inherits the lock and releases it when done
+    try:
+        _spawn_background(["--refresh-cache", "--owns-lock"], path)
+    except OSError:
+        _release_refresh_lock(path)
+
+def get_inventory(refresh=False, path=CACHE_FILE, owns_lock=False):
+    """Return the inventory, from the cache when it is fresh enough"""
+    if not refresh:
+        cached = load_cache(path)
+        if cached:
+            age = time.time() - cached["generated_at"]
+            ttl = cached.get("ttl", CACHE_TTL)
+            if age < ttl:
+                return cached["inventory"]
+            if age < ttl + CACHE_MAX_STALE:
+                _revalidate_in_background(path)
+                return cached["inventory"]
+    return refresh_cache(path, owns_lock)
+
+def get_host(hostname, path=CACHE_FILE):
+    """Return the variables of a single host without probing the fleet.
+
+    Looks the host up in the cached hostvars index (whatever its age),
+    falling back to host discovery. Unknown hosts get {}.
+    """
+    cached = load_cache(path)
+    if cached:
+        hostvars = cached["inventory"].get("_meta", {}).get("hostvars", {})
+        if hostname in hostvars:
+            return hostvars[hostname]
+    discovered = discover_hosts()
+    if hostname in discovered:
+        return build_host_vars(list(discovered).index(hostname) + 1, discovered[hostname])
+    return {}
+
+def main():
+    parser = argparse.ArgumentParser(description="Ansible dynamic inventory for the lab")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--list", action="store_true", help="List all groups and hosts (default)")
+    mode.add_argument("--host", help="Show the variables of a single host")
+    parser.add_argument("--refresh-cache", action="store_true",
+                        help="Reprobe all hosts and rewrite the inventory cache")
+    parser.add_argument("--prewarm-facts", action="store_true",
+                        help="Gather facts for ready hosts missing from the fact cache")
+    parser.add_argument("--invalidate-facts", nargs="+", metavar="HOST",
+                        help="Drop the cached facts of the given hosts")
+    parser.add_argument("--recheck", nargs="+", metavar="HOST", help=argparse.SUPPRESS)
+    # Set by _revalidate_in_background: this process holds the refresh lock
+    parser.add_argument("--owns-lock", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.recheck:
+        recheck_hosts(args.recheck)
+        return
+
+    if args.invalidate_facts:
+        print(json.dumps({"invalidated": invalidate_facts(args.invalidate_facts)}, indent=2))
+        return
+
+    if args.prewarm_facts:
+        inventory = get_inventory(refresh=args.refresh_cache)
+        hosts = inventory.get("managed_nodes", {}).get("hosts", [])
+        gathered, returncode = prewarm_facts(hosts, os.path.abspath(__file__))
+        print(json.dumps({"gathered": gathered, "returncode": returncode}, indent=2))
+        if returncode:
+            sys.exit(1)
+        return
+
+    if args.host:
+        if args.refresh_cache:
+            refresh_cache()
+        print(json.dumps(get_host(args.host), indent=2))
+        return
+
+    inventory = get_inventory(refresh=args.refresh_cache, owns_lock=args.owns_lock)
+
+    # Always ship _meta so Ansible never falls back to per-host --host calls
+    inventory.setdefault("_meta", {}).setdefault("hostvars", {})
+    print(json.dumps(inventory, indent=2))
+
 if __name__ == "__main__":
-    print(json.dumps(generate_inventory(), indent=2))
+    main()
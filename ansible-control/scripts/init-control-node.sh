@@ -11,6 +11,11 @@ log() {
     echo "[$(date '+%Y-%m-%d %H:%M:%S')] $1"
 }
 
+# Marcador de "listo para playbooks" que usa el healthcheck; se borra en
+# cada arranque para no heredar el de una ejecución anterior
+READY_MARKER=/run/ansible-control.ready
+rm -f "$READY_MARKER"
+
 # Start SSH service
 log "🔐 Iniciando servicio SSH..."
 /usr/sbin/sshd -D &
@@ -34,8 +39,18 @@ log "📋 Configurando inventario..."
 
 # Distribute SSH keys to managed nodes
 log "🔐 Distribuyendo claves SSH a nodos managed..."
-/usr/local/bin/distribute-ssh-keys.sh || {
+if /usr/local/bin/distribute-ssh-keys.sh; then
+    touch "$READY_MARKER"
+else
     log "⚠️ Advertencia: Distribución de claves SSH falló - se puede realizar manualmente más tarde"
+fi
+
+# Caché persistente de facts (jsonfile, ver ansible.cfg)
+log "🗂️ Preparando caché de facts..."
+mkdir -p /ansible/facts_cache
+chown ansible:ansible /ansible/facts_cache
+su ansible -s /bin/bash -c "cd /ansible && ANSIBLE_CONFIG=/ansible/ansible.cfg /usr/local/bin/dynamic-inventory.py --prewarm-facts" > /dev/null || {
+    log "⚠️ Advertencia: No se pudieron precargar los facts - se recopilarán en la primera ejecución"
 }
 
 # Verificar instalación de Ansible
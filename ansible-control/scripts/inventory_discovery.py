@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# Descubrimiento de nodos managed para el inventario dinámico v1.3.0
+# Fuentes: archivo YAML estático, API de Docker y barrido DNS/CIDR
+
+import http.client
+import ipaddress
+import json
+import os
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+# Try to import yaml, but make it optional
+try:
+    import yaml
+    HAS_YAML = True
+except ImportError:
+    HAS_YAML = False
+
+NODES_FILE = os.environ.get("INVENTORY_NODES_FILE", "/ansible/config/nodes.yml")
+HOST_VARS_DIR = os.environ.get("INVENTORY_HOST_VARS_DIR", "/ansible/host_vars")
+DOCKER_SOCKET = os.environ.get("INVENTORY_DOCKER_SOCKET", "/var/run/docker.sock")
+DOCKER_LABEL = os.environ.get("INVENTORY_DOCKER_LABEL", "ansible.managed=true")
+DOCKER_NETWORK = os.environ.get("INVENTORY_DOCKER_NETWORK", "ansible-network")
+DNS_PATTERN = os.environ.get("INVENTORY_DNS_PATTERN", "")
+DNS_CIDR = os.environ.get("INVENTORY_DNS_CIDR", "")
+# docker is opt-in: the stack does not mount the Docker socket into the
+# control node (it would give the container root on the host)
+DEFAULT_SOURCES = os.environ.get("INVENTORY_SOURCES", "static")
+
+# Used only when every configured source comes back empty
+FALLBACK_HOSTS = ["centos9-node-1", "centos9-node-2"]
+
+MAX_SWEEP_ADDRESSES = 4096
+
+
+class StaticFileSource:
+    """Hosts listed in a YAML file.
+
+    Accepts a plain list of hostnames or an Ansible YAML inventory; every
+    `hosts:` section found in the file contributes its hosts and vars.
+    """
+
+    name = "static"
+
+    def __init__(self, path=NODES_FILE):
+        self.path = path
+
+    def discover(self):
+        if not HAS_YAML:
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = yaml.safe_load(f)
+        except (OSError, yaml.YAMLError):
+            return {}
+        hosts = {}
+        if isinstance(data, list):
+            self._add_hosts(hosts, data)
+        else:
+            self._walk(hosts, data)
+        return hosts
+
+    def _walk(self, hosts, node):
+        if not isinstance(node, dict):
+            return
+        for key, value in node.items():
+            if key == "hosts":
+                self._add_hosts(hosts, value)
+            elif key != "vars":
+                self._walk(hosts, value)
+
+    @staticmethod
+    def _add_hosts(hosts, entries):
+        if isinstance(entries, dict):
+            for host, host_vars in entries.items():
+                hosts.setdefault(str(host), {}).update(host_vars or {})
+        elif isinstance(entries, list):
+            for host in entries:
+                hosts.setdefault(str(host), {})
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection over a unix domain socket"""
+
+    def __init__(self, socket_path, timeout=5):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+class DockerSource:
+    """Running containers reported by the Docker Engine API.
+
+    Containers are selected by label and network. The control node needs
+    the Docker socket mounted (read-only is enough) for this source to
+    return anything; it is not by default, so enable it with
+    INVENTORY_SOURCES=static,docker after adding the mount.
+    """
+
+    name = "docker"
+
+    def __init__(self, socket_path=DOCKER_SOCKET, label=DOCKER_LABEL, network=DOCKER_NETWORK, timeout=5):
+        self.socket_path = socket_path
+        self.label = label
+        self.network = network
+        self.timeout = timeout
+
+    def discover(self):
+        if not os.path.exists(self.socket_path):
+            return {}
+        filters = {}
+        if self.label:
+            filters["label"] = [self.label]
+        if self.network:
+            filters["network"] = [self.network]
+        path = "/containers/json"
+        if filters:
+            path += "?filters=" + quote(json.dumps(filters))
+
+        conn = _UnixHTTPConnection(self.socket_path, self.timeout)
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            body = response.read()
+            if response.status != 200:
+                return {}
+            containers = json.loads(body)
+        except (OSError, http.client.HTTPException, ValueError):
+            return {}
+        finally:
+            conn.close()
+
+        hosts = {}
+        for container in containers:
+            names = container.get("Names") or []
+            if names:
+                hosts.setdefault(names[0].lstrip("/"), {})
+        return hosts
+
+
+class DnsSweepSource:
+    """Hosts found by resolving a name pattern or reverse-resolving a CIDR.
+
+    `pattern` is a format string such as "centos9-node-{}" tried for
+    indexes 1..max_index; `cidr` is a network whose addresses are looked
+    up with reverse DNS (Docker's embedded DNS answers these).
+    """
+
+    name = "dns"
+
+    def __init__(self, pattern=DNS_PATTERN, cidr=DNS_CIDR, max_index=256, workers=64):
+        self.pattern = pattern
+        self.cidr = cidr
+        self.max_index = max_index
+        self.workers = workers
+
+    def discover(self):
+        hosts = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            if self.pattern:
+                candidates = [self.pattern.format(i) for i in range(1, self.max_index + 1)]
+                for host, found in zip(candidates, pool.map(self._resolves, candidates)):
+                    if found:
+                        hosts.setdefault(host, {})
+            if self.cidr:
+                network = ipaddress.ip_network(self.cidr, strict=False)
+                if network.num_addresses > MAX_SWEEP_ADDRESSES:
+                    raise ValueError(f"CIDR {self.cidr} is too large to sweep (max {MAX_SWEEP_ADDRESSES} addresses)")
+                for name in pool.map(self._reverse, (str(ip) for ip in network.hosts())):
+                    if name:
+                        hosts.setdefault(name, {})
+        return hosts
+
+    @staticmethod
+    def _resolves(hostname):
+        try:
+            socket.getaddrinfo(hostname, None)
+            return True
+        except OSError:
+            return False
+
+    @staticmethod
+    def _reverse(address):
+        try:
+            name = socket.gethostbyaddr(address)[0]
+        except OSError:
+            return None
+        # Docker answers with "<container>.<network>"
+        return name.split(".")[0]
+
+
+def read_host_vars(hostname, directory=HOST_VARS_DIR):
+    """Load host_vars/<hostname>.yml, or {} if missing or unreadable"""
+    if not HAS_YAML:
+        return {}
+    try:
+        with open(os.path.join(directory, f"{hostname}.yml"), "r", encoding="utf-8") as f:
+            data = yaml.safe_load(f)
+    except (OSError, yaml.YAMLError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+SOURCES = {
+    StaticFileSource.name: StaticFileSource,
+    DockerSource.name: DockerSource,
+    DnsSweepSource.name: DnsSweepSource,
+}
+
+
+def build_sources(names=DEFAULT_SOURCES):
+    """Instantiate the sources named in a comma separated list"""
+    sources = []
+    for name in (n.strip() for n in names.split(",")):
+        if not name:
+            continue
+        if name not in SOURCES:
+            raise ValueError(f"Unknown discovery source: {name}")
+        sources.append(SOURCES[name]())
+    return sources
+
+
+def discover_hosts(sources=None):
+    """Merge the hosts of all sources into one ordered {host: vars} dict.
+
+    Hosts keep the order in which they were first seen; when two sources
+    set the same variable the earlier source wins.
+    """
+    if sources is None:
+        sources = build_sources()
+    merged = {}
+    for source in sources:
+        for host, host_vars in source.discover().items():
+            entry = merged.setdefault(host, {})
+            for key, value in host_vars.items():
+                entry.setdefault(key, value)
+    if not merged:
+        merged = {host: {} for host in FALLBACK_HOSTS}
+    return merged
+
+
+if __name__ == "__main__":
+    print(json.dumps(discover_hosts(), indent=2))
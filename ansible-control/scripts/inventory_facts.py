@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# Caché persistente de facts (jsonfile) para el nodo de control v1.3.0
+# Precalentamiento e invalidación por host desde el inventario dinámico
+
+import os
+import subprocess
+import time
+
+# Same settings (and environment variables) as the jsonfile cache plugin
+# configured in ansible.cfg
+FACT_CACHE_DIR = os.environ.get("ANSIBLE_CACHE_PLUGIN_CONNECTION", "/ansible/facts_cache")
+FACT_CACHE_TIMEOUT = int(os.environ.get("ANSIBLE_CACHE_PLUGIN_TIMEOUT", "86400"))
+FACT_CACHE_PREFIX = os.environ.get("ANSIBLE_CACHE_PLUGIN_PREFIX", "")
+PREWARM_TIMEOUT = 600
+
+
+def fact_file(hostname, cache_dir=FACT_CACHE_DIR):
+    return os.path.join(cache_dir, f"{FACT_CACHE_PREFIX}{hostname}")
+
+
+def has_fresh_facts(hostname, cache_dir=FACT_CACHE_DIR, timeout=FACT_CACHE_TIMEOUT):
+    """True if the host has cached facts younger than the cache timeout"""
+    try:
+        age = time.time() - os.path.getmtime(fact_file(hostname, cache_dir))
+    except OSError:
+        return False
+    return timeout == 0 or age < timeout
+
+
+def invalidate(hosts, cache_dir=FACT_CACHE_DIR):
+    """Drop the cached facts of the given hosts; returns the ones removed"""
+    removed = []
+    for hostname in hosts:
+        try:
+            os.unlink(fact_file(hostname, cache_dir))
+            removed.append(hostname)
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def prewarm(hosts, inventory, cache_dir=FACT_CACHE_DIR):
+    """Gather facts for the hosts whose cache is missing or expired.
+
+    Runs one ad-hoc `ansible -m setup` for all of them, which stores the
+    facts through the jsonfile cache plugin. Returns (hosts gathered,
+    return code), with return code None when nothing needed gathering.
+    """
+    stale = [hostname for hostname in hosts if not has_fresh_facts(hostname, cache_dir)]
+    if not stale:
+        return [], None
+    os.makedirs(cache_dir, exist_ok=True)
+    env = {
+        **os.environ,
+        "ANSIBLE_CACHE_PLUGIN": "jsonfile",
+        "ANSIBLE_CACHE_PLUGIN_CONNECTION": cache_dir,
+    }
+    try:
+        result = subprocess.run(
+            ["ansible", ",".join(stale), "-i", inventory, "-m", "ansible.builtin.setup"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            env=env,
+            timeout=PREWARM_TIMEOUT,
+            check=False,
+        )
+        return stale, result.returncode
+    except subprocess.TimeoutExpired:
+        return stale, 124
+    except FileNotFoundError:
+        return stale, 127
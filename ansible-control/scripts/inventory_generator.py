@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# Generador del inventario estático de Ansible v1.3.0
+# Construye hosts.yml, group_vars y host_vars a partir de un único modelo
+
+import argparse
+import hashlib
+import os
+import sys
+from datetime import datetime
+
+from inventory_discovery import HAS_YAML, NODES_FILE, StaticFileSource, build_sources, discover_hosts
+
+if HAS_YAML:
+    import yaml
+
+ANSIBLE_ROOT = os.environ.get("INVENTORY_ROOT", "/ansible")
+HEADER = "# Generado por inventory_generator.py - no editar a mano\n"
+
+# Variables del grupo managed_nodes (compartidas con dynamic-inventory.py)
+MANAGED_NODES_VARS = {
+    "ansible_user": "ansible",
+    "ansible_ssh_private_key_file": "/home/ansible/.ssh/id_rsa",
+    "ansible_ssh_common_args": "-o StrictHostKeyChecking=no",
+    "ansible_become": True,
+    "ansible_become_method": "sudo",
+    "ansible_become_user": "root",
+}
+
+GROUP_VARS = {
+    "all": {
+        # Configuración SSH
+        "ansible_user": "ansible",
+        "ansible_ssh_private_key_file": "~/.ssh/id_rsa",
+        "ansible_ssh_common_args": "-o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null",
+        # Configuración de privilegios
+        "ansible_become": True,
+        "ansible_become_method": "sudo",
+        "ansible_become_user": "root",
+        # Variables del laboratorio
+        "lab_environment": "development",
+        "lab_network": "ansible_lab_network",
+        "lab_timezone": "UTC",
+        "base_packages": ["vim", "curl", "wget", "git", "htop", "net-tools"],
+        "firewall_enabled": False,
+        "selinux_state": "disabled",
+    },
+    "webservers": {
+        "http_port": 80,
+        "https_port": 443,
+        "web_packages": ["httpd", "mod_ssl"],
+        "web_services": ["httpd"],
+        "web_root": "/var/www/html",
+        "web_user": "apache",
+        "web_group": "apache",
+    },
+    "databases": {
+        "db_port": 3306,
+        "db_root_password": "{{ vault_db_root_password | default('changeme') }}",
+        "db_packages": ["mariadb-server", "mariadb"],
+        "db_services": ["mariadb"],
+        "db_data_dir": "/var/lib/mysql",
+        "db_user": "mysql",
+        "db_group": "mysql",
+    },
+}
+
+
+def log(message):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] INVENTORY: {message}")
+
+
+def base_host_vars(node_id):
+    """Inventory variables every managed node gets; node_id follows the
+    discovery order"""
+    return {
+        "node_id": node_id,
+        "ssh_port": 22,
+        "environment": "lab"
+    }
+
+
+def read_reserved_host_vars(path=NODES_FILE):
+    """host_vars for hosts listed under `host_vars:` in the nodes file"""
+    if not HAS_YAML:
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = yaml.safe_load(f)
+    except (OSError, yaml.YAMLError):
+        return {}
+    if not isinstance(data, dict) or not isinstance(data.get("host_vars"), dict):
+        return {}
+    return {str(host): host_vars or {} for host, host_vars in data["host_vars"].items()}
+
+
+class InventoryTree:
+    """Everything under the inventory root, built from one data model"""
+
+    def __init__(self, hosts, group_vars=None, reserved_host_vars=None):
+        # hosts: ordered {hostname: host_vars} as returned by discovery
+        self.hosts = hosts
+        self.group_vars = GROUP_VARS if group_vars is None else group_vars
+        self.reserved_host_vars = reserved_host_vars or {}
+
+    @classmethod
+    def from_discovery(cls, nodes_file=NODES_FILE):
+        """Build the tree from the configured discovery sources, reading
+        the static source from nodes_file"""
+        sources = [StaticFileSource(nodes_file)]
+        sources += [source for source in build_sources() if source.name != StaticFileSource.name]
+        return cls(discover_hosts(sources), reserved_host_vars=read_reserved_host_vars(nodes_file))
+
+    def hosts_document(self):
+        hosts = {}
+        for node_id, hostname in enumerate(self.hosts, 1):
+            hosts[hostname] = {"ansible_host": hostname, **base_host_vars(node_id)}
+        return {
+            "all": {
+                "children": {
+                    "managed_nodes": {
+                        "hosts": hosts,
+                        "vars": dict(MANAGED_NODES_VARS),
+                    }
+                }
+            }
+        }
+
+    def documents(self):
+        """Map of path relative to the root -> YAML document"""
+        documents = {os.path.join("inventory", "hosts.yml"): self.hosts_document()}
+        for group, group_vars in self.group_vars.items():
+            documents[os.path.join("group_vars", f"{group}.yml")] = group_vars
+        host_vars = dict(self.reserved_host_vars)
+        host_vars.update((host, vars_) for host, vars_ in self.hosts.items() if vars_)
+        for hostname, vars_ in host_vars.items():
+            documents[os.path.join("host_vars", f"{hostname}.yml")] = vars_
+        return documents
+
+    def render(self):
+        """Map of path relative to the root -> file content"""
+        return {
+            path: HEADER + "---\n" + yaml.safe_dump(document, sort_keys=False, allow_unicode=True)
+            for path, document in self.documents().items()
+        }
+
+
+def validate(rendered):
+    """Parse the rendered files back and check the inventory structure.
+
+    Returns a list of error messages (empty when the tree is valid).
+    """
+    errors = []
+    parsed = {}
+    for path, content in rendered.items():
+        try:
+            parsed[path] = yaml.safe_load(content)
+        except yaml.YAMLError as e:
+            errors.append(f"{path}: invalid YAML - {e}")
+            continue
+        if not isinstance(parsed[path], dict):
+            errors.append(f"{path}: expected a mapping")
+
+    hosts_path = os.path.join("inventory", "hosts.yml")
+    inventory = parsed.get(hosts_path)
+    if not isinstance(inventory, dict) or set(inventory) != {"all"}:
+        errors.append(f"{hosts_path}: expected a single top-level 'all' group")
+        return errors
+    for group, body in (inventory["all"].get("children") or {}).items():
+        if not isinstance(body, dict):
+            errors.append(f"{hosts_path}: group '{group}' must be a mapping")
+            continue
+        for key in ("hosts", "vars"):
+            if body.get(key) is not None and not isinstance(body[key], dict):
+                errors.append(f"{hosts_path}: '{group}.{key}' must be a mapping")
+        for host, host_vars in (body.get("hosts") or {}).items():
+            if host_vars is not None and not isinstance(host_vars, dict):
+                errors.append(f"{hosts_path}: vars of host '{host}' must be a mapping")
+    return errors
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def write_atomic(path, content):
+    """Write content to path unless it already has the same hash.
+
+    Returns True when the file was (re)written.
+    """
+    data = content.encode("utf-8")
+    try:
+        with open(path, "rb") as f:
+            if _sha256(f.read()) == _sha256(data):
+                return False
+    except OSError:
+        pass
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, path)
+    return True
+
+
+def generate(root=ANSIBLE_ROOT, tree=None, check=False):
+    """Render, validate and write the inventory tree under root.
+
+    Returns (written, unchanged, errors). Nothing is written when the
+    tree does not validate or when check is True.
+    """
+    tree = tree or InventoryTree.from_discovery()
+    rendered = tree.render()
+    errors = validate(rendered)
+    if errors or check:
+        return [], [], errors
+    written, unchanged = [], []
+    for relative_path, content in rendered.items():
+        path = os.path.join(root, relative_path)
+        (written if write_atomic(path, content) else unchanged).append(path)
+    return written, unchanged, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the Ansible inventory tree")
+    parser.add_argument("--root", default=ANSIBLE_ROOT, help="Ansible root directory (default: %(default)s)")
+    parser.add_argument("--nodes-file", default=NODES_FILE, help="Static nodes file (default: %(default)s)")
+    parser.add_argument("--check", action="store_true", help="Validate only, do not write files")
+    args = parser.parse_args()
+
+    if not HAS_YAML:
+        log("❌ PyYAML no está disponible")
+        sys.exit(1)
+
+    log("📋 Generando inventario de Ansible v1.3.0...")
+    tree = InventoryTree.from_discovery(args.nodes_file)
+    written, unchanged, errors = generate(args.root, tree, args.check)
+    if errors:
+        for error in errors:
+            log(f"❌ {error}")
+        sys.exit(1)
+
+    log(f"✅ Inventario válido ({len(tree.hosts)} hosts)")
+    if not args.check:
+        for path in written:
+            log(f"📝 Actualizado: {path}")
+        log(f"📁 {len(written)} archivos escritos, {len(unchanged)} sin cambios")
+
+
+if __name__ == "__main__":
+    main()
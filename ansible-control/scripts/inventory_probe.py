@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# Sondeo concurrente de SSH para el inventario dinámico v1.3.0
+# Incluye el estado de salud por host persistido entre ejecuciones
+
+import asyncio
+import json
+import math
+import os
+import time
+from collections import namedtuple
+
+# Probe tuning (overridable from the environment, since Ansible calls the
+# inventory script with no extra arguments)
+PROBE_TIMEOUT = float(os.environ.get("INVENTORY_PROBE_TIMEOUT", "5"))
+PROBE_CONCURRENCY = int(os.environ.get("INVENTORY_PROBE_CONCURRENCY", "128"))
+
+# "tcp" only checks that port 22 accepts connections; "banner" also waits
+# for sshd to send its SSH-2.0 identification line
+PROBE_MODE = os.environ.get("INVENTORY_PROBE_MODE", "tcp")
+
+# Adaptive timeouts: p99 of the recent RTTs times TIMEOUT_FACTOR, clamped
+# to [MIN_TIMEOUT, PROBE_TIMEOUT]
+HEALTH_FILE = os.environ.get("INVENTORY_HEALTH_FILE", "/ansible/inventory/.probe-health.json")
+TIMEOUT_FACTOR = float(os.environ.get("INVENTORY_TIMEOUT_FACTOR", "3"))
+MIN_TIMEOUT = 0.5
+RTT_HISTORY = 20
+
+# Failure backoff: after BACKOFF_AFTER consecutive failures a host is no
+# longer probed inline; it is rechecked in the background every
+# BACKOFF_BASE * 2**n seconds, up to BACKOFF_MAX
+BACKOFF_AFTER = 2
+BACKOFF_BASE = float(os.environ.get("INVENTORY_BACKOFF_BASE", "30"))
+BACKOFF_MAX = float(os.environ.get("INVENTORY_BACKOFF_MAX", "3600"))
+
+
+# latency: seconds until the host was usable (banner received in banner
+# mode, connection accepted in tcp mode). ready is False for hosts that
+# accepted the connection but sent no SSH banner in time.
+ProbeResult = namedtuple("ProbeResult", ["latency", "ready"])
+
+
+async def _probe_host(hostname, port, timeout, banner, semaphore):
+    """Probe a single host; the whole exchange is bounded by timeout"""
+    async with semaphore:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(hostname, port), timeout
+            )
+        except (OSError, asyncio.TimeoutError):
+            return hostname, None
+        connect_time = loop.time() - start
+        try:
+            if not banner:
+                return hostname, ProbeResult(connect_time, True)
+            remaining = max(0.0, timeout - connect_time)
+            try:
+                line = await asyncio.wait_for(reader.readline(), remaining)
+            except (OSError, asyncio.TimeoutError):
+                line = b""
+            if line.startswith(b"SSH-2.0-"):
+                return hostname, ProbeResult(loop.time() - start, True)
+            return hostname, ProbeResult(connect_time, False)
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+
+async def _probe_all(hosts, port, timeouts, banner, concurrency):
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    return await asyncio.gather(
+        *(_probe_host(host, port, timeouts[host], banner, semaphore) for host in hosts)
+    )
+
+
+def probe_hosts(hosts, port=22, timeout=PROBE_TIMEOUT, concurrency=PROBE_CONCURRENCY, mode=PROBE_MODE):
+    """Check SSH reachability of all hosts concurrently.
+
+    `timeout` is either one value for every host or a {hostname: timeout}
+    dict. At most `concurrency` probes are in flight at once, so as long
+    as the cap is not lower than the number of hosts the whole sweep
+    takes about one timeout. Returns {hostname: ProbeResult}, with None
+    for hosts that did not accept a connection.
+    """
+    if mode not in ("tcp", "banner"):
+        raise ValueError(f"Unknown probe mode: {mode}")
+    hosts = list(hosts)
+    if not hosts:
+        return {}
+    if isinstance(timeout, dict):
+        timeouts = {host: timeout.get(host, PROBE_TIMEOUT) for host in hosts}
+    else:
+        timeouts = dict.fromkeys(hosts, timeout)
+    return dict(asyncio.run(_probe_all(hosts, port, timeouts, mode == "banner", concurrency)))
+
+
+def check_host_connectivity(hostname, port=22, timeout=PROBE_TIMEOUT):
+    """Check if host is reachable on SSH port"""
+    result = probe_hosts([hostname], port, timeout)[hostname]
+    return result is not None and result.ready
+
+
+class HealthState:
+    """Per-host RTT history and failure backoff, stored as JSON"""
+
+    def __init__(self, path=HEALTH_FILE):
+        self.path = path
+        self.hosts = self._read()
+        self._dirty = set()
+
+    def _read(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _entry(self, hostname):
+        return self.hosts.setdefault(hostname, {"rtts": [], "failures": 0, "next_check": 0})
+
+    def timeout_for(self, hostname):
+        """Probe timeout derived from the host's RTT history"""
+        entry = self.hosts.get(hostname)
+        if not entry or entry["failures"] or not entry["rtts"]:
+            return PROBE_TIMEOUT
+        rtts = sorted(entry["rtts"])
+        p99 = rtts[max(0, math.ceil(0.99 * len(rtts)) - 1)]
+        return min(PROBE_TIMEOUT, max(MIN_TIMEOUT, p99 * TIMEOUT_FACTOR))
+
+    def is_backing_off(self, hostname):
+        """True once a host has failed often enough to skip inline probes"""
+        entry = self.hosts.get(hostname)
+        return bool(entry) and entry["failures"] >= BACKOFF_AFTER
+
+    def recheck_due(self, hostname, now=None):
+        entry = self.hosts.get(hostname)
+        return bool(entry) and (now or time.time()) >= entry["next_check"]
+
+    def defer(self, hostname, seconds):
+        """Push the next recheck out, e.g. while one is in flight"""
+        self._entry(hostname)["next_check"] = time.time() + seconds
+        self._dirty.add(hostname)
+
+    def record(self, hostname, result):
+        """Record a probe result (None means the probe failed).
+
+        Hosts that answered without being ready are left untouched: they
+        are neither failing nor a useful latency sample.
+        """
+        if result is not None and not result.ready:
+            return
+        entry = self._entry(hostname)
+        if result is None:
+            entry["failures"] += 1
+            delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (entry["failures"] - 1))
+            entry["next_check"] = time.time() + delay
+        else:
+            entry["failures"] = 0
+            entry["next_check"] = 0
+            entry["rtts"] = (entry["rtts"] + [round(result.latency, 6)])[-RTT_HISTORY:]
+        self._dirty.add(hostname)
+
+    def save(self):
+        """Merge the hosts touched by this process into the file on disk.
+
+        The background rechecker writes the same file, so only our own
+        entries are replaced.
+        """
+        if not self._dirty:
+            return
+        merged = self._read()
+        for hostname in self._dirty:
+            merged[hostname] = self.hosts[hostname]
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(merged, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+        self._dirty.clear()
@@ -10,9 +10,14 @@ import subprocess
 import sys
 import os
 import argparse
-from typing import List, Optional, Tuple
+from typing import List, Optional
 
-from utils import Colors
+from toolchain import Toolchain, probe
+from utils import (CHROME_TRACE_FILE, SPANS_FILE, TRACE_DIR_ENV, Colors, load_spans, phase_breakdown, span,
+                   tracer, write_chrome_trace)
+
+# Timing trace of the last run (spans.jsonl + Chrome trace)
+DEFAULT_TRACE_DIR = os.environ.get(TRACE_DIR_ENV, ".automation-trace")
 
 class AutomationRunner:
     """Main automation runner"""
@@ -21,21 +26,15 @@ class AutomationRunner:
         self.scripts = {
             'test': 'test_functional_ci.py',
             'validate': 'pre_commit_check.py', 
-            'commit': 'version_control.py'
+            'commit': 'version_control.py',
+            'bench': 'benchmark.py'
         }
+        self.toolchain: Optional[Toolchain] = None
     
     def print_status(self, message: str, color: str = Colors.YELLOW):
         """Print a colored status message"""
         print(f"{color}{message}{Colors.NC}")
 
-    def _check_command_exists(self, command: str) -> Tuple[bool, str]:
-        """Check if a command exists and return its version."""
-        try:
-            result = subprocess.run([command, "--version"], capture_output=True, text=True, check=True)
-            return True, result.stdout.strip()
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            return False, ""
-
     def check_dependencies(self) -> bool:
         """Check if required dependencies are available"""
         self.print_status("🔍 Checking dependencies...", Colors.BLUE)
@@ -45,20 +44,19 @@ class AutomationRunner:
             return False
         self.print_status(f"✅ Python {sys.version.split()[0]} detected", Colors.GREEN)
 
-        deps_to_check = ["git", "docker"]
+        # Cached per PATH and binary mtimes; passed on to the scripts run
+        self.toolchain = probe()
         all_deps_ok = True
-        for dep in deps_to_check:
-            exists, version = self._check_command_exists(dep)
-            if exists:
-                self.print_status(f"✅ {version} detected", Colors.GREEN)
+        for dep, version in self.toolchain.versions.items():
+            if version is not None:
+                self.print_status(f"✅ {version or dep} detected", Colors.GREEN)
             else:
                 self.print_status(f"❌ {dep.capitalize()} not available", Colors.RED)
                 all_deps_ok = False
 
-        try:
-            import yaml
+        if self.toolchain.has_yaml:
             self.print_status("✅ PyYAML available for advanced validation", Colors.GREEN)
-        except ImportError:
+        else:
             self.print_status("⚠️ PyYAML not available - some validations will be skipped", Colors.YELLOW)
             self.print_status("  Install with: pip install pyyaml", Colors.CYAN)
 
@@ -80,12 +78,39 @@ class AutomationRunner:
         
         try:
             cmd = [sys.executable, script_file] + args
-            result = subprocess.run(cmd, check=True)
+            with span(script_name, script=script_file):
+                env = {**os.environ, **tracer.child_env()}
+                if self.toolchain:
+                    env.update(self.toolchain.child_env())
+                result = subprocess.run(cmd, check=True, env=env)
             return result.returncode == 0
         except subprocess.CalledProcessError as e:
             self.print_status(f"❌ Error running {script_file}: {e}", Colors.RED)
             return False
 
+    def start_trace(self, trace_dir: str):
+        """Collect the spans of this run (and of the scripts it runs) in trace_dir"""
+        os.makedirs(trace_dir, exist_ok=True)
+        # Only the files this script writes: trace_dir may be any directory
+        for name in (SPANS_FILE, CHROME_TRACE_FILE):
+            try:
+                os.remove(os.path.join(trace_dir, name))
+            except FileNotFoundError:
+                pass
+        tracer.trace_dir = trace_dir
+
+    def print_phase_breakdown(self):
+        """Print where the time went and write the Chrome trace"""
+        records = load_spans(tracer.trace_dir)
+        if not records:
+            return
+        trace_file = os.path.join(tracer.trace_dir, CHROME_TRACE_FILE)
+        write_chrome_trace(records, trace_file)
+        self.print_status("\n⏱️ Phase breakdown:", Colors.BLUE)
+        for line in phase_breakdown(records):
+            print(f"  {line}")
+        self.print_status(f"📈 Chrome trace: {trace_file} (chrome://tracing or ui.perfetto.dev)", Colors.CYAN)
+
 def main():
     """Main function to drive the automation"""
     Colors.init()
@@ -93,6 +118,8 @@ def main():
 
     parser = argparse.ArgumentParser(description="Unified CI/CD Automation Script")
     parser.add_argument("action", choices=runner.scripts.keys(), help="The action to perform")
+    parser.add_argument("--trace-dir", default=DEFAULT_TRACE_DIR,
+                        help="Where to write phase timings (default: %(default)s)")
     parser.add_argument("action_args", nargs=argparse.REMAINDER, help="Arguments for the action script")
 
     args = parser.parse_args()
@@ -100,7 +127,10 @@ def main():
     if not runner.check_dependencies():
         sys.exit(1)
 
-    if not runner.run_script(args.action, args.action_args):
+    runner.start_trace(args.trace_dir)
+    success = runner.run_script(args.action, args.action_args)
+    runner.print_phase_breakdown()
+    if not success:
         sys.exit(1)
 
     runner.print_status(f"✅ Action '{args.action}' completed successfully.", Colors.GREEN)
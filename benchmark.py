@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+==================================
+Environment Benchmark Script
+Bring-up and playbook latency with regression gating
+==================================
+"""
+
+import argparse
+import json
+import math
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from toolchain import probe
+from utils import Colors, run_streaming, span
+
+HISTORY_FILE = os.environ.get("BENCH_HISTORY_FILE", ".bench-history.jsonl")
+# Binaries can be swapped for fakes (e.g. in tests of this script)
+DOCKER_BIN = os.environ.get("BENCH_DOCKER", "docker")
+ANSIBLE_PLAYBOOK_BIN = os.environ.get("BENCH_ANSIBLE_PLAYBOOK", "")
+CONTROL_SERVICE = "ansible-control"
+INVENTORY = "config/managed_nodes.yml"
+PLAYBOOKS = ["setup-base.yml", "setup-webservers.yml"]
+READY_TIMEOUT = 300
+# Number of previous runs whose medians form the regression baseline
+BASELINE_RUNS = 5
+DEFAULT_THRESHOLD = 0.2
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class BenchmarkRunner:
+    """Measure image build, bring-up to first ping.yml and playbook runs"""
+
+    def __init__(self, docker_bin: str = DOCKER_BIN, ansible_playbook_bin: str = ANSIBLE_PLAYBOOK_BIN,
+                 playbooks: Optional[List[str]] = None, ready_timeout: float = READY_TIMEOUT):
+        self.docker_bin = docker_bin
+        # Empty: run playbooks inside the control container via compose exec
+        self.ansible_playbook_bin = ansible_playbook_bin
+        self.playbooks = PLAYBOOKS if playbooks is None else playbooks
+        self.ready_timeout = ready_timeout
+        self.compose_cmd = self._detect_compose()
+        self.samples: Dict[str, List[float]] = {}
+
+    def print_status(self, message: str, color: str = Colors.YELLOW):
+        """Print a colored status message"""
+        print(f"{color}{message}{Colors.NC}")
+
+    def run_command(self, command: List[str], timeout: float = 1800, cwd: Optional[str] = None) -> subprocess.CompletedProcess:
+        """Run a command and return the result"""
+        try:
+            return run_streaming(command, timeout=timeout, cwd=cwd)
+        except (FileNotFoundError, PermissionError) as e:
+            return subprocess.CompletedProcess(command, 127, "", str(e))
+
+    def _detect_compose(self) -> List[str]:
+        if self.docker_bin == "docker":
+            compose = probe().compose
+            return compose.split() if compose else ["docker-compose"]
+        if self.run_command([self.docker_bin, "compose", "version"], timeout=30).returncode == 0:
+            return [self.docker_bin, "compose"]
+        return ["docker-compose"]
+
+    def playbook_command(self, playbook: str) -> List[str]:
+        if self.ansible_playbook_bin:
+            return [self.ansible_playbook_bin, f"playbooks/{playbook}", "-i", INVENTORY]
+        return self.compose_cmd + ["exec", "-T", CONTROL_SERVICE,
+                                   "ansible-playbook", f"playbooks/{playbook}", "-i", INVENTORY]
+
+    @property
+    def playbook_cwd(self) -> Optional[str]:
+        # A local ansible-playbook runs from the control node tree
+        return "ansible-control" if self.ansible_playbook_bin else None
+
+    def run_playbook(self, playbook: str) -> subprocess.CompletedProcess:
+        return self.run_command(self.playbook_command(playbook), cwd=self.playbook_cwd)
+
+    def record(self, metric: str, seconds: float):
+        self.samples.setdefault(metric, []).append(seconds)
+        self.print_status(f"  {metric:<32} {seconds:8.2f}s", Colors.CYAN)
+
+    def measure(self, metric: str, command: List[str], cwd: Optional[str] = None) -> bool:
+        start = time.perf_counter()
+        with span(metric):
+            result = self.run_command(command, cwd=cwd)
+        if result.returncode != 0:
+            self.print_status(f"❌ {metric} failed: {result.stderr.strip()}", Colors.RED)
+            return False
+        self.record(metric, time.perf_counter() - start)
+        return True
+
+    def wait_for_first_ping(self, start: float) -> bool:
+        """Retry ping.yml until it succeeds; the metric runs from compose up"""
+        deadline = start + self.ready_timeout
+        with span("first_ping"):
+            while time.perf_counter() < deadline:
+                if self.run_playbook("ping.yml").returncode == 0:
+                    self.record("up_to_first_ping", time.perf_counter() - start)
+                    return True
+                time.sleep(1)
+        self.print_status(f"❌ ping.yml did not succeed within {self.ready_timeout:.0f}s", Colors.RED)
+        return False
+
+    def run_iteration(self, build: bool = True) -> bool:
+        """One full measurement: build, up to first ping, each playbook"""
+        try:
+            if build and not self.measure("image_build", self.compose_cmd + ["build"]):
+                return False
+            start = time.perf_counter()
+            with span("compose_up"):
+                result = self.run_command(self.compose_cmd + ["up", "-d"])
+            if result.returncode != 0:
+                self.print_status(f"❌ compose up failed: {result.stderr.strip()}", Colors.RED)
+                return False
+            if not self.wait_for_first_ping(start):
+                return False
+            for playbook in self.playbooks:
+                if not self.measure(f"playbook:{playbook}", self.playbook_command(playbook), self.playbook_cwd):
+                    return False
+            return True
+        finally:
+            self.run_command(self.compose_cmd + ["down", "--volumes"])
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {
+            metric: {"median": statistics.median(samples), "p95": percentile(samples, 95), "runs": len(samples)}
+            for metric, samples in self.samples.items()
+        }
+
+
+def git_sha() -> str:
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=False)
+    except FileNotFoundError:
+        return "unknown"
+    return result.stdout.strip() or "unknown"
+
+
+def load_history(path: str = HISTORY_FILE) -> List[Dict]:
+    entries = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return entries
+
+
+def append_history(entry: Dict, path: str = HISTORY_FILE):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+
+
+def find_regressions(summary: Dict[str, Dict[str, float]], history: List[Dict],
+                     threshold: float, baseline_runs: int = BASELINE_RUNS) -> List[str]:
+    """Metrics whose median exceeds the baseline by more than threshold.
+
+    The baseline of a metric is the median of its medians over the last
+    baseline_runs history entries that measured it.
+    """
+    regressions = []
+    for metric, stats in summary.items():
+        previous = [entry["summary"][metric]["median"] for entry in history
+                    if metric in entry.get("summary", {})][-baseline_runs:]
+        if not previous:
+            continue
+        baseline = statistics.median(previous)
+        if baseline > 0 and stats["median"] > baseline * (1 + threshold):
+            regressions.append(f"{metric}: median {stats['median']:.2f}s vs baseline {baseline:.2f}s "
+                               f"({(stats['median'] / baseline - 1) * 100:+.0f}%)")
+    return regressions
+
+
+def print_report(summary: Dict[str, Dict[str, float]]):
+    print("\n" + "=" * 60)
+    print(f"{Colors.BLUE}📊 Benchmark results{Colors.NC}")
+    print("=" * 60)
+    for metric, stats in summary.items():
+        print(f"  {metric:<32} median {stats['median']:8.2f}s  p95 {stats['p95']:8.2f}s  (n={stats['runs']})")
+    print("=" * 60)
+
+
+def main():
+    """Main entry point"""
+    Colors.init()
+    parser = argparse.ArgumentParser(description="Benchmark environment bring-up and playbook latency")
+    parser.add_argument("--iterations", type=int, default=3, help="Measurement runs (default: %(default)s)")
+    parser.add_argument("--no-build", action="store_true", help="Skip the image build measurement")
+    parser.add_argument("--playbooks", default=",".join(PLAYBOOKS),
+                        help="Comma separated playbooks to time (default: %(default)s)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown of a median vs the baseline, as a fraction (default: %(default)s)")
+    parser.add_argument("--history", default=HISTORY_FILE, help="History file (default: %(default)s)")
+    parser.add_argument("--no-record", action="store_true", help="Do not append this run to the history")
+    parser.add_argument("--record-regressions", action="store_true",
+                        help="Append this run to the history even when it regressed (accepts the new baseline)")
+    args = parser.parse_args()
+
+    playbooks = [playbook.strip() for playbook in args.playbooks.split(",") if playbook.strip()]
+    runner = BenchmarkRunner(playbooks=playbooks)
+    for iteration in range(1, max(1, args.iterations) + 1):
+        runner.print_status(f"⏱️ Iteration {iteration}/{args.iterations}", Colors.BLUE)
+        if not runner.run_iteration(build=not args.no_build):
+            runner.print_status("❌ Benchmark iteration failed", Colors.RED)
+            sys.exit(1)
+
+    summary = runner.summary()
+    print_report(summary)
+
+    history = load_history(args.history)
+    regressions = find_regressions(summary, history, args.threshold)
+    # A regressed run stays out of the baseline unless explicitly accepted
+    if not args.no_record and (not regressions or args.record_regressions):
+        append_history({
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_sha": git_sha(),
+            "iterations": args.iterations,
+            "samples": runner.samples,
+            "summary": summary,
+        }, args.history)
+
+    if regressions:
+        print(f"{Colors.RED}❌ Regressions above {args.threshold * 100:.0f}%:{Colors.NC}")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print(f"{Colors.GREEN}✅ No regressions above {args.threshold * 100:.0f}%{Colors.NC}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+==================================
+Warm Container Pool
+Reuse pre-booted test containers between functional test runs
+==================================
+"""
+
+import json
+import os
+import tempfile
+import time
+import uuid
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    import msvcrt
+    fcntl = None
+
+from docker_api import Docker
+
+POOL_LABEL = "ansible-lab.pool"
+POOL_NAME = "functional"
+STATE_FILE = os.environ.get(
+    "FUNCTIONAL_POOL_STATE", os.path.join(tempfile.gettempdir(), "ansible-lab-functional-pool.json")
+)
+# A pool slot (a container and its replacements) is dropped after this
+# many test runs, so the snapshot it starts from is refreshed now and then
+MAX_USES = int(os.environ.get("FUNCTIONAL_POOL_MAX_USES", "20"))
+LOCK_TIMEOUT = 60
+
+
+class PoolLockTimeout(Exception):
+    """Raised when the pool lock cannot be taken in time"""
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # os.kill() would terminate the process on Windows
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class _FileLock:
+    """Cross-process lock held with flock (msvcrt.locking on Windows).
+
+    The OS releases the lock when its holder exits, however it dies, so
+    a lock is never broken while its owner is still working under it.
+    The lock file itself is left in place.
+    """
+
+    def __init__(self, path: str, timeout: float = LOCK_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._fd: Optional[int] = None
+
+    @staticmethod
+    def _try_lock(fd: int) -> bool:
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            return False
+        return True
+
+    def __enter__(self):
+        fd = os.open(self.path, os.O_CREAT | os.O_RDWR, 0o644)
+        deadline = time.monotonic() + self.timeout
+        while not self._try_lock(fd):
+            if time.monotonic() > deadline:
+                os.close(fd)
+                raise PoolLockTimeout(f"Could not lock {self.path} within {self.timeout:.0f}s")
+            time.sleep(0.1)
+        self._fd = fd
+        return self
+
+    def __exit__(self, *exc):
+        fd, self._fd = self._fd, None
+        if not fcntl:
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        # Closing the descriptor drops the flock
+        os.close(fd)
+
+
+class ContainerPool:
+    """Pool of booted test containers for one image and mode.
+
+    Pool containers carry Docker labels identifying the pool, image and
+    mode; which ones are checked out (and by which process) and how many
+    runs each has served is kept in a small JSON state file. All state
+    changes happen under a file lock, so concurrent test invocations never
+    get the same container.
+
+    After the first container of an image/mode has booted it is committed
+    to a snapshot image (SSH host keys generated, CI PAM setup applied),
+    and new pool containers start from that snapshot. A container is
+    never handed out twice: release() replaces it with a fresh one from
+    the snapshot, so no state from one run reaches the next.
+    """
+
+    def __init__(self, docker: Docker, image_name: str, mode: str, state_file: str = STATE_FILE,
+                 max_uses: int = MAX_USES):
+        self.docker = docker
+        self.image_name = image_name
+        self.mode = mode
+        self.state_file = state_file
+        self.max_uses = max_uses
+        self.lock = _FileLock(f"{state_file}.lock")
+
+    @property
+    def labels(self) -> Dict[str, str]:
+        return {POOL_LABEL: POOL_NAME, f"{POOL_LABEL}.image": self.image_name, f"{POOL_LABEL}.mode": self.mode}
+
+    @property
+    def snapshot_image(self) -> str:
+        return f"{self.image_name}-booted-{self.mode}"
+
+    def _load_state(self) -> Dict[str, Dict]:
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return state if isinstance(state, dict) else {}
+
+    def _save_state(self, state: Dict[str, Dict]):
+        tmp_path = f"{self.state_file}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_file)
+
+    def _discard(self, name: str, state: Dict[str, Dict]):
+        self.docker.stop(name)
+        self.docker.remove(name)
+        state.pop(name, None)
+
+    def acquire(self) -> Optional[str]:
+        """Check out an idle, running pool container.
+
+        Containers of an outdated image, stopped ones and ones whose owner
+        died mid-run (never reset by release()) are removed on the way.
+        Returns None when no warm container is available; the caller then
+        starts one with run_options() and registers it with add().
+        """
+        with self.lock:
+            state = self._load_state()
+            containers = self.docker.list_containers({POOL_LABEL: POOL_NAME, f"{POOL_LABEL}.mode": self.mode})
+            # Forget containers that no longer exist
+            existing = {container["name"] for container in containers}
+            state = {name: entry for name, entry in state.items() if name in existing or entry.get("mode") != self.mode}
+
+            claimed = None
+            for container in containers:
+                name = container["name"]
+                entry = state.setdefault(name, {"uses": 0, "mode": self.mode})
+                owner = entry.get("owner")
+                if owner and _pid_alive(owner):
+                    continue
+                outdated = container["labels"].get(f"{POOL_LABEL}.image") != self.image_name
+                if owner or outdated or container["state"] != "running":
+                    self._discard(name, state)
+                elif claimed is None:
+                    entry["owner"] = os.getpid()
+                    claimed = name
+            self._save_state(state)
+            return claimed
+
+    def add(self, name: str, options: List[str]):
+        """Register a freshly started container as checked out by us.
+
+        options are its `docker run` options (run_options() included),
+        reused to start its replacements.
+        """
+        with self.lock:
+            state = self._load_state()
+            state[name] = {"uses": 0, "mode": self.mode, "owner": os.getpid(), "options": options}
+            self._save_state(state)
+
+    def new_container_name(self) -> str:
+        return f"functional-pool-{self.mode}-{uuid.uuid4().hex[:8]}"
+
+    def run_image(self) -> str:
+        """Image for new pool containers: the booted snapshot when present"""
+        return self.snapshot_image if self.docker.image_exists(self.snapshot_image) else self.image_name
+
+    def run_options(self) -> List[str]:
+        options = []
+        for key, value in self.labels.items():
+            options += ["--label", f"{key}={value}"]
+        return options
+
+    def snapshot(self, name: str) -> bool:
+        """Commit a booted container as the start image for new ones"""
+        if self.docker.image_exists(self.snapshot_image):
+            return False
+        return self.docker.commit(name, self.snapshot_image).returncode == 0
+
+    def release(self, name: str, healthy: bool) -> Optional[str]:
+        """Hand a used container back to the pool.
+
+        The container is removed and, unless it was unhealthy or its pool
+        slot has served max_uses runs, replaced by a new one started from
+        run_image() with the same options. Starting from the booted
+        snapshot is cheap, and it resets everything the run changed.
+        Returns the name of the replacement, if any.
+        """
+        with self.lock:
+            state = self._load_state()
+            entry = state.get(name, {})
+            uses = entry.get("uses", 0) + 1
+            options = entry.get("options")
+            self._discard(name, state)
+            replacement = None
+            if healthy and uses < self.max_uses and options is not None:
+                replacement = self.new_container_name()
+                if self.docker.run(replacement, self.run_image(), options).returncode == 0:
+                    state[replacement] = {"uses": uses, "mode": self.mode, "options": options}
+                else:
+                    self.docker.remove(replacement)
+                    replacement = None
+            self._save_state(state)
+            return replacement
+
+    @classmethod
+    def drain(cls, docker: Docker, state_file: str = STATE_FILE) -> List[str]:
+        """Remove every idle pool container, of any image and mode
+        (snapshot images are kept)"""
+        pool = cls(docker, image_name="", mode="", state_file=state_file)
+        removed = []
+        with pool.lock:
+            state = pool._load_state()
+            for container in docker.list_containers({POOL_LABEL: POOL_NAME}):
+                owner = state.get(container["name"], {}).get("owner")
+                if owner and _pid_alive(owner):
+                    continue
+                pool._discard(container["name"], state)
+                removed.append(container["name"])
+            pool._save_state(state)
+        return removed
@@ -0,0 +1,535 @@
+#!/usr/bin/env python3
+"""
+==================================
+Docker Engine API Client
+Shared Docker access for automation scripts
+==================================
+"""
+
+import codecs
+import http.client
+import json
+import os
+import socket
+import struct
+import subprocess
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote, urlencode
+
+from utils import Echo, OutputTee, run_streaming
+
+DEFAULT_SOCKET = "/var/run/docker.sock"
+
+# Marks "use the client's default timeout" (None means no timeout)
+_DEFAULT_TIMEOUT = object()
+# Methods that are safe to send again after a dropped connection
+_RETRYABLE_METHODS = ("GET", "HEAD")
+# ExitWatch.poll() result when the wait itself failed
+WAIT_FAILED = -1
+
+
+class DockerAPIError(Exception):
+    """Raised when the Engine API cannot be reached or answers an error"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+def default_socket_path() -> str:
+    """Socket from DOCKER_HOST when it is a unix:// URL, else the default"""
+    docker_host = os.environ.get("DOCKER_HOST", "")
+    if docker_host.startswith("unix://"):
+        return docker_host[len("unix://"):]
+    return DEFAULT_SOCKET
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection over a unix domain socket"""
+
+    def __init__(self, socket_path: str, timeout: Optional[float]):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+class StreamDemuxer:
+    """Incremental demultiplexer for non-TTY exec/logs streams.
+
+    Frames are an 8-byte header (stream type, payload size) followed by
+    the payload; data may be fed in arbitrary chunks.
+    """
+
+    def __init__(self):
+        self._buffer = b""
+
+    def feed(self, data: bytes) -> List[Tuple[str, bytes]]:
+        """Return the complete (stream name, payload) frames received so far"""
+        self._buffer += data
+        frames = []
+        while len(self._buffer) >= 8:
+            stream_type, size = struct.unpack(">BxxxL", self._buffer[:8])
+            if len(self._buffer) < 8 + size:
+                break
+            frames.append(("stderr" if stream_type == 2 else "stdout", self._buffer[8:8 + size]))
+            self._buffer = self._buffer[8 + size:]
+        return frames
+
+
+def _tee_stream(chunks: Iterator[bytes], tee: OutputTee, multiplexed: bool = True):
+    """Decode a raw or multiplexed byte stream into the tee as it arrives"""
+    demuxer = StreamDemuxer()
+    decoders = {stream: codecs.getincrementaldecoder("utf-8")(errors="replace") for stream in ("stdout", "stderr")}
+    for chunk in chunks:
+        frames = demuxer.feed(chunk) if multiplexed else [("stdout", chunk)]
+        for stream, payload in frames:
+            tee.write(stream, decoders[stream].decode(payload))
+    for stream, decoder in decoders.items():
+        tee.write(stream, decoder.decode(b"", final=True))
+    tee.close()
+
+
+def split_image_ref(image: str) -> Tuple[str, str]:
+    """Split "repo[:tag]" into (repo, tag); a registry port is not a tag"""
+    if ":" in image.rsplit("/", 1)[-1]:
+        repo, tag = image.rsplit(":", 1)
+        return repo, tag
+    return image, "latest"
+
+
+class DockerClient:
+    """Minimal Docker Engine API client over the unix socket.
+
+    Each thread keeps one persistent HTTP/1.1 connection, so repeated
+    calls don't pay a process spawn or a new connection each time.
+    """
+
+    def __init__(self, socket_path: Optional[str] = None, timeout: Optional[float] = 30):
+        self.socket_path = socket_path or default_socket_path()
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> _UnixHTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = _UnixHTTPConnection(self.socket_path, self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def request(self, method: str, path: str, params: Optional[Dict[str, Any]] = None,
+                body: Optional[Dict[str, Any]] = None, timeout: Any = _DEFAULT_TIMEOUT) -> Tuple[int, bytes]:
+        """Send a request and return (status, body).
+
+        A keep-alive connection that the daemon closed in the meantime is
+        reopened once, but only when the request cannot have run twice: it
+        is a GET/HEAD, or it failed before being fully sent. Connection
+        failures raise DockerAPIError.
+        """
+        if params:
+            path = f"{path}?{urlencode(params)}"
+        payload = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+        if timeout is _DEFAULT_TIMEOUT:
+            timeout = self.timeout
+
+        for attempt in range(2):
+            conn = self._connection()
+            sent = False
+            try:
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                conn.request(method, path, body=payload, headers=headers)
+                sent = True
+                response = conn.getresponse()
+                data = response.read()
+                if response.will_close:
+                    self.close()
+                return response.status, data
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError) as e:
+                self.close()
+                if attempt or (sent and method not in _RETRYABLE_METHODS):
+                    raise DockerAPIError(f"Docker API connection lost: {e}") from e
+            except (OSError, http.client.HTTPException) as e:
+                self.close()
+                raise DockerAPIError(f"Docker API unavailable: {e}") from e
+        raise DockerAPIError("Docker API request failed")
+
+    def stream(self, method: str, path: str, params: Optional[Dict[str, Any]] = None,
+               body: Optional[Dict[str, Any]] = None, timeout: Any = _DEFAULT_TIMEOUT) -> Iterator[bytes]:
+        """Send a request and yield the response body as it arrives.
+
+        Uses its own connection: attached exec/logs streams may be
+        hijacked by the daemon and cannot be reused afterwards.
+        """
+        if params:
+            path = f"{path}?{urlencode(params)}"
+        payload = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+        conn = _UnixHTTPConnection(self.socket_path, self.timeout if timeout is _DEFAULT_TIMEOUT else timeout)
+        started = False
+        try:
+            conn.request(method, path, body=payload, headers=headers)
+            response = conn.getresponse()
+            if response.status != 200:
+                raise DockerAPIError(self._error_message(response.read(), response.status), response.status)
+            started = True
+            while True:
+                chunk = response.read1(65536)
+                if not chunk:
+                    break
+                yield chunk
+        except (OSError, http.client.HTTPException) as e:
+            if started:
+                # The request already ran: report it, callers must not retry
+                raise DockerAPIError(f"Docker API stream interrupted: {e}", status=0) from e
+            raise DockerAPIError(f"Docker API unavailable: {e}") from e
+        finally:
+            conn.close()
+
+    def _json(self, method: str, path: str, expected: Tuple[int, ...] = (200,), **kwargs: Any) -> Any:
+        status, data = self.request(method, path, **kwargs)
+        if status not in expected:
+            raise DockerAPIError(self._error_message(data, status), status)
+        return json.loads(data) if data else None
+
+    @staticmethod
+    def _error_message(data: bytes, status: int) -> str:
+        try:
+            return json.loads(data).get("message", f"HTTP {status}")
+        except (ValueError, AttributeError):
+            return f"HTTP {status}"
+
+    def ping(self) -> bool:
+        try:
+            status, _ = self.request("GET", "/_ping", timeout=2)
+        except DockerAPIError:
+            return False
+        return status == 200
+
+    def version(self) -> Dict[str, Any]:
+        return self._json("GET", "/version")
+
+    def containers(self, all: bool = False, filters: Optional[Dict[str, List[str]]] = None) -> List[Dict[str, Any]]:
+        params: Dict[str, Any] = {"all": int(all)}
+        if filters:
+            params["filters"] = json.dumps(filters)
+        return self._json("GET", "/containers/json", params=params)
+
+    def inspect(self, name: str) -> Dict[str, Any]:
+        return self._json("GET", f"/containers/{quote(name)}/json")
+
+    def stop(self, name: str, timeout: int = 10):
+        self._json("POST", f"/containers/{quote(name)}/stop", expected=(204, 304),
+                   params={"t": timeout}, timeout=timeout + 30)
+
+    def remove(self, name: str, force: bool = False):
+        self._json("DELETE", f"/containers/{quote(name)}", expected=(204,), params={"force": int(force)})
+
+    def wait(self, name: str) -> int:
+        """Block until the container stops and return its exit code"""
+        result = self._json("POST", f"/containers/{quote(name)}/wait", timeout=None)
+        return int(result.get("StatusCode", 1))
+
+    def logs(self, name: str, tail: Optional[int] = None, echo: Optional[Echo] = None) -> Tuple[str, str]:
+        """Container logs as (stdout, stderr) tails; lines are passed to
+        echo as they are read"""
+        params: Dict[str, Any] = {"stdout": 1, "stderr": 1}
+        if tail is not None:
+            params["tail"] = tail
+        tty = self.inspect(name).get("Config", {}).get("Tty", False)
+        tee = OutputTee(echo)
+        _tee_stream(self.stream("GET", f"/containers/{quote(name)}/logs", params=params), tee, multiplexed=not tty)
+        return tee.text("stdout"), tee.text("stderr")
+
+    def exec(self, name: str, cmd: List[str], workdir: Optional[str] = None, user: Optional[str] = None,
+             environment: Optional[Dict[str, str]] = None, timeout: Any = _DEFAULT_TIMEOUT,
+             echo: Optional[Echo] = None) -> Tuple[int, str, str]:
+        """Run a command in a container and return (exit code, stdout, stderr).
+
+        Output is streamed: lines are passed to echo as they arrive and
+        only a bounded tail of each stream is kept.
+        """
+        config: Dict[str, Any] = {"AttachStdout": True, "AttachStderr": True, "Cmd": cmd}
+        if workdir:
+            config["WorkingDir"] = workdir
+        if user:
+            config["User"] = user
+        if environment:
+            config["Env"] = [f"{key}={value}" for key, value in environment.items()]
+        exec_id = self._json("POST", f"/containers/{quote(name)}/exec", expected=(201,), body=config)["Id"]
+
+        tee = OutputTee(echo)
+        _tee_stream(self.stream("POST", f"/exec/{exec_id}/start", body={"Detach": False, "Tty": False},
+                                timeout=timeout), tee)
+        exit_code = self._json("GET", f"/exec/{exec_id}/json").get("ExitCode")
+        return (exit_code if exit_code is not None else 1, tee.text("stdout"), tee.text("stderr"))
+
+    def image_inspect(self, name: str) -> Dict[str, Any]:
+        return self._json("GET", f"/images/{quote(name)}/json")
+
+    def tag(self, source: str, target: str):
+        repo, tag = split_image_ref(target)
+        self._json("POST", f"/images/{quote(source)}/tag", expected=(201,), params={"repo": repo, "tag": tag})
+
+    def commit(self, name: str, image: str):
+        repo, tag = split_image_ref(image)
+        self._json("POST", "/commit", expected=(201,), params={"container": name, "repo": repo, "tag": tag},
+                   timeout=300)
+
+    def published_port(self, name: str, container_port: str = "22/tcp") -> Optional[str]:
+        ports = self.inspect(name).get("NetworkSettings", {}).get("Ports") or {}
+        for binding in ports.get(container_port) or []:
+            if binding.get("HostPort"):
+                return binding["HostPort"]
+        return None
+
+
+class Docker:
+    """Docker operations through the Engine API, with the CLI as fallback.
+
+    Methods return subprocess.CompletedProcess objects shaped like the
+    equivalent `docker` CLI call, so callers can switch transparently.
+    The API is used whenever the socket answers a ping; otherwise (e.g.
+    a remote DOCKER_HOST) every call goes through the CLI.
+    """
+
+    def __init__(self, socket_path: Optional[str] = None, timeout: Optional[float] = 30):
+        self.client = DockerClient(socket_path, timeout)
+        self.timeout = timeout
+        self._use_api: Optional[bool] = None
+
+    @property
+    def use_api(self) -> bool:
+        if self._use_api is None:
+            self._use_api = os.path.exists(self.client.socket_path) and self.client.ping()
+        return self._use_api
+
+    def _cli(self, args: List[str], timeout: Optional[float] = None,
+             echo: Optional[Echo] = None) -> subprocess.CompletedProcess:
+        command = ["docker"] + args
+        try:
+            return run_streaming(command, echo, timeout=timeout or self.timeout)
+        except FileNotFoundError as e:
+            return subprocess.CompletedProcess(command, 127, "", str(e))
+
+    @staticmethod
+    def _result(args: List[str], returncode: int = 0, stdout: str = "", stderr: str = "") -> subprocess.CompletedProcess:
+        return subprocess.CompletedProcess(["docker"] + args, returncode, stdout, stderr)
+
+    def _api_call(self, args: List[str], call) -> subprocess.CompletedProcess:
+        try:
+            return call()
+        except DockerAPIError as e:
+            if e.status is None:
+                # Socket went away: fall back to the CLI from now on
+                self._use_api = False
+                return self._cli(args)
+            return self._result(args, 1, "", f"Error response from daemon: {e}")
+
+    def version(self) -> subprocess.CompletedProcess:
+        args = ["--version"]
+        if not self.use_api:
+            return self._cli(args)
+        return self._api_call(args, lambda: self._result(
+            args, stdout=f"Docker version {self.client.version().get('Version', 'unknown')} (Engine API)"))
+
+    def container_status(self, name: str) -> subprocess.CompletedProcess:
+        """Equivalent of `docker ps --filter name=<name> --format {{.Status}}`"""
+        args = ["ps", "--filter", f"name={name}", "--format", "{{.Status}}"]
+        if not self.use_api:
+            return self._cli(args)
+        return self._api_call(args, lambda: self._result(args, stdout="\n".join(
+            container.get("Status", "") for container in self.client.containers(filters={"name": [name]}))))
+
+    def health(self, name: str) -> subprocess.CompletedProcess:
+        """Health status of a container ("starting", "healthy", "unhealthy"),
+        or its state ("running", "exited", ...) when it has no healthcheck"""
+        args = ["inspect", "--format",
+                "{{if .State.Health}}{{.State.Health.Status}}{{else}}{{.State.Status}}{{end}}", name]
+        if not self.use_api:
+            return self._cli(args)
+
+        def call():
+            state = self.client.inspect(name).get("State") or {}
+            return self._result(args, stdout=(state.get("Health") or {}).get("Status") or state.get("Status", ""))
+        return self._api_call(args, call)
+
+    def stop(self, name: str) -> subprocess.CompletedProcess:
+        args = ["stop", name]
+        if not self.use_api:
+            return self._cli(args)
+        return self._api_call(args, lambda: (self.client.stop(name), self._result(args, stdout=name))[1])
+
+    def remove(self, name: str) -> subprocess.CompletedProcess:
+        args = ["rm", name]
+        if not self.use_api:
+            return self._cli(args)
+        return self._api_call(args, lambda: (self.client.remove(name), self._result(args, stdout=name))[1])
+
+    def logs(self, name: str, echo: Optional[Echo] = None) -> subprocess.CompletedProcess:
+        args = ["logs", name]
+        if not self.use_api:
+            return self._cli(args, echo=echo)
+        return self._api_call(args, lambda: self._result(args, 0, *self.client.logs(name, echo=echo)))
+
+    def exec(self, name: str, cmd: List[str], workdir: Optional[str] = None,
+             timeout: Optional[float] = None, echo: Optional[Echo] = None) -> subprocess.CompletedProcess:
+        args = ["exec"] + (["-w", workdir] if workdir else []) + [name] + cmd
+        if not self.use_api:
+            return self._cli(args, timeout, echo)
+        return self._api_call(args, lambda: self._result(
+            args, *self.client.exec(name, cmd, workdir=workdir, timeout=timeout or self.timeout, echo=echo)))
+
+    def port(self, name: str, container_port: str = "22/tcp") -> subprocess.CompletedProcess:
+        args = ["port", name, container_port]
+        if not self.use_api:
+            return self._cli(args)
+
+        def call():
+            host_port = self.client.published_port(name, container_port)
+            if host_port is None:
+                return self._result(args, 1, "", f"no public port '{container_port}' published for {name}")
+            return self._result(args, stdout=f"0.0.0.0:{host_port}")
+        return self._api_call(args, call)
+
+    def image_exists(self, name: str) -> bool:
+        """Whether the image is present locally"""
+        args = ["image", "inspect", name]
+        if not self.use_api:
+            return self._cli(args).returncode == 0
+        try:
+            self.client.image_inspect(name)
+            return True
+        except DockerAPIError as e:
+            if e.status is None:
+                self._use_api = False
+                return self._cli(args).returncode == 0
+            return False
+
+    def tag(self, source: str, target: str) -> subprocess.CompletedProcess:
+        args = ["tag", source, target]
+        if not self.use_api:
+            return self._cli(args)
+        return self._api_call(args, lambda: (self.client.tag(source, target), self._result(args))[1])
+
+    def list_containers(self, labels: Dict[str, str]) -> List[Dict[str, Any]]:
+        """Containers (running or not) carrying all the given labels, as
+        dicts with name, state and labels"""
+        label_filters = [f"{key}={value}" for key, value in labels.items()]
+        if self.use_api:
+            try:
+                return [
+                    {"name": container["Names"][0].lstrip("/"), "state": container.get("State", ""),
+                     "labels": container.get("Labels") or {}}
+                    for container in self.client.containers(all=True, filters={"label": label_filters})
+                ]
+            except DockerAPIError as e:
+                if e.status is not None:
+                    return []
+                self._use_api = False
+        args = ["ps", "-a", "--format", "{{json .}}"]
+        for label in label_filters:
+            args += ["--filter", f"label={label}"]
+        containers = []
+        for line in self._cli(args).stdout.splitlines():
+            try:
+                container = json.loads(line)
+            except ValueError:
+                continue
+            container_labels = dict(item.split("=", 1) for item in container.get("Labels", "").split(",") if "=" in item)
+            containers.append({"name": container.get("Names", ""), "state": container.get("State", ""),
+                               "labels": container_labels})
+        return containers
+
+    def run(self, name: str, image: str, options: List[str]) -> subprocess.CompletedProcess:
+        """Start a detached container; always through the CLI, which parses
+        the `docker run` options"""
+        return self._cli(["run", "-d", "--name", name] + options + [image])
+
+    def commit(self, name: str, image: str) -> subprocess.CompletedProcess:
+        args = ["commit", name, image]
+        if not self.use_api:
+            return self._cli(args, timeout=300)
+        return self._api_call(args, lambda: (self.client.commit(name, image), self._result(args))[1])
+
+    def watch_exit(self, name: str) -> "ExitWatch":
+        """Start watching for the container to stop, without polling"""
+        return ExitWatch(self, name)
+
+
+class ExitWatch:
+    """Background `wait` on a container; poll() returns its exit code once
+    it has stopped, WAIT_FAILED if the wait failed (e.g. no such container)
+    and None while it is still running."""
+
+    def __init__(self, docker: Docker, name: str):
+        self._exit_code: Optional[int] = None
+        self._done = threading.Event()
+        self._stopped = False
+        self._process: Optional[subprocess.Popen] = None
+        # The wait connection belongs to the watch (not to a thread), so
+        # stop() can shut it down from any thread
+        self._conn: Optional[_UnixHTTPConnection] = None
+        if docker.use_api:
+            conn = _UnixHTTPConnection(docker.client.socket_path, timeout=None)
+            try:
+                # Connect before the thread starts: stop() may come right away
+                conn.connect()
+                self._conn = conn
+            except OSError:
+                conn.close()
+        if self._conn is not None:
+            threading.Thread(target=self._wait_api, args=(name,), name=f"exit-watch-{name}", daemon=True).start()
+        else:
+            self._process = subprocess.Popen(["docker", "wait", name], stdout=subprocess.PIPE,
+                                             stderr=subprocess.DEVNULL, text=True)
+
+    def _wait_api(self, name: str):
+        conn = self._conn
+        try:
+            conn.request("POST", f"/containers/{quote(name)}/wait")
+            response = conn.getresponse()
+            data = response.read()
+            exit_code = int(json.loads(data).get("StatusCode", 1)) if response.status == 200 else WAIT_FAILED
+        except (OSError, http.client.HTTPException, ValueError):
+            exit_code = WAIT_FAILED
+        finally:
+            conn.close()
+        # A wait cut short by stop() is not a result
+        if not self._stopped:
+            self._exit_code = exit_code
+            self._done.set()
+
+    def poll(self) -> Optional[int]:
+        if not self._stopped and self._process is not None and self._process.poll() is not None:
+            output = self._process.stdout.read().strip() if self._process.stdout else ""
+            self._exit_code = int(output) if output.lstrip("-").isdigit() else WAIT_FAILED
+            self._done.set()
+        return self._exit_code if self._done.is_set() else None
+
+    def stop(self):
+        self._stopped = True
+        if self._process is not None and self._process.poll() is None:
+            self._process.terminate()
+            self._process.wait()
+        if self._conn is not None:
+            # Shutting the socket down unblocks the waiting thread
+            sock = self._conn.sock
+            if sock is not None:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
@@ -0,0 +1,525 @@
+#!/usr/bin/env python3
+"""
+==================================
+Playbook Analyzer
+Semantic playbook checks against the generated inventory
+==================================
+"""
+
+import copy
+import fnmatch
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from static_checks import BLOCK_SECTIONS, IMPORT_PLAYBOOK_KEYS, TASK_LISTS, Issue, as_list, find_playbooks, task_actions
+from yaml_validation import HAS_YAML
+
+if HAS_YAML:
+    import yaml
+    from yaml_validation import SAFE_LOADER
+
+try:
+    import jinja2
+    from jinja2 import meta, nodes
+    HAS_JINJA2 = True
+except ImportError:
+    HAS_JINJA2 = False
+
+SCRIPTS_DIR = os.path.join("ansible-control", "scripts")
+NODES_FILE = os.path.join("ansible-control", "config", "nodes.yml")
+# Collections the control node Dockerfile installs besides ansible-core
+COLLECTION_REQUIREMENTS = os.path.join("ansible-control", "requirements.yml")
+CACHE_FILE = ".playbook-analysis-cache.json"
+CACHE_VERSION = 3
+# Variable directories Ansible also loads from next to the playbook
+PLAYBOOK_VARS_DIRS = ("group_vars", "host_vars")
+VARS_FILE_EXTENSIONS = ("", ".yml", ".yaml", ".json")
+
+# Modules shipped with ansible-core (ansible.builtin)
+BUILTIN_MODULES = {
+    "add_host", "apt", "apt_key", "apt_repository", "assemble", "assert", "async_status", "blockinfile",
+    "command", "copy", "cron", "deb822_repository", "debconf", "debug", "dnf", "dnf5", "dpkg_selections",
+    "expect", "fail", "fetch", "file", "find", "gather_facts", "get_url", "getent", "git", "group",
+    "group_by", "hostname", "import_playbook", "import_role", "import_tasks", "include_role",
+    "include_tasks", "include_vars", "iptables", "known_hosts", "lineinfile", "meta", "mount_facts",
+    "package", "package_facts", "pause", "ping", "pip", "raw", "reboot", "replace", "rpm_key", "script",
+    "service", "service_facts", "set_fact", "set_stats", "setup", "shell", "slurp", "stat", "subversion",
+    "systemd", "systemd_service", "sysvinit", "tempfile", "template", "unarchive", "uri", "user",
+    "validate_argument_spec", "wait_for", "wait_for_connection", "yum_repository",
+}
+CORE_COLLECTIONS = {"ansible.builtin", "ansible.legacy"}
+# Modules after which the variables a play can see are not known statically
+DYNAMIC_VARS_MODULES = {"include_vars", "include_tasks", "import_tasks", "include_role", "import_role"}
+FACT_MODULES = {"setup", "gather_facts"}
+
+MAGIC_VARIABLES = {
+    "hostvars", "groups", "group_names", "inventory_hostname", "inventory_hostname_short", "inventory_dir",
+    "inventory_file", "play_hosts", "ansible_play_hosts", "ansible_play_hosts_all", "ansible_play_batch",
+    "ansible_play_name", "ansible_facts", "ansible_check_mode", "ansible_diff_mode", "ansible_version",
+    "ansible_run_tags", "ansible_skip_tags", "ansible_limit", "ansible_forks", "ansible_config_file",
+    "ansible_playbook_python", "playbook_dir", "role_path", "role_name", "omit", "environment",
+}
+JINJA_GLOBALS = {"lookup", "query", "q", "now", "range", "dict", "lipsum", "cycler", "joiner", "namespace",
+                 "undef", "true", "false", "none", "True", "False", "None"}
+# Keywords holding bare Jinja2 expressions instead of templates
+BARE_EXPRESSION_KEYS = {"when", "changed_when", "failed_when", "until"}
+# Variables only used under these are allowed to be undefined
+GUARD_FILTERS = {"default", "d"}
+GUARD_TESTS = {"defined", "undefined"}
+
+
+def _load_yaml(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.load(f, Loader=SAFE_LOADER)
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _file_sha256(path: str) -> Optional[str]:
+    """Content hash of a file, None when it does not exist or cannot be read"""
+    try:
+        with open(path, "rb") as f:
+            return _sha256(f.read())
+    except OSError:
+        return None
+
+
+def installed_collections(root: str = ".") -> Set[str]:
+    """ansible-core collections plus those in the control node's galaxy requirements file"""
+    collections = set(CORE_COLLECTIONS)
+    try:
+        data = _load_yaml(os.path.join(root, COLLECTION_REQUIREMENTS))
+    except (OSError, yaml.YAMLError):
+        return collections
+    entries = data.get("collections", []) if isinstance(data, dict) else []
+    for entry in entries if isinstance(entries, list) else []:
+        name = entry.get("name") if isinstance(entry, dict) else entry
+        if name:
+            collections.add(str(name))
+    return collections
+
+
+class Inventory:
+    """Hosts, groups and variables of an inventory tree (the documents
+    written by inventory_generator.py: inventory/hosts.yml, group_vars
+    and host_vars)"""
+
+    def __init__(self, documents: Dict[str, Dict]):
+        self.groups: Dict[str, Set[str]] = {"all": set(), "ungrouped": set()}
+        self.group_vars: Dict[str, Dict] = {}
+        self.host_vars: Dict[str, Dict] = {}
+        hosts_document = documents.get(os.path.join("inventory", "hosts.yml")) or {}
+        for group, body in hosts_document.items():
+            self._walk(str(group), body)
+        self.groups["ungrouped"] = self.groups["all"] - set().union(
+            *(hosts for group, hosts in self.groups.items() if group not in ("all", "ungrouped")))
+
+        self._add_vars(documents.items())
+        self.fingerprint = _sha256(json.dumps(documents, sort_keys=True, default=str).encode())
+
+    def _add_vars(self, documents: Iterable[Tuple[str, Dict]]):
+        """Merge group_vars/<name>[.yml] and host_vars/<name>[.yml] documents
+        (or files in a <name>/ directory under them)"""
+        for path, document in documents:
+            parts = path.split(os.sep)
+            if len(parts) < 2 or not isinstance(document, dict):
+                continue
+            name = os.path.splitext(parts[1])[0] if len(parts) == 2 else parts[1]
+            if parts[0] == "group_vars":
+                self.group_vars.setdefault(name, {}).update(document)
+            elif parts[0] == "host_vars" and name in self.groups["all"]:
+                self.host_vars.setdefault(name, {}).update(document)
+
+    def with_vars(self, documents: Iterable[Tuple[str, Dict]]) -> "Inventory":
+        """Copy with more group_vars/host_vars documents layered on top"""
+        inventory = copy.copy(self)
+        inventory.group_vars = {name: dict(values) for name, values in self.group_vars.items()}
+        inventory.host_vars = {name: dict(values) for name, values in self.host_vars.items()}
+        inventory._add_vars(documents)
+        return inventory
+
+    def _walk(self, group: str, body) -> Set[str]:
+        """Register a group and its children; returns the group's hosts"""
+        hosts = self.groups.setdefault(group, set())
+        if not isinstance(body, dict):
+            return hosts
+        for host, host_vars in (body.get("hosts") or {}).items():
+            hosts.add(str(host))
+            self.host_vars.setdefault(str(host), {}).update(host_vars or {})
+        if isinstance(body.get("vars"), dict):
+            self.group_vars.setdefault(group, {}).update(body["vars"])
+        for child, child_body in (body.get("children") or {}).items():
+            hosts |= self._walk(str(child), child_body)
+        self.groups["all"] |= hosts
+        return hosts
+
+    @classmethod
+    def from_repo(cls, root: str = ".", nodes_file: str = NODES_FILE) -> "Inventory":
+        """Inventory that inventory_generator.py builds from the nodes file
+        (static source only: no Docker or DNS discovery)"""
+        scripts_dir = os.path.abspath(os.path.join(root, SCRIPTS_DIR))
+        if scripts_dir not in sys.path:
+            sys.path.insert(0, scripts_dir)
+        from inventory_discovery import StaticFileSource, discover_hosts
+        from inventory_generator import InventoryTree, read_reserved_host_vars
+
+        path = os.path.join(root, nodes_file)
+        tree = InventoryTree(discover_hosts([StaticFileSource(path)]), reserved_host_vars=read_reserved_host_vars(path))
+        return cls(tree.documents())
+
+    def variables(self, host: str) -> Set[str]:
+        """Names of the inventory variables defined for a host"""
+        names = set(self.host_vars.get(host, {}))
+        for group, hosts in self.groups.items():
+            if host in hosts:
+                names |= set(self.group_vars.get(group, {}))
+        return names
+
+    def _resolve(self, term: str) -> Set[str]:
+        if term in ("all", "*"):
+            return set(self.groups["all"])
+        if term in self.groups:
+            return set(self.groups[term])
+        if term in self.groups["all"]:
+            return {term}
+        if term.startswith("~"):
+            regex = re.compile(term[1:])
+            matched = [name for name in self.groups if regex.search(name)]
+            hosts = {host for host in self.groups["all"] if regex.search(host)}
+        elif any(char in term for char in "*?["):
+            matched = fnmatch.filter(self.groups, term)
+            hosts = set(fnmatch.filter(self.groups["all"], term))
+        else:
+            return set()
+        for group in matched:
+            hosts |= self.groups[group]
+        return hosts
+
+    def match(self, pattern) -> Tuple[Optional[Set[str]], List[str]]:
+        """Hosts selected by a play's host pattern, and the positive terms
+        that match no host. Templated patterns resolve to (None, [])."""
+        terms = []
+        for item in as_list(pattern):
+            item = str(item)
+            if "{{" in item:
+                return None, []
+            terms += [term.strip() for term in re.split(r"[,:]", item) if term.strip()]
+        selected: Set[str] = set()
+        unmatched = []
+        for term in terms:
+            if term[0] in "!&":
+                continue
+            hosts = self._resolve(term)
+            if not hosts:
+                unmatched.append(term)
+            selected |= hosts
+        for term in terms:
+            if term[0] == "&":
+                selected &= self._resolve(term[1:])
+            elif term[0] == "!":
+                selected -= self._resolve(term[1:])
+        return selected, unmatched
+
+
+class _AnyPlugin(dict):
+    """Filter/test table accepting any name: Ansible's own plugins are
+    unknown to plain Jinja2, and only parsing is needed here"""
+
+    def __contains__(self, name):
+        return True
+
+    def __missing__(self, name):
+        return _any_plugin
+
+    def get(self, name, default=None):
+        return self[name]
+
+
+def _any_plugin(*args, **kwargs):
+    return None
+
+
+def _guarded_names(ast) -> Set[str]:
+    """Variables used under `| default(...)` or `is defined` tests"""
+    guarded = set()
+    for node in ast.find_all((nodes.Filter, nodes.Test)):
+        guards = GUARD_FILTERS if isinstance(node, nodes.Filter) else GUARD_TESTS
+        if node.name not in guards:
+            continue
+        target = node.node
+        while isinstance(target, (nodes.Getattr, nodes.Getitem)):
+            target = target.node
+        if isinstance(target, nodes.Name):
+            guarded.add(target.name)
+    return guarded
+
+
+def _templates(key: str, value) -> Iterable[str]:
+    """Jinja2 sources in a task value (bare expressions wrapped in {{ }})"""
+    if isinstance(value, dict):
+        for item in value.values():
+            yield from _templates(key, item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _templates(key, item)
+    elif isinstance(value, str):
+        if key in BARE_EXPRESSION_KEYS:
+            yield "{{ " + value + " }}"
+        elif "{{" in value or "{%" in value:
+            yield value
+
+
+def _module_name(task: Dict) -> Optional[str]:
+    actions = task_actions(task)
+    if len(actions) != 1:
+        return None
+    action = str(actions[0])
+    if action in ("action", "local_action"):
+        value = task[action]
+        if isinstance(value, dict):
+            return value.get("module")
+        return str(value).split()[0] if value else None
+    return action
+
+
+def _walk_tasks(tasks, scope: Set[str]) -> Iterable[Tuple[Dict, Set[str]]]:
+    """Every task (blocks flattened) with the block variables in scope"""
+    for task in tasks if isinstance(tasks, list) else []:
+        if not isinstance(task, dict):
+            continue
+        if "block" in task:
+            block_scope = scope | set(task.get("vars") or {})
+            yield task, scope
+            for section in BLOCK_SECTIONS:
+                yield from _walk_tasks(task.get(section), block_scope)
+        else:
+            yield task, scope
+
+
+class PlaybookAnalyzer:
+    """Static semantic checks of playbooks: modules that do not exist on
+    the control node, variables that are never defined, and host patterns
+    that match no host of the generated inventory.
+
+    Results are cached per playbook, keyed by its content hash and the
+    hashes of the vars files it read (vars_files, and the group_vars/ and
+    host_vars/ next to it); the whole cache is invalidated when the
+    inventory or the installed collections change.
+    """
+
+    def __init__(self, root: str = ".", inventory: Optional[Inventory] = None, cache_file: str = CACHE_FILE):
+        self.root = root
+        self.inventory = inventory or Inventory.from_repo(root)
+        self.collections = installed_collections(root)
+        self.cache_path = os.path.join(root, cache_file)
+        self.fingerprint = _sha256(json.dumps(
+            [CACHE_VERSION, HAS_JINJA2, self.inventory.fingerprint, sorted(self.collections)]).encode())
+        self.environment = None
+        if HAS_JINJA2:
+            self.environment = jinja2.Environment(extensions=["jinja2.ext.do", "jinja2.ext.loopcontrols"])
+            self.environment.filters = _AnyPlugin(self.environment.filters)
+            self.environment.tests = _AnyPlugin(self.environment.tests)
+
+    def check_module(self, name: str, collections: List[str]) -> Optional[Tuple[str, bool]]:
+        """Problem with a task's module as (message, is_error), or None.
+
+        Only ansible.builtin names are known exhaustively; short names may
+        be redirected to a collection by ansible-core's routing, and the
+        requirements file may lag behind the image, so those are warnings.
+        """
+        parts = name.split(".")
+        if len(parts) == 1:
+            if name in BUILTIN_MODULES or collections:
+                return None
+            return f"module '{name}' is not an ansible.builtin module", False
+        if len(parts) != 3:
+            return f"invalid module name '{name}'", True
+        collection = ".".join(parts[:2])
+        if collection in CORE_COLLECTIONS:
+            return None if parts[2] in BUILTIN_MODULES else (f"unknown module '{name}'", True)
+        if collection not in self.collections:
+            return f"module '{name}': collection {collection} is not in {COLLECTION_REQUIREMENTS}", False
+        return None
+
+    def _undefined(self, task: Dict, defined: Set[str], facts: bool) -> Tuple[Set[str], List[str]]:
+        """Undefined variables used by a task, and template syntax errors"""
+        used: Set[str] = set()
+        guarded: Set[str] = set()
+        errors = []
+        for key, value in task.items():
+            if key in ("register", "block", "rescue", "always"):
+                continue
+            for source in _templates(key, value):
+                try:
+                    ast = self.environment.parse(source)
+                except jinja2.TemplateSyntaxError as e:
+                    errors.append(f"invalid Jinja2 in '{key}': {e.message}")
+                    continue
+                used |= meta.find_undeclared_variables(ast)
+                guarded |= _guarded_names(ast)
+
+        loop_control = task.get("loop_control") if isinstance(task.get("loop_control"), dict) else {}
+        local = set(task.get("vars") or {})
+        if "loop" in task or any(str(key).startswith("with_") for key in task):
+            local.add(loop_control.get("loop_var", "item"))
+            local.update(str(loop_control[key]) for key in ("index_var",) if key in loop_control)
+            local.add("ansible_loop")
+        missing = {name for name in used - guarded - defined - local - JINJA_GLOBALS
+                   if not (facts and name.startswith("ansible_"))}
+        return missing, errors
+
+    def playbook_vars_files(self, playbook: str) -> List[str]:
+        """group_vars/ and host_vars/ files next to a playbook, relative to root"""
+        paths = []
+        for directory in PLAYBOOK_VARS_DIRS:
+            base = os.path.join(self.root, os.path.dirname(playbook), directory)
+            for pattern in (os.path.join(base, "*"), os.path.join(base, "*", "*")):
+                paths += [path for path in glob.glob(pattern)
+                          if os.path.isfile(path) and os.path.splitext(path)[1] in VARS_FILE_EXTENSIONS]
+        return sorted(os.path.relpath(path, self.root) for path in paths)
+
+    def analyze_playbook(self, playbook: str) -> List[Issue]:
+        """Analyze one playbook (uncached)"""
+        return self._analyze_playbook(playbook)[0]
+
+    def _analyze_playbook(self, playbook: str) -> Tuple[List[Issue], List[str]]:
+        """Issues of one playbook and the vars_files it read (relative to root)"""
+        try:
+            data = _load_yaml(os.path.join(self.root, playbook))
+        except Exception:
+            # Syntax errors are reported by the YAML validation
+            return [], []
+        if not isinstance(data, list):
+            return [], []
+
+        base = os.path.dirname(playbook)
+        inventory = self.inventory
+        documents = []
+        for path in self.playbook_vars_files(playbook):
+            try:
+                documents.append((os.path.relpath(path, base), _load_yaml(os.path.join(self.root, path))))
+            except Exception:
+                continue
+        if documents:
+            inventory = inventory.with_vars(documents)
+
+        issues = []
+        vars_files: List[str] = []
+        # Registered variables persist for the host across plays
+        registered: Set[str] = set()
+        for index, play in enumerate(data):
+            if not isinstance(play, dict) or IMPORT_PLAYBOOK_KEYS & set(play):
+                continue
+            where = f"play[{index}] '{play['name']}'" if "name" in play else f"play[{index}]"
+            hosts, unmatched = inventory.match(play.get("hosts"))
+            for term in unmatched:
+                # Ansible only warns and skips the play
+                issues.append(Issue(playbook, f"{where}: host pattern '{term}' matches no hosts in the inventory",
+                                    error=False))
+
+            collections = [str(name) for name in as_list(play.get("collections"))]
+            tasks = []
+            for section in TASK_LISTS:
+                tasks += list(_walk_tasks(play.get(section), set()))
+
+            # Variables the play can see wherever they are set in it
+            dynamic = bool(play.get("roles"))
+            facts = play.get("gather_facts", True) not in (False, "false", "no")
+            defined = set(MAGIC_VARIABLES) | set(play.get("vars") or {})
+            defined |= {str(prompt.get("name")) for prompt in as_list(play.get("vars_prompt")) if isinstance(prompt, dict)}
+            for vars_file in as_list(play.get("vars_files")):
+                path = os.path.normpath(os.path.join(base, str(vars_file)))
+                # Missing files count too: creating one changes the result
+                vars_files.append(path)
+                try:
+                    document = _load_yaml(os.path.join(self.root, path))
+                    defined |= set(document or {})
+                except Exception:
+                    dynamic = True
+            for task, _ in tasks:
+                registered.update(str(name) for name in as_list(task.get("register")))
+                module = (_module_name(task) or "").split(".")[-1]
+                if module == "set_fact" and isinstance(task.get(_module_name(task)), dict):
+                    defined |= {key for key in task[_module_name(task)] if key != "cacheable"}
+                dynamic = dynamic or module in DYNAMIC_VARS_MODULES
+                facts = facts or module in FACT_MODULES
+            defined |= registered
+
+            if hosts:
+                defined |= set.intersection(*(inventory.variables(host) for host in hosts))
+            else:
+                # No matching hosts: what the named groups would get
+                for group in ["all"] + unmatched:
+                    defined |= set(inventory.group_vars.get(group, {}))
+
+            for number, (task, scope) in enumerate(tasks):
+                task_where = f"{where} task '{task['name']}'" if "name" in task else f"{where} task #{number + 1}"
+                module = _module_name(task)
+                problem = self.check_module(module, collections) if module and "block" not in task else None
+                if problem:
+                    message, error = problem
+                    issues.append(Issue(playbook, f"{task_where}: {message}", error))
+                if dynamic or not self.environment:
+                    continue
+                missing, errors = self._undefined(task, defined | scope, facts)
+                for error in errors:
+                    issues.append(Issue(playbook, f"{task_where}: {error}"))
+                for name in sorted(missing):
+                    issues.append(Issue(playbook, f"{task_where}: undefined variable '{name}'"))
+        return issues, sorted(set(vars_files))
+
+    def _dependencies(self, vars_files: Iterable[str], playbook: str) -> Dict[str, Optional[str]]:
+        """Content hash of every vars file a playbook's result depends on"""
+        paths = set(vars_files) | set(self.playbook_vars_files(playbook))
+        return {path: _file_sha256(os.path.join(self.root, path)) for path in sorted(paths)}
+
+    def _load_cache(self) -> Dict[str, Dict]:
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data.get("files", {}) if data.get("fingerprint") == self.fingerprint else {}
+
+    def _save_cache(self, cache: Dict[str, Dict]):
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"fingerprint": self.fingerprint, "files": cache}, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            pass
+
+    def analyze(self, playbooks: Optional[Iterable[str]] = None) -> List[Issue]:
+        """Analyze the given playbooks (default: all of them), reusing the
+        cached result of any playbook whose content and vars files are
+        unchanged"""
+        cache = self._load_cache()
+        playbooks = find_playbooks(self.root) if playbooks is None else list(playbooks)
+        issues = []
+        for playbook in playbooks:
+            try:
+                with open(os.path.join(self.root, playbook), "rb") as f:
+                    sha256 = _sha256(f.read())
+            except OSError as e:
+                issues.append(Issue(playbook, f"cannot be read: {e}"))
+                continue
+            entry = cache.get(playbook)
+            if (not entry or entry["sha256"] != sha256
+                    or entry["dependencies"] != self._dependencies(entry["dependencies"], playbook)):
+                playbook_issues, vars_files = self._analyze_playbook(playbook)
+                entry = cache[playbook] = {
+                    "sha256": sha256,
+                    "dependencies": self._dependencies(vars_files, playbook),
+                    "issues": [[issue.message, issue.error] for issue in playbook_issues],
+                }
+            issues += [Issue(playbook, message, error) for message, error in entry["issues"]]
+        self._save_cache(cache)
+        return issues
@@ -9,14 +9,22 @@ Validates changes before committing
 import subprocess
 import sys
 import os
+import glob
+import hashlib
+import json
+import shutil
 from pathlib import Path
 import time
 import argparse
 import platform
 from typing import List, Dict, Optional, Tuple
-import glob
 
-from utils import Colors
+from docker_api import Docker
+from playbook_analyzer import HAS_JINJA2, NODES_FILE, PlaybookAnalyzer
+from static_checks import COMPOSE_FILE, PLAYBOOK_GLOB, run_static_checks
+from toolchain import probe
+from yaml_validation import YamlValidator, changed_yaml_files
+from utils import Colors, TaskGraph, hash_build_context, run_streaming, span
 
 # Try to import yaml, but make it optional
 try:
@@ -26,6 +34,45 @@ except ImportError:
     HAS_YAML = False
 
 # Constantes
+CONTROL_CONTAINER = "ansible-control"
+CONTROL_WORKDIR = "/ansible"
+PLAYBOOK_TIMEOUT = 1800
+# Estado del entorno reutilizable (--reuse-env): hash por servicio
+ENV_STATE_FILE = ".compose-env-state.json"
+HEALTH_TIMEOUT = 300
+HEALTH_POLL_INTERVAL = 2
+
+# Playbooks de validación y sus dependencias (playbook -> requisitos)
+PLAYBOOK_DEPENDENCIES = {
+    "ping.yml": [],
+    "setup-base.yml": ["ping.yml"],
+    "setup-webservers.yml": ["setup-base.yml"],
+}
+DEFAULT_JOBS = 4
+
+# Niveles de validación, de menor a mayor coste:
+#   static: checks en proceso, sin Docker (apto para el hook de git)
+#   lint:   static + linters externos instalados
+#   smoke:  lint + entorno Docker y ping.yml
+#   full:   lint + entorno Docker y todos los playbooks
+LEVELS = ["static", "lint", "smoke", "full"]
+DEFAULT_LEVEL = "full"
+SMOKE_PLAYBOOKS = ["ping.yml"]
+
+# Linters opcionales (se omiten si no están instalados); los patrones se expanden con glob
+LINTERS = {
+    "yamllint": ["yamllint", "."],
+    "ansible-lint": ["ansible-lint", "ansible-control/playbooks"],
+    "hadolint": ["hadolint", "ansible-control/Dockerfile", "centos9/Dockerfile"],
+    "shellcheck": ["shellcheck", "ansible-control/scripts/*.sh", "centos9/scripts/*.sh"],
+}
+
+HOOK_MARKER = "# ansible-lab pre-commit hook"
+HOOK_SCRIPT = f"""#!/bin/sh
+{HOOK_MARKER} (instalado por pre_commit_check.py --install-hook)
+exec python3 pre_commit_check.py --level static --staged
+"""
+
 CRITICAL_FILES = [
     "ansible-control/Dockerfile",
     "ansible-control/config/ansible.cfg",
@@ -65,49 +112,69 @@ class Logger:
 class PreCommitValidator:
     """Pre-commit validation checks"""
     
-    def __init__(self, skip_performance: bool = False, verbose: bool = False, docker_compose_cmd: Optional[str] = None):
+    def __init__(self, skip_performance: bool = False, verbose: bool = False, docker_compose_cmd: Optional[str] = None,
+                 jobs: int = DEFAULT_JOBS, changed_only: bool = False, level: str = DEFAULT_LEVEL,
+                 reuse_env: bool = False, staged: bool = False):
         self.errors = []
         self.warnings = []
         self.passed_checks = []
         self.logger = Logger(verbose)
         self.skip_performance = skip_performance
-        self.docker_compose_cmd = docker_compose_cmd or self._detect_docker_compose()
+        self._docker_compose_cmd = docker_compose_cmd
+        self.docker = Docker()
+        self.jobs = jobs
+        # Con staged solo cuenta el índice de git (hook pre-commit)
+        self.changed_only = changed_only or staged
+        self.staged = staged
+        # Sin pruebas de rendimiento no se ejecutan los playbooks largos
+        if skip_performance and level == "full":
+            level = "smoke"
+        self.level = level
+        self.reuse_env = reuse_env
+        self.environment_started = False
         self.project_root = Path.cwd()
 
+    @property
+    def docker_compose_cmd(self) -> str:
+        # Detección diferida: los niveles estáticos nunca invocan Docker
+        if self._docker_compose_cmd is None:
+            self._docker_compose_cmd = self._detect_docker_compose()
+        return self._docker_compose_cmd
+
     def _detect_docker_compose(self) -> str:
         """Detectar automáticamente el comando docker-compose disponible"""
-        commands_to_try = ["docker compose", "docker-compose"]
-        for cmd in commands_to_try:
-            try:
-                subprocess.run(cmd.split() + ["--version"], capture_output=True, check=True, text=True)
-                self.logger.debug(f"Comando docker-compose detectado: {cmd}")
-                return cmd
-            except (subprocess.CalledProcessError, FileNotFoundError):
-                continue
+        # Sondeo compartido y cacheado (o heredado de automation.py)
+        cmd = probe().compose
+        if cmd:
+            self.logger.debug(f"Comando docker-compose detectado: {cmd}")
+            return cmd
         self.logger.warning("No se pudo encontrar un comando docker-compose funcional.")
         return "docker-compose"
 
-    def run_command(self, command: List[str], capture_output: bool = True, **kwargs) -> subprocess.CompletedProcess:
-        """Run a shell command and return the result"""
+    def _echo(self, line: str, stream: str):
+        print(f"  {line}", flush=True)
+
+    def run_command(self, command: List[str], stream: bool = False, **kwargs) -> subprocess.CompletedProcess:
+        """Run a shell command and return the result.
+
+        Output is streamed line by line (shown live with stream=True or
+        --verbose) and only its tail is kept in the result.
+        """
         self.logger.debug(f"Ejecutando comando: {' '.join(command)}")
+        kwargs.setdefault("cwd", self.project_root)
         try:
-            result = subprocess.run(
-                command,
-                capture_output=capture_output,
-                text=True,
-                check=False,
-                cwd=kwargs.get("cwd", self.project_root),
-                **kwargs
-            )
-            if result.stdout and capture_output:
+            echo = self._echo if stream or self.logger.verbose else None
+            result = run_streaming(command, echo, **kwargs)
+            if result.stdout and not echo:
                 self.logger.debug(f"Salida del comando: {result.stdout.strip()}")
-            if result.stderr and capture_output:
+            if result.stderr and not echo:
                 self.logger.debug(f"Errores del comando: {result.stderr.strip()}")
             return result
         except Exception as e:
             self.logger.error(f"Excepción al ejecutar el comando: {e}")
             return subprocess.CompletedProcess(command, 1, "", str(e))
 
+    @span("check_critical_files")
     def check_critical_files(self) -> bool:
         """Verificar la existencia de archivos críticos"""
         self.logger.info("Verificando la existencia de archivos críticos...")
@@ -122,20 +189,130 @@ class PreCommitValidator:
             self.logger.error("Faltan archivos críticos.")
         return all_found
 
+    @span("docker_compose_up")
     def docker_compose_up(self) -> bool:
         """Levantar el entorno con Docker Compose"""
+        if self.reuse_env:
+            if HAS_YAML:
+                return self.reuse_environment()
+            self.logger.warning("PyYAML no disponible - no se puede reutilizar el entorno")
         self.logger.info("Levantando el entorno de Docker...")
         cmd = self.docker_compose_cmd.split() + ["up", "--build", "-d"]
-        result = self.run_command(cmd, capture_output=True)
+        self.environment_started = True
+        result = self.run_command(cmd, stream=True)
         if result.returncode == 0:
             self.logger.success("Entorno Docker iniciado correctamente.")
-            time.sleep(10)  # Esperar a que los servicios se inicien
-            return True
+            return self.wait_for_services(self.compose_services())
         else:
             self.errors.append(f"Error al levantar el entorno Docker: {result.stderr}")
             self.logger.error("No se pudo iniciar el entorno Docker.")
             return False
 
+    def compose_services(self) -> List[str]:
+        """Servicios definidos en docker-compose.yml"""
+        result = self.run_command(self.docker_compose_cmd.split() + ["config", "--services"])
+        return result.stdout.split() if result.returncode == 0 else []
+
+    def service_hashes(self) -> Dict[str, str]:
+        """Hash por servicio: su definición en docker-compose.yml más su contexto de build"""
+        with open(self.project_root / COMPOSE_FILE, "r", encoding="utf-8") as f:
+            services = (yaml.safe_load(f) or {}).get("services") or {}
+        context_hashes = {}
+        hashes = {}
+        for name, service in services.items():
+            digest = hashlib.sha256(json.dumps(service, sort_keys=True, default=str).encode())
+            build = service.get("build")
+            context = build if isinstance(build, str) else (build or {}).get("context")
+            if context:
+                # Los nodos comparten contexto: calcularlo una sola vez
+                path = str(self.project_root / context)
+                if path not in context_hashes:
+                    context_hashes[path] = hash_build_context(path)
+                digest.update(context_hashes[path].encode())
+            hashes[name] = digest.hexdigest()
+        return hashes
+
+    def _load_env_state(self) -> Dict[str, str]:
+        try:
+            with open(self.project_root / ENV_STATE_FILE, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return state.get("services", {}) if isinstance(state, dict) else {}
+
+    def _save_env_state(self, services: Dict[str, str]):
+        path = self.project_root / ENV_STATE_FILE
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"services": services}, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def running_services(self) -> List[str]:
+        cmd = self.docker_compose_cmd.split() + ["ps", "--services", "--filter", "status=running"]
+        result = self.run_command(cmd)
+        return result.stdout.split() if result.returncode == 0 else []
+
+    @span("reuse_environment")
+    def reuse_environment(self) -> bool:
+        """Reutilizar el entorno levantado en ejecuciones anteriores.
+
+        Solo se reconstruyen y recrean los servicios que no están en
+        ejecución o cuyo hash (definición + contexto de build) cambió
+        desde que se levantaron; el resto, con sus volúmenes y claves SSH,
+        se mantiene. El entorno no se baja al terminar.
+        """
+        hashes = self.service_hashes()
+        state = self._load_env_state()
+        running = set(self.running_services())
+        changed = [name for name, digest in hashes.items() if name not in running or state.get(name) != digest]
+        if not changed:
+            self.logger.success("Entorno reutilizado: ningún servicio cambió.")
+        else:
+            self.logger.info(f"Reconstruyendo servicios cambiados: {', '.join(changed)}")
+            cmd = self.docker_compose_cmd.split() + ["up", "--build", "-d", "--no-deps"] + changed
+            result = self.run_command(cmd, stream=True)
+            if result.returncode != 0:
+                self.errors.append(f"Error al levantar el entorno Docker: {result.stderr}")
+                self.logger.error("No se pudo actualizar el entorno Docker.")
+                return False
+        if not self.wait_for_services(list(hashes)):
+            return False
+        # Guardar solo con el entorno sano: si no, se recrea en la próxima ejecución
+        self._save_env_state(hashes)
+        return True
+
+    @span("wait_for_services")
+    def wait_for_services(self, services: List[str], timeout: float = HEALTH_TIMEOUT) -> bool:
+        """Esperar a los healthchecks de compose (o a que corran los servicios sin healthcheck)"""
+        self.logger.info("Esperando a que los servicios estén saludables...")
+        pending = {}
+        for service in services:
+            result = self.run_command(self.docker_compose_cmd.split() + ["ps", "-q", service])
+            container_ids = result.stdout.split()
+            pending[service] = container_ids[0] if container_ids else service
+
+        deadline = time.monotonic() + timeout
+        while True:
+            for service, container in list(pending.items()):
+                result = self.docker.health(container)
+                status = result.stdout.strip() if result.returncode == 0 else "missing"
+                if status in ("healthy", "running"):
+                    self.logger.debug(f"Servicio {service}: {status}")
+                    del pending[service]
+                elif status not in ("starting", "created", "restarting"):
+                    self.errors.append(f"El servicio {service} no está saludable ({status})")
+                    self.logger.error(f"El servicio {service} no está saludable ({status}).")
+                    return False
+            if not pending:
+                self.logger.success("Todos los servicios están saludables.")
+                return True
+            if time.monotonic() > deadline:
+                self.errors.append(f"Tiempo de espera agotado ({timeout}s) para: {', '.join(pending)}")
+                self.logger.error("Los servicios no pasaron sus healthchecks a tiempo.")
+                return False
+            time.sleep(HEALTH_POLL_INTERVAL)
+
+    @span("docker_compose_down")
     def docker_compose_down(self):
         """Detener el entorno de Docker Compose"""
         self.logger.info("Deteniendo el entorno de Docker...")
@@ -146,12 +323,17 @@ class PreCommitValidator:
     def run_playbook(self, playbook: str, inventory: str = "config/managed_nodes.yml") -> bool:
         """Ejecutar un playbook de Ansible"""
         self.logger.info(f"Ejecutando playbook: {playbook}...")
-        cmd = self.docker_compose_cmd.split() + [
-            "exec", "-T", "ansible-control",
-            "ansible-playbook", f"playbooks/{playbook}",
-            "-i", inventory
-        ]
-        result = self.run_command(cmd, capture_output=True)
+        playbook_cmd = ["ansible-playbook", f"playbooks/{playbook}", "-i", inventory]
+        with span("run_playbook", playbook=playbook) as phase:
+            if self.docker.use_api:
+                # Exec directo por la API de Docker, sin lanzar docker compose
+                self.logger.debug(f"Ejecutando vía Docker API: {' '.join(playbook_cmd)}")
+                result = self.docker.exec(CONTROL_CONTAINER, playbook_cmd, workdir=CONTROL_WORKDIR,
+                                          timeout=PLAYBOOK_TIMEOUT, echo=self._echo)
+            else:
+                cmd = self.docker_compose_cmd.split() + ["exec", "-T", CONTROL_CONTAINER] + playbook_cmd
+                result = self.run_command(cmd, stream=True)
+            phase["returncode"] = result.returncode
         if result.returncode == 0:
             self.logger.success(f"Playbook {playbook} ejecutado exitosamente.")
             return True
@@ -160,57 +342,149 @@ class PreCommitValidator:
             self.logger.error(f"Falló la ejecución del playbook {playbook}.")
             return False
 
+    @span("check_yaml_syntax")
     def check_yaml_syntax(self) -> bool:
-        """Validate YAML files syntax"""
+        """Validate YAML files syntax (only files changed since the last run are parsed)"""
         self.logger.info("Validating YAML files...")
         
         if not HAS_YAML:
             self.logger.warning("PyYAML not available - skipping YAML validation. Install with: pip install pyyaml")
             return True
         
-        all_valid = True
-        yaml_files = glob.glob("**/*.yml", recursive=True) + glob.glob("**/*.yaml", recursive=True)
+        paths = None
+        if self.changed_only:
+            paths = changed_yaml_files(str(self.project_root), staged=self.staged)
+            if paths is None:
+                self.logger.warning("git no disponible - validando todos los archivos YAML")
         
-        for yaml_file in yaml_files:
-            if os.path.exists(yaml_file):
-                try:
-                    with open(yaml_file, 'r', encoding='utf-8') as f:
-                        yaml.safe_load(f)
-                    self.passed_checks.append(f"✅ {yaml_file}: Valid YAML syntax")
-                except Exception as e:
-                    self.errors.append(f"❌ {yaml_file}: Invalid YAML - {e}")
-                    all_valid = False
+        all_valid = True
+        results = YamlValidator(str(self.project_root)).validate(paths)
+        for result in results:
+            if result.error is None:
+                self.passed_checks.append(f"✅ {result.path}: Valid YAML syntax")
             else:
-                self.warnings.append(f"⚠️ {yaml_file}: File not found")
+                self.errors.append(f"❌ {result.path}: Invalid YAML - {result.error}")
+                all_valid = False
         
+        cached = sum(1 for result in results if result.cached)
+        self.logger.debug(f"YAML: {len(results)} archivos, {cached} desde caché")
         return all_valid
 
+    @span("check_config_schema")
+    def check_config_schema(self) -> bool:
+        """Validar en proceso docker-compose.yml, ansible.cfg y los playbooks"""
+        self.logger.info("Validando esquema de docker-compose.yml, ansible.cfg y playbooks...")
+        if not HAS_YAML:
+            self.logger.warning("PyYAML no disponible - solo se valida ansible.cfg")
+
+        valid = True
+        for issue in run_static_checks(str(self.project_root)):
+            if issue.error:
+                self.errors.append(f"❌ {issue.path}: {issue.message}")
+                valid = False
+            else:
+                self.warnings.append(f"⚠️ {issue.path}: {issue.message}")
+        if valid:
+            self.passed_checks.append("✅ Esquema de configuración válido")
+        return valid
+
+    @span("check_playbook_semantics")
+    def check_playbook_semantics(self) -> bool:
+        """Analizar los playbooks contra el inventario generado, sin nodo de control"""
+        self.logger.info("Analizando playbooks (módulos, variables y grupos del inventario)...")
+        if not HAS_YAML:
+            self.logger.warning("PyYAML no disponible - omitiendo el análisis de playbooks")
+            return True
+        if not HAS_JINJA2:
+            self.warnings.append("⚠️ Jinja2 no disponible - no se comprueban variables indefinidas")
+
+        playbooks = None
+        if self.changed_only:
+            changed = changed_yaml_files(str(self.project_root), staged=self.staged)
+            # Un cambio en los nodos del inventario afecta a todos los playbooks
+            if changed is not None and NODES_FILE.replace(os.sep, "/") not in changed:
+                playbooks = [path for path in changed if Path(path).match(PLAYBOOK_GLOB)]
+
+        valid = True
+        for issue in PlaybookAnalyzer(str(self.project_root)).analyze(playbooks):
+            if issue.error:
+                self.errors.append(f"❌ {issue.path}: {issue.message}")
+                valid = False
+            else:
+                self.warnings.append(f"⚠️ {issue.path}: {issue.message}")
+        if valid:
+            self.passed_checks.append("✅ Análisis semántico de playbooks sin errores")
+        return valid
+
+    def run_linter(self, name: str) -> bool:
+        """Ejecutar un linter externo; se omite con un aviso si no está instalado"""
+        command = LINTERS[name]
+        if not shutil.which(command[0]):
+            self.warnings.append(f"⚠️ {name} no instalado - omitido")
+            return True
+        args = []
+        for arg in command:
+            if "*" in arg:
+                args += sorted(os.path.relpath(path, self.project_root)
+                               for path in glob.glob(str(self.project_root / arg)))
+            else:
+                args.append(arg)
+        with span("lint", linter=name):
+            result = self.run_command(args)
+        if result.returncode == 0:
+            self.passed_checks.append(f"✅ {name}: sin problemas")
+            return True
+        output = (result.stdout + result.stderr).strip()
+        self.errors.append(f"❌ {name} encontró problemas:\n{output}")
+        return False
+
+    def build_task_graph(self) -> TaskGraph:
+        """Grafo de tareas de validación para el nivel seleccionado.
+
+        Los checks estáticos no dependen de nada y corren en paralelo con
+        los linters y el arranque del entorno; cada playbook espera a sus
+        dependencias declaradas en PLAYBOOK_DEPENDENCIES. Los playbooks se
+        ejecutan por la conexión persistente a la API de Docker, sin un
+        proceso docker compose exec por playbook.
+        """
+        rank = LEVELS.index(self.level)
+        graph = TaskGraph()
+        graph.add("yaml_syntax", self.check_yaml_syntax)
+        graph.add("critical_files", self.check_critical_files)
+        graph.add("config_schema", self.check_config_schema)
+        graph.add("playbook_semantics", self.check_playbook_semantics)
+        if rank >= LEVELS.index("lint"):
+            for name in LINTERS:
+                graph.add(f"lint:{name}", lambda name=name: self.run_linter(name))
+        if rank >= LEVELS.index("smoke"):
+            # No levantar un entorno con una configuración inválida; el análisis
+            # semántico solo informa y no bloquea la ejecución de los playbooks
+            graph.add("compose_up", self.docker_compose_up, ["critical_files", "config_schema"])
+            playbooks = SMOKE_PLAYBOOKS if self.level == "smoke" else list(PLAYBOOK_DEPENDENCIES)
+            for playbook in playbooks:
+                graph.add(playbook, lambda playbook=playbook: self.run_playbook(playbook),
+                          ["compose_up"] + PLAYBOOK_DEPENDENCIES[playbook])
+        return graph
+
+    @span("pre_commit_checks")
     def run_all_checks(self) -> bool:
         """Run all pre-commit checks"""
-        self.logger.info("🚀 Starting pre-commit validation...")
+        self.logger.info(f"🚀 Starting pre-commit validation (level: {self.level})...")
         
-        # Static checks
-        self.check_yaml_syntax()
-        
-        # Phase 1 validation logic
-        if not self.check_critical_files():
-            # No continuar si faltan archivos esenciales
-            return False 
-
-        if not self.docker_compose_up():
-            self.docker_compose_down()
-            return False
-
-        success = True
+        graph = self.build_task_graph()
         try:
-            if not self.run_playbook("ping.yml"):
-                success = False
-            if success and not self.run_playbook("setup-base.yml"):
-                success = False
-            if success and not self.run_playbook("setup-webservers.yml"):
-                success = False
+            results = graph.run(self.jobs)
         finally:
-            self.docker_compose_down()
+            # compose_up puede haber fallado a medias: bajar el entorno si se intentó levantar
+            if self.environment_started:
+                self.docker_compose_down()
+
+        skipped = [name for name, result in results.items() if result == TaskGraph.SKIPPED]
+        if skipped:
+            self.warnings.append(f"⚠️ Omitido por dependencias fallidas: {', '.join(skipped)}")
+        if results.get("critical_files") == TaskGraph.FAILED:
+            # No continuar si faltan archivos esenciales
+            return False
 
         self.print_summary()
         return not self.errors
@@ -242,20 +516,57 @@ class PreCommitValidator:
         print("="*50 + "\n")
 
 
+def install_git_hook(project_root: Path) -> bool:
+    """Instalar el hook pre-commit de git que ejecuta el nivel estático"""
+    logger = Logger()
+    result = subprocess.run(["git", "rev-parse", "--git-path", "hooks"], capture_output=True, text=True,
+                            cwd=project_root, check=False)
+    if result.returncode != 0:
+        logger.error("No es un repositorio git.")
+        return False
+    hook_path = project_root / result.stdout.strip() / "pre-commit"
+    if hook_path.exists() and HOOK_MARKER not in hook_path.read_text(encoding="utf-8", errors="replace"):
+        logger.error(f"Ya existe un hook pre-commit distinto en {hook_path}; no se sobrescribe.")
+        return False
+    hook_path.parent.mkdir(parents=True, exist_ok=True)
+    hook_path.write_text(HOOK_SCRIPT, encoding="utf-8")
+    hook_path.chmod(0o755)
+    logger.success(f"Hook pre-commit instalado en {hook_path}")
+    return True
+
+
 def main():
     """Main function to run the validator"""
     Colors.init()
     parser = argparse.ArgumentParser(description="Phase 1 Local Validation Script")
-    parser.add_argument("--skip-performance", action="store_true", help="Omitir tests de rendimiento")
+    parser.add_argument("--level", choices=LEVELS, default=DEFAULT_LEVEL,
+                        help="Nivel de validación: static y lint no usan Docker (default: %(default)s)")
+    parser.add_argument("--skip-performance", action="store_true",
+                        help="Omitir los playbooks largos (limita el nivel full a smoke)")
     parser.add_argument("--verbose", action="store_true", help="Mostrar salida detallada")
     parser.add_argument("--docker-compose", help="Especificar comando docker-compose (auto-detectado)")
+    parser.add_argument("--changed-only", action="store_true", help="Validar solo los YAML modificados según git")
+    parser.add_argument("--staged", action="store_true",
+                        help="Validar solo los YAML preparados para commit (usado por el hook)")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS, help="Tareas de validación en paralelo (default: %(default)s)")
+    parser.add_argument("--install-hook", action="store_true", help="Instalar el hook pre-commit de git (nivel static)")
+    parser.add_argument("--reuse-env", action="store_true",
+                        help="Mantener el entorno entre ejecuciones y recrear solo los servicios cambiados")
     
     args = parser.parse_args()
 
+    if args.install_hook:
+        sys.exit(0 if install_git_hook(Path.cwd()) else 1)
+
     validator = PreCommitValidator(
         skip_performance=args.skip_performance,
         verbose=args.verbose,
-        docker_compose_cmd=args.docker_compose
+        docker_compose_cmd=args.docker_compose,
+        jobs=args.jobs,
+        changed_only=args.changed_only,
+        staged=args.staged,
+        level=args.level,
+        reuse_env=args.reuse_env
     )
     
     if not validator.run_all_checks():
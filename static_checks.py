@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+==================================
+Static Configuration Checks
+In-process schema checks of docker-compose.yml, ansible.cfg and playbooks
+==================================
+"""
+
+import configparser
+import glob
+import os
+import re
+from typing import Dict, List, NamedTuple, Optional, Set
+
+from yaml_validation import HAS_YAML
+
+if HAS_YAML:
+    import yaml
+    from yaml_validation import SAFE_LOADER
+
+COMPOSE_FILE = "docker-compose.yml"
+ANSIBLE_CFG = "ansible-control/config/ansible.cfg"
+PLAYBOOK_GLOB = "ansible-control/playbooks/*.yml"
+
+COMPOSE_TOP_LEVEL_KEYS = {"version", "name", "services", "volumes", "networks", "configs", "secrets"}
+# [host_ip:][host_port:]container_port[/protocol], ports may be ranges
+PORT_PATTERN = re.compile(r"^(?:(?:[\d.]+|\[[0-9a-fA-F:]+\]):)?(?:\d+(?:-\d+)?:)?\d+(?:-\d+)?(?:/(?:tcp|udp|sctp))?$")
+HEALTHCHECK_TEST_KINDS = {"CMD", "CMD-SHELL", "NONE"}
+
+ANSIBLE_CFG_SECTIONS = {
+    "defaults", "inventory", "privilege_escalation", "paramiko_connection", "ssh_connection",
+    "persistent_connection", "connection", "colors", "diff", "galaxy", "selinux", "jinja2",
+}
+ANSIBLE_CFG_INTEGERS = {"forks", "timeout", "fact_caching_timeout", "poll_interval"}
+ANSIBLE_CFG_BOOLEANS = {
+    "host_key_checking", "retry_files_enabled", "bin_ansible_callbacks", "become", "become_ask_pass",
+    "pipelining", "gather_facts", "nocows", "nocolor", "force_color",
+}
+ANSIBLE_CFG_CHOICES = {
+    "gathering": {"implicit", "explicit", "smart"},
+    "become_method": {"sudo", "su", "pbrun", "pfexec", "doas", "dzdo", "ksu", "runas", "machinectl", "enable"},
+}
+ANSIBLE_CFG_DEPRECATED = {"callback_whitelist": "callbacks_enabled"}
+
+PLAY_KEYWORDS = {
+    "name", "hosts", "gather_facts", "gather_subset", "gather_timeout", "become", "become_user", "become_method",
+    "become_flags", "become_exe", "vars", "vars_files", "vars_prompt", "tasks", "pre_tasks", "post_tasks",
+    "handlers", "roles", "tags", "serial", "strategy", "connection", "remote_user", "port", "environment",
+    "any_errors_fatal", "max_fail_percentage", "ignore_errors", "ignore_unreachable", "order", "force_handlers",
+    "module_defaults", "collections", "check_mode", "diff", "no_log", "run_once", "throttle", "timeout",
+    "debugger", "fact_path",
+}
+IMPORT_PLAYBOOK_KEYS = {"import_playbook", "ansible.builtin.import_playbook"}
+TASK_LISTS = ("pre_tasks", "tasks", "post_tasks", "handlers")
+BLOCK_SECTIONS = ("block", "rescue", "always")
+TASK_KEYWORDS = {
+    "name", "when", "register", "notify", "listen", "tags", "loop", "loop_control", "vars", "args",
+    "ignore_errors", "ignore_unreachable", "changed_when", "failed_when", "until", "retries", "delay",
+    "delegate_to", "delegate_facts", "run_once", "environment", "no_log", "check_mode", "diff", "async",
+    "poll", "become", "become_user", "become_method", "become_flags", "become_exe", "any_errors_fatal",
+    "module_defaults", "collections", "connection", "remote_user", "port", "throttle", "timeout", "debugger",
+}
+
+
+class Issue(NamedTuple):
+    path: str
+    message: str
+    error: bool = True
+
+
+def _load_yaml(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.load(f, Loader=SAFE_LOADER)
+
+
+def as_list(value) -> List:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _names(value) -> List[str]:
+    """Names from a compose list-or-mapping field (depends_on, networks)"""
+    if isinstance(value, dict):
+        return list(value)
+    return [str(item) for item in as_list(value)]
+
+
+def check_compose(root: str = ".", compose_file: str = COMPOSE_FILE) -> List[Issue]:
+    """Structure of a compose file: services, build contexts, ports and
+    references to other services, volumes and networks"""
+    path = os.path.join(root, compose_file)
+    try:
+        data = _load_yaml(path)
+    except Exception as e:
+        return [Issue(compose_file, f"cannot be loaded: {e}")]
+    if not isinstance(data, dict):
+        return [Issue(compose_file, "top level must be a mapping")]
+
+    issues = []
+    for key in data:
+        if key not in COMPOSE_TOP_LEVEL_KEYS and not str(key).startswith("x-"):
+            issues.append(Issue(compose_file, f"unknown top-level key '{key}'"))
+    services = data.get("services")
+    if not isinstance(services, dict) or not services:
+        issues.append(Issue(compose_file, "'services' must be a non-empty mapping"))
+        return issues
+    volumes = set(data.get("volumes") or {})
+    networks = set(data.get("networks") or {}) | {"default"}
+    compose_dir = os.path.dirname(path)
+    host_ports: Dict[str, str] = {}
+    container_names: Dict[str, str] = {}
+
+    for name, service in services.items():
+        where = f"services.{name}"
+        if not isinstance(service, dict):
+            issues.append(Issue(compose_file, f"{where} must be a mapping"))
+            continue
+        if "image" not in service and "build" not in service:
+            issues.append(Issue(compose_file, f"{where} needs 'image' or 'build'"))
+
+        build = service.get("build")
+        if build is not None:
+            if isinstance(build, str):
+                build = {"context": build}
+            context = build.get("context", ".") if isinstance(build, dict) else None
+            if not isinstance(context, str):
+                issues.append(Issue(compose_file, f"{where}.build must be a path or a mapping with 'context'"))
+            elif "://" not in context:
+                context_dir = os.path.join(compose_dir, context)
+                dockerfile = build.get("dockerfile", "Dockerfile")
+                if not os.path.isdir(context_dir):
+                    issues.append(Issue(compose_file, f"{where}.build.context '{context}' does not exist"))
+                elif not os.path.isfile(os.path.join(context_dir, dockerfile)):
+                    issues.append(Issue(compose_file, f"{where}.build.dockerfile '{dockerfile}' not found in {context}"))
+
+        container_name = service.get("container_name")
+        if container_name:
+            if container_name in container_names:
+                issues.append(Issue(compose_file, f"{where}.container_name '{container_name}' "
+                                                  f"already used by {container_names[container_name]}"))
+            container_names[container_name] = name
+
+        for port in as_list(service.get("ports")):
+            if isinstance(port, dict):
+                published = port.get("published")
+                if "target" not in port:
+                    issues.append(Issue(compose_file, f"{where}.ports entry without 'target'"))
+            elif not PORT_PATTERN.match(str(port)):
+                issues.append(Issue(compose_file, f"{where}.ports entry '{port}' is not valid"))
+                continue
+            else:
+                parts = str(port).split("/")[0].rsplit(":", 2)
+                published = parts[-2] if len(parts) > 1 else None
+            if published:
+                published = str(published)
+                if published in host_ports:
+                    issues.append(Issue(compose_file, f"{where} publishes host port {published} "
+                                                      f"already published by {host_ports[published]}"))
+                host_ports[published] = name
+
+        for dependency in _names(service.get("depends_on")):
+            if dependency == name:
+                issues.append(Issue(compose_file, f"{where} depends on itself"))
+            elif dependency not in services:
+                issues.append(Issue(compose_file, f"{where}.depends_on references unknown service '{dependency}'"))
+
+        for network in _names(service.get("networks")):
+            if network not in networks:
+                issues.append(Issue(compose_file, f"{where}.networks references undeclared network '{network}'"))
+
+        for volume in as_list(service.get("volumes")):
+            if isinstance(volume, dict):
+                if volume.get("type", "volume") != "volume":
+                    continue
+                source = volume.get("source")
+            else:
+                # Anonymous volumes have no source; paths are bind mounts
+                parts = str(volume).split(":")
+                source = parts[0] if len(parts) > 1 else None
+            if source and not source.startswith((".", "/", "~", "$")) and source not in volumes:
+                issues.append(Issue(compose_file, f"{where}.volumes references undeclared volume '{source}'"))
+
+        environment = service.get("environment")
+        if environment is not None and not isinstance(environment, (dict, list)):
+            issues.append(Issue(compose_file, f"{where}.environment must be a list or a mapping"))
+
+        healthcheck = service.get("healthcheck")
+        if isinstance(healthcheck, dict) and isinstance(healthcheck.get("test"), list):
+            kind = healthcheck["test"][0] if healthcheck["test"] else None
+            if kind not in HEALTHCHECK_TEST_KINDS:
+                issues.append(Issue(compose_file, f"{where}.healthcheck.test must start with "
+                                                  f"{', '.join(sorted(HEALTHCHECK_TEST_KINDS))}"))
+    return issues
+
+
+def check_ansible_cfg(root: str = ".", cfg_file: str = ANSIBLE_CFG) -> List[Issue]:
+    """ansible.cfg parses and its known options have valid values"""
+    path = os.path.join(root, cfg_file)
+    issues = []
+    parser = configparser.ConfigParser(interpolation=None, inline_comment_prefixes=(";",))
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+    except OSError as e:
+        return [Issue(cfg_file, f"cannot be read: {e}")]
+    try:
+        parser.read_string(content, source=cfg_file)
+    except (configparser.DuplicateOptionError, configparser.DuplicateSectionError) as e:
+        # Ansible keeps the last value; report it and check the rest
+        issues.append(Issue(cfg_file, e.message, error=False))
+        parser = configparser.ConfigParser(interpolation=None, inline_comment_prefixes=(";",), strict=False)
+        parser.read_string(content, source=cfg_file)
+    except configparser.Error as e:
+        return [Issue(cfg_file, str(e))]
+
+    if not parser.has_section("defaults"):
+        issues.append(Issue(cfg_file, "missing [defaults] section"))
+    for section in parser.sections():
+        if section not in ANSIBLE_CFG_SECTIONS and not section.startswith("callback_"):
+            issues.append(Issue(cfg_file, f"unknown section [{section}]", error=False))
+        for option, value in parser.items(section):
+            where = f"[{section}] {option}"
+            if option in ANSIBLE_CFG_INTEGERS:
+                try:
+                    if int(value) < 0:
+                        issues.append(Issue(cfg_file, f"{where} must not be negative"))
+                except ValueError:
+                    issues.append(Issue(cfg_file, f"{where} = {value!r} is not an integer"))
+            elif option in ANSIBLE_CFG_BOOLEANS and value.lower() not in parser.BOOLEAN_STATES:
+                issues.append(Issue(cfg_file, f"{where} = {value!r} is not a boolean"))
+            elif option in ANSIBLE_CFG_CHOICES and value not in ANSIBLE_CFG_CHOICES[option]:
+                choices = ", ".join(sorted(ANSIBLE_CFG_CHOICES[option]))
+                issues.append(Issue(cfg_file, f"{where} = {value!r} is not one of: {choices}"))
+            if option in ANSIBLE_CFG_DEPRECATED:
+                issues.append(Issue(cfg_file, f"{where} is deprecated, use "
+                                              f"{ANSIBLE_CFG_DEPRECATED[option]}", error=False))
+    return issues
+
+
+def task_actions(task: Dict) -> List[str]:
+    """Keys of a task that are not keywords, i.e. its module (should be one)"""
+    return [key for key in task if key not in TASK_KEYWORDS and not str(key).startswith("with_")]
+
+
+def _check_tasks(tasks, where: str, path: str, issues: List[Issue], notified: Set[str]):
+    if tasks is None:
+        return
+    if not isinstance(tasks, list):
+        issues.append(Issue(path, f"{where} must be a list of tasks"))
+        return
+    for index, task in enumerate(tasks):
+        task_where = f"{where}[{index}]"
+        if not isinstance(task, dict):
+            issues.append(Issue(path, f"{task_where} must be a mapping"))
+            continue
+        if "name" in task:
+            task_where = f"{where}[{index}] '{task['name']}'"
+        notified.update(str(handler) for handler in as_list(task.get("notify")))
+        if "block" in task:
+            for section in BLOCK_SECTIONS:
+                _check_tasks(task.get(section), f"{task_where}.{section}", path, issues, notified)
+            continue
+        actions = task_actions(task)
+        if not actions:
+            issues.append(Issue(path, f"{task_where} has no module or action"))
+        elif len(actions) > 1:
+            issues.append(Issue(path, f"{task_where} has conflicting actions: {', '.join(map(str, actions))}"))
+
+
+def _handler_names(handlers) -> Set[str]:
+    names = set()
+    for handler in handlers if isinstance(handlers, list) else []:
+        if isinstance(handler, dict):
+            names.update(str(name) for name in as_list(handler.get("name")))
+            names.update(str(topic) for topic in as_list(handler.get("listen")))
+    return names
+
+
+def check_playbook(root: str, playbook: str) -> List[Issue]:
+    """Play and task structure of a playbook, and notified handlers exist"""
+    try:
+        data = _load_yaml(os.path.join(root, playbook))
+    except Exception as e:
+        return [Issue(playbook, f"cannot be loaded: {e}")]
+    if not isinstance(data, list) or not data:
+        return [Issue(playbook, "a playbook must be a non-empty list of plays")]
+
+    issues = []
+    for index, play in enumerate(data):
+        where = f"play[{index}]"
+        if not isinstance(play, dict):
+            issues.append(Issue(playbook, f"{where} must be a mapping"))
+            continue
+        if IMPORT_PLAYBOOK_KEYS & set(play):
+            continue
+        if "name" in play:
+            where = f"play[{index}] '{play['name']}'"
+        if not play.get("hosts"):
+            issues.append(Issue(playbook, f"{where} has no 'hosts'"))
+        for key in play:
+            if key not in PLAY_KEYWORDS:
+                issues.append(Issue(playbook, f"{where}: '{key}' is not a valid play keyword"))
+        notified: Set[str] = set()
+        for section in TASK_LISTS:
+            _check_tasks(play.get(section), f"{where}.{section}", playbook, issues, notified)
+        for handler in sorted(notified - _handler_names(play.get("handlers"))):
+            issues.append(Issue(playbook, f"{where} notifies undefined handler '{handler}'"))
+    return issues
+
+
+def find_playbooks(root: str = ".", pattern: str = PLAYBOOK_GLOB) -> List[str]:
+    return sorted(os.path.relpath(path, root) for path in glob.glob(os.path.join(root, pattern)))
+
+
+def run_static_checks(root: str = ".", playbooks: Optional[List[str]] = None) -> List[Issue]:
+    """Every schema check; needs PyYAML for the YAML based ones"""
+    issues = check_ansible_cfg(root)
+    if HAS_YAML:
+        issues += check_compose(root)
+        for playbook in find_playbooks(root) if playbooks is None else playbooks:
+            issues += check_playbook(root, playbook)
+    return issues
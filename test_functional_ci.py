@@ -11,262 +11,337 @@ import sys
 import time
 import os
 import json
+import argparse
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
 
-from utils import Colors
+from container_pool import ContainerPool
+from docker_api import WAIT_FAILED, Docker
+from toolchain import probe
+from utils import LOG_DIR, Colors, hash_build_context, read_ssh_banner, run_streaming, span
+
+# Container modes: "ci" sets CI=true so the entrypoint starts sshd
+# directly (fallback mode), "systemd" boots the container with systemd
+MODES = ("ci", "systemd")
+
+BUILD_CONTEXT = "./centos9"
+IMAGE_REPOSITORY = "centos9-ansible"
+# Stable tag kept pointing at the last image used, for manual runs
+IMAGE_ALIAS = f"{IMAGE_REPOSITORY}:test"
+# Local BuildKit cache directory (empty disables cache import/export)
+BUILD_CACHE_DIR = os.environ.get("FUNCTIONAL_BUILD_CACHE", "")
+
+# Opt-in warm container pool (also --pool)
+USE_POOL = os.environ.get("FUNCTIONAL_POOL", "").lower() in ("1", "true", "yes")
+
+# In-container probe that reports every health signal as one JSON object
+HEALTH_PROBE = ["/usr/local/bin/health-check.sh", "--json"]
+
+_print_lock = threading.Lock()
 
 class DockerTestRunner:
     """Main class for running Docker tests in CI mode"""
     
-    def __init__(self):
-        self.container_name = "test-functional"
-        self.image_name = "centos9-ansible:test"
-        self.ssh_port = "2299"
+    def __init__(self, container_name: str = "test-functional", ssh_port: Optional[str] = "2299",
+                 mode: str = "ci", log_prefix: str = "", docker: Optional[Docker] = None,
+                 image_name: str = IMAGE_ALIAS, build_cache_dir: str = BUILD_CACHE_DIR,
+                 use_pool: bool = False):
+        if mode not in MODES:
+            raise ValueError(f"Unknown container mode: {mode}")
+        self.container_name = container_name
+        self.image_name = image_name
+        self.build_cache_dir = build_cache_dir
+        # Warm pool mode: containers are checked out and returned, not
+        # started and removed (see container_pool.py)
+        self.use_pool = use_pool
+        self.pool: Optional[ContainerPool] = None
+        self.from_pool = False
+        # None lets Docker pick a free host port (resolved after start)
+        self.ssh_port = ssh_port
+        self.mode = mode
+        self.log_prefix = log_prefix
+        self.time_to_ready: Optional[float] = None
+        # Engine API access (CLI fallback); runners in a matrix share one
+        self.docker = docker or Docker()
+
+    def print_status(self, message: str, color: str = Colors.NC):
+        """Print a colored status message, prefixed when running in a matrix"""
+        prefix = f"[{self.log_prefix}] " if self.log_prefix else ""
+        with _print_lock:
+            print(f"{prefix}{color}{message}{Colors.NC}")
         
-    def run_command(self, command: List[str], capture_output: bool = True, timeout: int = 30) -> subprocess.CompletedProcess:
-        """Run a shell command and return the result"""
+    def echo(self, line: str, stream: str = "stdout"):
+        """Echo one line of streamed command output"""
+        prefix = f"[{self.log_prefix}] " if self.log_prefix else ""
+        with _print_lock:
+            print(f"{prefix}  {line}", flush=True)
+
+    def run_command(self, command: List[str], stream: bool = False, timeout: int = 30,
+                    spill_path: Optional[str] = None) -> subprocess.CompletedProcess:
+        """Run a shell command and return the result.
+
+        Output is read line by line; with stream=True it is shown live.
+        Only a bounded tail is kept in the result, the full output goes
+        to spill_path when given.
+        """
         try:
-            result = subprocess.run(
-                command,
-                capture_output=capture_output,
-                text=True,
-                timeout=timeout,
-                check=False
-            )
+            result = run_streaming(command, self.echo if stream else None, timeout=timeout, spill_path=spill_path)
+            if result.returncode == 124:
+                self.print_status(f"❌ Command timed out after {timeout} seconds", Colors.RED)
             return result
-        except subprocess.TimeoutExpired:
-            print(f"{Colors.RED}❌ Command timed out after {timeout} seconds{Colors.NC}")
-            return subprocess.CompletedProcess(command, 124, "", "Command timed out")
         except Exception as e:
-            print(f"{Colors.RED}❌ Command failed: {e}{Colors.NC}")
+            self.print_status(f"❌ Command failed: {e}", Colors.RED)
             return subprocess.CompletedProcess(command, 1, "", str(e))
 
-    def build_image(self) -> bool:
-        """Build the Docker image"""
-        print(f"{Colors.YELLOW}🏗️ Building Docker image...{Colors.NC}")
+    @span("build_image")
+    def build_image(self, force: bool = False) -> bool:
+        """Build the Docker image, tagged by the hash of its build context.
+
+        When an image for the current context hash already exists the
+        build is skipped. With a build cache directory the build goes
+        through buildx and imports/exports the BuildKit cache there.
+        """
+        context_hash = hash_build_context(BUILD_CONTEXT)[:16]
+        self.image_name = f"{IMAGE_REPOSITORY}:ctx-{context_hash}"
         
-        result = self.run_command(["docker", "build", "-t", self.image_name, "./centos9"], timeout=300)
+        if not force and self.docker.image_exists(self.image_name):
+            self.print_status(f"✅ Image {self.image_name} is up to date, skipping build", Colors.GREEN)
+            self.docker.tag(self.image_name, IMAGE_ALIAS)
+            return True
+        
+        self.print_status(f"🏗️ Building Docker image {self.image_name}...", Colors.YELLOW)
+        command = self._build_command()
+        build_log = os.path.join(LOG_DIR, f"build-{context_hash}.log")
+        result = self.run_command(command, stream=True, timeout=300, spill_path=build_log)
         
         if result.returncode != 0:
-            print(f"{Colors.RED}❌ Failed to build Docker image{Colors.NC}")
-            print(result.stderr)
+            self.print_status(f"❌ Failed to build Docker image (full log: {build_log})", Colors.RED)
             return False
         
-        print(f"{Colors.GREEN}✅ Docker image built successfully{Colors.NC}")
+        if self.build_cache_dir:
+            self._rotate_build_cache()
+        self.print_status("✅ Docker image built successfully", Colors.GREEN)
         return True
 
+    def _build_command(self) -> List[str]:
+        tags = ["-t", self.image_name, "-t", IMAGE_ALIAS]
+        if not self.build_cache_dir:
+            return ["docker", "build"] + tags + [BUILD_CONTEXT]
+        if self.run_command(["docker", "buildx", "version"]).returncode != 0:
+            self.print_status("⚠️ docker buildx not available, building without the local cache", Colors.YELLOW)
+            return ["docker", "build"] + tags + [BUILD_CONTEXT]
+        command = ["docker", "buildx", "build", "--load"] + tags
+        if os.path.isdir(self.build_cache_dir):
+            command += ["--cache-from", f"type=local,src={self.build_cache_dir}"]
+        command += ["--cache-to", f"type=local,dest={self.build_cache_dir}.new,mode=max", BUILD_CONTEXT]
+        return command
+
+    def _rotate_build_cache(self):
+        """Replace the cache with the one just exported.
+
+        The local exporter never prunes, so writing to a new directory and
+        swapping keeps the cache from growing with every build.
+        """
+        new_cache = f"{self.build_cache_dir}.new"
+        if not os.path.isdir(new_cache):
+            return
+        shutil.rmtree(self.build_cache_dir, ignore_errors=True)
+        os.replace(new_cache, self.build_cache_dir)
+
+    @span("start_container")
     def start_container(self) -> bool:
         """Start container with CI environment variables"""
-        print(f"{Colors.YELLOW}🚀 Starting container in CI mode...{Colors.NC}")
+        if self.use_pool:
+            self.pool = ContainerPool(self.docker, self.image_name, self.mode)
+            warm = self.pool.acquire()
+            if warm:
+                self.container_name, self.ssh_port, self.from_pool = warm, None, True
+                self.print_status(f"♻️ Reusing warm container {warm} from the pool", Colors.CYAN)
+                return self._resolve_ssh_port()
+            # Pool containers always get a Docker-assigned port
+            self.container_name, self.ssh_port = self.pool.new_container_name(), None
+        
+        self.print_status(f"🚀 Starting container in {self.mode} mode...", Colors.YELLOW)
         
         # Stop and remove existing container if it exists
-        self.run_command(["docker", "stop", self.container_name])
-        self.run_command(["docker", "rm", self.container_name])
+        self.docker.stop(self.container_name)
+        self.docker.remove(self.container_name)
         
-        command = [
-            "docker", "run", "-d", "--name", self.container_name,
-            "-p", f"{self.ssh_port}:22",
-            "-e", "CI=true",
-            "-e", "GITHUB_ACTIONS=true",
+        options = ["-p", f"{self.ssh_port}:22" if self.ssh_port else "22"]
+        if self.pool:
+            options += self.pool.run_options()
+        if self.mode == "ci":
+            options += ["-e", "CI=true", "-e", "GITHUB_ACTIONS=true"]
+        options += [
             "--privileged",
             "--tmpfs", "/tmp",
             "--tmpfs", "/run",
             "--tmpfs", "/run/lock",
             "-v", "/sys/fs/cgroup:/sys/fs/cgroup:ro",
-            self.image_name
         ]
+        image = self.pool.run_image() if self.pool else self.image_name
         
-        result = self.run_command(command)
+        result = self.run_command(["docker", "run", "-d", "--name", self.container_name] + options + [image])
         
         if result.returncode != 0:
-            print(f"{Colors.RED}❌ Failed to start container{Colors.NC}")
-            print(result.stderr)
-            return False
-        
-        print(f"{Colors.GREEN}✅ Container started successfully{Colors.NC}")
-        return True
-
-    def wait_for_container_ready(self) -> bool:
-        """Wait for container to be ready using CI-compatible logic"""
-        print(f"{Colors.YELLOW}⏳ Waiting for container to start...{Colors.NC}")
-        time.sleep(10)
-        
-        # Check if container is running
-        result = self.run_command(["docker", "ps", "--filter", f"name={self.container_name}", "--format", "{{.Status}}"])
-        
-        if not result.stdout or "Up" not in result.stdout:
-            print(f"{Colors.RED}❌ Container is not running properly{Colors.NC}")
-            self.show_container_logs()
+            self.print_status("❌ Failed to start container", Colors.RED)
+            self.print_status(result.stderr)
             return False
+        if self.pool:
+            # The pool starts this container's replacements with the same options
+            self.pool.add(self.container_name, options)
         
-        print(f"{Colors.GREEN}✅ Container is running: {result.stdout.strip()}{Colors.NC}")
-        
-        # Wait for container initialization using corrected logic
-        print(f"{Colors.YELLOW}⏳ Waiting for container initialization...{Colors.NC}")
-        
-        # Check if we're in CI fallback mode (no systemd)
-        systemd_check = self.run_command([
-            "docker", "exec", self.container_name, 
-            "test", "-f", "/run/systemd/system"
-        ])
-        
-        if systemd_check.returncode == 0:
-            print(f"{Colors.CYAN}🔧 Detected systemd mode{Colors.NC}")
-            return self._wait_systemd_mode()
-        else:
-            print(f"{Colors.CYAN}🔧 Detected fallback mode (no systemd){Colors.NC}")
-            return self._wait_fallback_mode()
-
-    def _wait_systemd_mode(self) -> bool:
-        """Wait for systemd to be ready"""
-        for i in range(24):  # 2 minutes max
-            result = self.run_command([
-                "docker", "exec", self.container_name,
-                "systemctl", "is-system-running"
-            ])
-            
-            if result.stdout and any(status in result.stdout for status in ["running", "degraded"]):
-                print(f"{Colors.GREEN}✅ Systemd is ready{Colors.NC}")
-                break
-            
-            print(f"System status: {result.stdout.strip() if result.stdout else 'starting'}")
-            time.sleep(5)
-        else:
-            print(f"{Colors.RED}❌ Container initialization timeout{Colors.NC}")
-            self.show_container_logs()
+        if not self.ssh_port and not self._resolve_ssh_port():
             return False
         
-        return self._wait_ssh_service()
-
-    def _wait_fallback_mode(self) -> bool:
-        """Wait for SSH daemon in fallback mode"""
-        for i in range(24):  # 2 minutes max
-            result = self.run_command([
-                "docker", "exec", self.container_name, "pgrep", "sshd"
-            ])
-            
-            if result.returncode == 0:
-                print(f"{Colors.GREEN}✅ SSH daemon is running{Colors.NC}")
-                break
-            
-            print("SSH process status: starting")
-            time.sleep(5)
-        else:
-            print(f"{Colors.RED}❌ Container initialization timeout in fallback mode{Colors.NC}")
-            self.show_container_logs()
-            return False
-        
-        return self._wait_ssh_service()
+        self.print_status(f"✅ Container started successfully (SSH on port {self.ssh_port})", Colors.GREEN)
+        return True
 
-    def _wait_ssh_service(self) -> bool:
-        """Wait for SSH service to be listening"""
-        print(f"{Colors.YELLOW}⏳ Waiting for SSH service...{Colors.NC}")
-        
-        for i in range(20):  # 1 minute max
-            result = self.run_command([
-                "docker", "exec", self.container_name,
-                "netstat", "-tlnp"
-            ])
-            
-            if result.stdout and ":22 " in result.stdout:
-                print(f"{Colors.GREEN}✅ SSH port 22 is listening{Colors.NC}")
+    def _resolve_ssh_port(self) -> bool:
+        """Read the host port Docker published for the container's port 22"""
+        result = self.docker.port(self.container_name, "22/tcp")
+        for line in (result.stdout or "").splitlines():
+            port = line.rsplit(":", 1)[-1].strip()
+            if port.isdigit():
+                self.ssh_port = port
                 return True
-            
-            print("SSH port status: not_listening")
-            time.sleep(3)
-        
-        print(f"{Colors.RED}❌ SSH service failed to start{Colors.NC}")
+        self.print_status("❌ Could not determine the published SSH port", Colors.RED)
+        return False
+
+    @span("wait_for_container_ready")
+    def wait_for_container_ready(self, timeout: float = 120) -> bool:
+        """Wait until sshd answers on the published port.
+
+        The published port is probed for an SSH banner with a short
+        backoff, so this returns as soon as the container is usable. A
+        background wait on the container ends the loop early if it
+        exits. The time to ready is kept in self.time_to_ready.
+        """
+        self.print_status("⏳ Waiting for container to be ready...", Colors.YELLOW)
+        start = time.monotonic()
+        exit_watch = self.docker.watch_exit(self.container_name)
+        delay = 0.1
+        try:
+            while time.monotonic() - start < timeout:
+                banner = read_ssh_banner("127.0.0.1", int(self.ssh_port))
+                if banner:
+                    self.time_to_ready = time.monotonic() - start
+                    self.print_status(f"✅ SSH is answering on port {self.ssh_port}: {banner}", Colors.GREEN)
+                    self.print_status(f"⏱️ Time to ready: {self.time_to_ready:.2f}s", Colors.CYAN)
+                    return True
+
+                exit_code = exit_watch.poll()
+                if exit_code == WAIT_FAILED:
+                    self.print_status("❌ Could not wait on the container (missing or daemon error)", Colors.RED)
+                    self.show_container_logs()
+                    return False
+                if exit_code is not None:
+                    self.print_status(f"❌ Container exited before becoming ready (exit code: {exit_code})", Colors.RED)
+                    self.show_container_logs()
+                    return False
+
+                time.sleep(delay)
+                delay = min(delay * 2, 1.0)
+        finally:
+            exit_watch.stop()
+
+        self.print_status(f"❌ Container initialization timeout after {timeout:.0f}s", Colors.RED)
+        self.show_container_logs()
         self.show_ssh_status()
         return False
 
+    def probe_health(self) -> Optional[Dict]:
+        """Collect the container health signals with a single exec.
+
+        Returns the JSON reported by `health-check.sh --json` (systemd,
+        sshd_state, sshd_running, port_22_listening, ...) or None when the
+        probe could not run or its output is not valid JSON.
+        """
+        result = self.docker.exec(self.container_name, HEALTH_PROBE)
+        try:
+            health = json.loads(result.stdout)
+        except (TypeError, ValueError):
+            self.print_status(f"❌ Health probe failed: {(result.stderr or result.stdout).strip()}", Colors.RED)
+            return None
+        return health if isinstance(health, dict) else None
+
+    @span("test_ssh_service")
     def test_ssh_service(self) -> bool:
         """Test SSH service (compatible with both modes)"""
-        print(f"{Colors.YELLOW}🔐 Testing SSH service...{Colors.NC}")
+        self.print_status("🔐 Testing SSH service...", Colors.YELLOW)
         
-        # Check if we're in fallback mode or systemd mode
-        systemd_check = self.run_command([
-            "docker", "exec", self.container_name,
-            "test", "-f", "/run/systemd/system"
-        ])
+        health = self.probe_health()
+        if health is None:
+            return False
         
-        if systemd_check.returncode == 0:
-            print(f"{Colors.CYAN}🔧 Testing SSH in systemd mode{Colors.NC}")
-            result = self.run_command([
-                "docker", "exec", self.container_name,
-                "systemctl", "is-active", "sshd"
-            ])
-            
-            if result.stdout and result.stdout.strip() == "active":
-                print(f"{Colors.GREEN}✅ SSH service is active{Colors.NC}")
+        # Check if we're in fallback mode or systemd mode
+        if health.get("systemd"):
+            self.print_status("🔧 Testing SSH in systemd mode", Colors.CYAN)
+            if health.get("sshd_state") == "active":
+                self.print_status("✅ SSH service is active", Colors.GREEN)
             else:
-                print(f"{Colors.RED}❌ SSH service is not active: {result.stdout.strip()}{Colors.NC}")
+                self.print_status(f"❌ SSH service is not active: {health.get('sshd_state')}", Colors.RED)
                 return False
         else:
-            print(f"{Colors.CYAN}🔧 Testing SSH in fallback mode{Colors.NC}")
-            result = self.run_command([
-                "docker", "exec", self.container_name, "pgrep", "sshd"
-            ])
-            
-            if result.returncode == 0:
-                print(f"{Colors.GREEN}✅ SSH daemon is running{Colors.NC}")
+            self.print_status("🔧 Testing SSH in fallback mode", Colors.CYAN)
+            if health.get("sshd_running"):
+                self.print_status("✅ SSH daemon is running", Colors.GREEN)
             else:
-                print(f"{Colors.RED}❌ SSH daemon is not running{Colors.NC}")
+                self.print_status("❌ SSH daemon is not running", Colors.RED)
                 return False
         
         # Test SSH port listening (works in both modes)
-        result = self.run_command([
-            "docker", "exec", self.container_name,
-            "netstat", "-tlnp"
-        ])
-        
-        if result.stdout and ":22 " in result.stdout:
-            print(f"{Colors.GREEN}✅ SSH port 22 is listening{Colors.NC}")
+        if health.get("port_22_listening"):
+            self.print_status("✅ SSH port 22 is listening", Colors.GREEN)
             return True
         else:
-            print(f"{Colors.RED}❌ SSH port 22 is not listening{Colors.NC}")
+            self.print_status("❌ SSH port 22 is not listening", Colors.RED)
             return False
 
     def show_container_logs(self):
         """Show container logs for debugging"""
-        print(f"{Colors.YELLOW}📋 Container logs:{Colors.NC}")
-        result = self.run_command(["docker", "logs", self.container_name])
-        if result.stdout:
-            print(result.stdout)
-        if result.stderr:
-            print(result.stderr)
+        self.print_status("📋 Container logs:", Colors.YELLOW)
+        self.docker.logs(self.container_name, echo=self.echo)
 
     def show_ssh_status(self):
         """Show SSH service status for debugging"""
-        print(f"{Colors.YELLOW}📋 SSH service status:{Colors.NC}")
-        
-        # Check SSH process
-        result = self.run_command([
-            "docker", "exec", self.container_name, "pgrep", "sshd"
-        ])
-        if result.returncode != 0:
-            print("SSH daemon not running")
+        self.print_status("📋 SSH service status:", Colors.YELLOW)
         
-        # Check SSH port
-        result = self.run_command([
-            "docker", "exec", self.container_name,
-            "netstat", "-tlnp"
-        ])
-        if result.stdout and ":22 " not in result.stdout:
-            print("SSH port not listening")
-
-    def cleanup(self):
-        """Clean up test resources"""
-        print(f"{Colors.YELLOW}🧹 Cleaning up...{Colors.NC}")
-        self.run_command(["docker", "stop", self.container_name])
-        self.run_command(["docker", "rm", self.container_name])
-
-    def run_all_tests(self) -> bool:
+        health = self.probe_health()
+        if health is None:
+            return
+        self.print_status(json.dumps(health, indent=2))
+        if not health.get("sshd_running"):
+            self.print_status("SSH daemon not running")
+        if not health.get("port_22_listening"):
+            self.print_status("SSH port not listening")
+
+    @span("cleanup")
+    def cleanup(self, passed: bool = False):
+        """Clean up test resources (or hand the container back to the pool)"""
+        if self.pool:
+            self.print_status("♻️ Returning container to the pool...", Colors.YELLOW)
+            self.pool.release(self.container_name, healthy=passed)
+            return
+        self.print_status("🧹 Cleaning up...", Colors.YELLOW)
+        self.docker.stop(self.container_name)
+        self.docker.remove(self.container_name)
+
+    def run_all_tests(self, build: bool = True, rebuild: bool = False) -> bool:
         """Run all tests and return success status"""
+        with span("functional_test", mode=self.mode, container=self.container_name) as phase:
+            phase["passed"] = self._run_all_tests(build, rebuild)
+            return phase["passed"]
+
+    def _run_all_tests(self, build: bool, rebuild: bool) -> bool:
+        passed = False
         try:
-            print(f"{Colors.GREEN}🔧 Testing Functional Tests in CI Mode...{Colors.NC}")
+            self.print_status(f"🔧 Testing Functional Tests in {self.mode} mode...", Colors.GREEN)
             
             # Build image
-            if not self.build_image():
+            if build and not self.build_image(force=rebuild):
                 return False
             
             # Start container
@@ -277,6 +352,10 @@ class DockerTestRunner:
             if not self.wait_for_container_ready():
                 return False
             
+            # Snapshot the first booted pool container for faster replacements
+            if self.pool and not self.from_pool and self.pool.snapshot(self.container_name):
+                self.print_status(f"📸 Saved booted snapshot {self.pool.snapshot_image}", Colors.CYAN)
+            
             # Test SSH service
             if not self.test_ssh_service():
                 return False
@@ -284,34 +363,115 @@ class DockerTestRunner:
             # Show final logs for verification
             self.show_container_logs()
             
-            print(f"{Colors.GREEN}🎉 Functional test completed successfully!{Colors.NC}")
+            self.print_status("🎉 Functional test completed successfully!", Colors.GREEN)
+            passed = True
             return True
             
         except KeyboardInterrupt:
-            print(f"{Colors.YELLOW}⚠️ Test interrupted by user{Colors.NC}")
+            self.print_status("⚠️ Test interrupted by user", Colors.YELLOW)
             return False
         except Exception as e:
-            print(f"❌ Test failed with error: {e}", Colors.RED)
+            self.print_status(f"❌ Test failed with error: {e}", Colors.RED)
             return False
         finally:
-            self.cleanup()
+            self.cleanup(passed)
+
+@span("functional_matrix")
+def run_matrix(modes: List[str], replicas: int, workers: Optional[int] = None,
+               build_cache_dir: str = BUILD_CACHE_DIR, rebuild: bool = False, use_pool: bool = False) -> bool:
+    """Run the functional test on several containers at once.
+
+    Builds the image once, then starts `replicas` containers per mode
+    with unique names and Docker-assigned SSH ports, drives them with a
+    worker pool and prints an aggregated pass/fail and timing report.
+    """
+    docker = Docker()
+    builder = DockerTestRunner(docker=docker, build_cache_dir=build_cache_dir)
+    if not builder.build_image(force=rebuild):
+        return False
+
+    runners = [
+        DockerTestRunner(
+            container_name=f"test-functional-{os.getpid()}-{mode}-{replica}",
+            ssh_port=None,
+            mode=mode,
+            log_prefix=f"{mode}-{replica}",
+            docker=docker,
+            image_name=builder.image_name,
+            use_pool=use_pool
+        )
+        for mode in modes
+        for replica in range(1, replicas + 1)
+    ]
+
+    def run_one(runner: DockerTestRunner) -> Dict:
+        start = time.monotonic()
+        passed = runner.run_all_tests(build=False)
+        return {
+            "name": runner.log_prefix,
+            "passed": passed,
+            "time_to_ready": runner.time_to_ready,
+            "duration": time.monotonic() - start,
+        }
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers or len(runners)) as pool:
+        results = list(pool.map(run_one, runners))
+    wall_time = time.monotonic() - start
+
+    print("\n" + "=" * 60)
+    print(f"{Colors.BLUE}📊 Functional test matrix report{Colors.NC}")
+    print("=" * 60)
+    for result in results:
+        status = f"{Colors.GREEN}PASS{Colors.NC}" if result["passed"] else f"{Colors.RED}FAIL{Colors.NC}"
+        ready = f"{result['time_to_ready']:.1f}s" if result["time_to_ready"] is not None else "-"
+        print(f"  {result['name']:<16} {status}  ready {ready:>7}  total {result['duration']:6.1f}s")
+    passed = sum(1 for result in results if result["passed"])
+    print("-" * 60)
+    print(f"  {passed}/{len(results)} passed, wall time {wall_time:.1f}s "
+          f"(sum of runs {sum(result['duration'] for result in results):.1f}s)")
+    print("=" * 60)
+    return passed == len(results)
 
 def main():
     """Main entry point"""
     Colors.init()
-    # Check if Docker is available
-    try:
-        result = subprocess.run(["docker", "--version"], capture_output=True, text=True)
-        if result.returncode != 0:
-            print(f"{Colors.RED}❌ Docker is not available or not running{Colors.NC}")
-            sys.exit(1)
-    except FileNotFoundError:
+    parser = argparse.ArgumentParser(description="Reproduce the CI functional test locally")
+    parser.add_argument("--matrix", action="store_true", help="Run several containers concurrently")
+    parser.add_argument("--modes", default="ci,systemd",
+                        help="Comma separated container modes for --matrix (default: %(default)s)")
+    parser.add_argument("--replicas", type=int, default=1, help="Containers per mode for --matrix")
+    parser.add_argument("--workers", type=int, help="Concurrent containers for --matrix (default: all)")
+    parser.add_argument("--build-cache", default=BUILD_CACHE_DIR, metavar="DIR",
+                        help="Import/export the BuildKit cache to DIR (default: $FUNCTIONAL_BUILD_CACHE)")
+    parser.add_argument("--rebuild", action="store_true", help="Build the image even if it is up to date")
+    parser.add_argument("--pool", action="store_true", default=USE_POOL,
+                        help="Reuse warm containers between runs (default: $FUNCTIONAL_POOL)")
+    parser.add_argument("--pool-drain", action="store_true", help="Remove idle pool containers and exit")
+    args = parser.parse_args()
+
+    # Check if Docker is available (cached probe, or the one automation.py passed down)
+    if probe().versions.get("docker") is None:
         print(f"{Colors.RED}❌ Docker is not installed{Colors.NC}")
         sys.exit(1)
     
+    if args.pool_drain:
+        removed = ContainerPool.drain(Docker())
+        print(f"{Colors.GREEN}✅ Removed {len(removed)} pool container(s){Colors.NC}")
+        sys.exit(0)
+    
     # Run tests
-    runner = DockerTestRunner()
-    success = runner.run_all_tests()
+    if args.matrix:
+        modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+        unknown = [mode for mode in modes if mode not in MODES]
+        if unknown or not modes:
+            print(f"{Colors.RED}❌ Unknown container mode(s): {', '.join(unknown) or args.modes}{Colors.NC}")
+            sys.exit(1)
+        success = run_matrix(modes, max(1, args.replicas), args.workers, args.build_cache, args.rebuild,
+                             args.pool)
+    else:
+        runner = DockerTestRunner(build_cache_dir=args.build_cache, use_pool=args.pool)
+        success = runner.run_all_tests(rebuild=args.rebuild)
     
     sys.exit(0 if success else 1)
 
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+==================================
+Benchmark Script Tests
+With fake docker and ansible-playbook binaries
+==================================
+"""
+
+import json
+import os
+import stat
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from benchmark import find_regressions, percentile  # noqa: E402
+
+FAKE_DOCKER = """#!/bin/sh
+# Every compose subcommand (version, up, down, build) succeeds at once
+exit 0
+"""
+FAKE_ANSIBLE_PLAYBOOK = """#!/bin/sh
+sleep "${FAKE_PLAYBOOK_SECONDS:-0}"
+"""
+
+
+def _summary(median: float):
+    return {"playbook:site.yml": {"median": median, "p95": median, "runs": 1}}
+
+
+class BenchmarkFunctionsTest(unittest.TestCase):
+
+    def test_percentile_nearest_rank(self):
+        samples = [5.0, 1.0, 4.0, 2.0, 3.0]
+        self.assertEqual(percentile(samples, 50), 3.0)
+        self.assertEqual(percentile(samples, 95), 5.0)
+        self.assertEqual(percentile(samples, 0), 1.0)
+        self.assertEqual(percentile([7.0], 95), 7.0)
+
+    def test_find_regressions(self):
+        history = [{"summary": _summary(median)} for median in (100.0, 1.0, 1.2, 0.8, 1.0, 1.1)]
+        # Baseline: median of the last 5 runs (1.0); the 100s outlier has aged out
+        self.assertEqual(find_regressions(_summary(1.15), history, threshold=0.2), [])
+        regressions = find_regressions(_summary(1.5), history, threshold=0.2)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("playbook:site.yml", regressions[0])
+        self.assertIn("+50%", regressions[0])
+
+    def test_metrics_without_history_never_regress(self):
+        self.assertEqual(find_regressions(_summary(9.0), [{"summary": {}}], threshold=0.2), [])
+
+
+class BenchmarkRunTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        # A local ansible-playbook runs from ./ansible-control
+        os.mkdir(os.path.join(self.tmp_dir.name, "ansible-control"))
+        self.history = os.path.join(self.tmp_dir.name, "history.jsonl")
+        self.env = dict(os.environ,
+                        BENCH_DOCKER=self._script("docker", FAKE_DOCKER),
+                        BENCH_ANSIBLE_PLAYBOOK=self._script("ansible-playbook", FAKE_ANSIBLE_PLAYBOOK))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _script(self, name: str, content: str) -> str:
+        path = os.path.join(self.tmp_dir.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+        return path
+
+    def _bench(self, playbook_seconds: float, *args: str) -> int:
+        env = dict(self.env, FAKE_PLAYBOOK_SECONDS=str(playbook_seconds))
+        return subprocess.run(
+            [sys.executable, os.path.join(ROOT_DIR, "benchmark.py"), "--iterations", "1", "--no-build",
+             "--playbooks", "site.yml", "--threshold", "3", "--history", self.history, *args],
+            cwd=self.tmp_dir.name, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False
+        ).returncode
+
+    def _history(self):
+        with open(self.history, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def test_regressions_fail_and_stay_out_of_the_baseline(self):
+        self.assertEqual(self._bench(0.05), 0)
+        self.assertEqual(self._bench(0.05), 0)
+        entries = self._history()
+        self.assertEqual(len(entries), 2)
+        self.assertEqual(set(entries[0]["summary"]), {"up_to_first_ping", "playbook:site.yml"})
+
+        self.assertEqual(self._bench(1.0), 1)
+        self.assertEqual(len(self._history()), 2)
+
+        self.assertEqual(self._bench(1.0, "--record-regressions"), 1)
+        self.assertEqual(len(self._history()), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+==================================
+Warm Container Pool Tests
+Against an in-memory Docker stand-in
+==================================
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from container_pool import POOL_LABEL, ContainerPool, PoolLockTimeout, _FileLock  # noqa: E402
+
+OPTIONS = ["-p", "22", "--privileged"]
+
+
+class FakeDocker:
+    """Keeps containers in a dict and records the calls the pool makes"""
+
+    def __init__(self):
+        self.containers: Dict[str, Dict] = {}
+        self.images = {"lab:1"}
+        self.runs: List[tuple] = []
+
+    def _done(self, returncode: int = 0) -> subprocess.CompletedProcess:
+        return subprocess.CompletedProcess(["docker"], returncode, "", "")
+
+    def run(self, name: str, image: str, options: List[str]) -> subprocess.CompletedProcess:
+        self.runs.append((name, image, options))
+        labels = dict(value.split("=", 1) for flag, value in zip(options, options[1:]) if flag == "--label")
+        self.containers[name] = {"name": name, "state": "running", "labels": labels}
+        return self._done()
+
+    def stop(self, name: str) -> subprocess.CompletedProcess:
+        if name in self.containers:
+            self.containers[name]["state"] = "exited"
+        return self._done()
+
+    def remove(self, name: str) -> subprocess.CompletedProcess:
+        return self._done(0 if self.containers.pop(name, None) else 1)
+
+    def list_containers(self, labels: Dict[str, str]) -> List[Dict]:
+        return [dict(container) for container in self.containers.values()
+                if all(container["labels"].get(key) == value for key, value in labels.items())]
+
+    def image_exists(self, name: str) -> bool:
+        return name in self.images
+
+    def commit(self, name: str, image: str) -> subprocess.CompletedProcess:
+        self.images.add(image)
+        return self._done()
+
+
+class ContainerPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.docker = FakeDocker()
+        self.pool = self._pool()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _pool(self, max_uses: int = 20) -> ContainerPool:
+        return ContainerPool(self.docker, "lab:1", "normal",
+                             state_file=os.path.join(self.tmp_dir.name, "pool.json"), max_uses=max_uses)
+
+    def _start(self, pool: ContainerPool) -> str:
+        name = pool.new_container_name()
+        options = OPTIONS + pool.run_options()
+        self.docker.run(name, pool.run_image(), options)
+        pool.add(name, options)
+        return name
+
+    def test_release_replaces_container_from_snapshot(self):
+        used = self._start(self.pool)
+        self.assertTrue(self.pool.snapshot(used))
+        replacement = self.pool.release(used, healthy=True)
+
+        self.assertIsNotNone(replacement)
+        self.assertNotIn(used, self.docker.containers)
+        self.assertEqual(self.docker.runs[-1], (replacement, self.pool.snapshot_image, OPTIONS + self.pool.run_options()))
+        self.assertEqual(self.docker.containers[replacement]["labels"][f"{POOL_LABEL}.mode"], "normal")
+        self.assertEqual(self.pool.acquire(), replacement)
+
+    def test_unhealthy_container_is_not_replaced(self):
+        used = self._start(self.pool)
+        self.assertIsNone(self.pool.release(used, healthy=False))
+        self.assertEqual(self.docker.containers, {})
+        self.assertIsNone(self.pool.acquire())
+
+    def test_slot_is_dropped_after_max_uses(self):
+        pool = self._pool(max_uses=2)
+        first = pool.release(self._start(pool), healthy=True)
+        self.assertIsNotNone(first)
+        self.assertEqual(pool.acquire(), first)
+        self.assertIsNone(pool.release(first, healthy=True))
+        self.assertEqual(self.docker.containers, {})
+
+    def test_lock_held_by_live_process_is_not_broken(self):
+        path = os.path.join(self.tmp_dir.name, "held.lock")
+        holder = subprocess.Popen(
+            [sys.executable, "-c",
+             "import sys, time; sys.path.insert(0, sys.argv[2]); from container_pool import _FileLock\n"
+             "with _FileLock(sys.argv[1]):\n    print('locked', flush=True); time.sleep(30)",
+             path, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))],
+            stdout=subprocess.PIPE, text=True)
+        try:
+            self.assertEqual(holder.stdout.readline().strip(), "locked")
+            with self.assertRaises(PoolLockTimeout):
+                with _FileLock(path, timeout=0.3):
+                    pass
+            # The OS releases the lock of a killed holder
+            holder.kill()
+            holder.wait()
+            with _FileLock(path, timeout=5):
+                pass
+        finally:
+            holder.kill()
+            holder.wait()
+            holder.stdout.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
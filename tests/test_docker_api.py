@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+==================================
+Docker Engine API Client Tests
+Against a fake daemon on a unix socket
+==================================
+"""
+
+import json
+import os
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docker_api import WAIT_FAILED, Docker, DockerAPIError, DockerClient  # noqa: E402
+
+
+class FakeDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Answers a few Engine API endpoints; /containers/hang/wait never does"""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str):
+        self.connections = 0
+        # Path -> number of requests received
+        self.hits = {}
+        self.wait_closed = threading.Event()
+        super().__init__(socket_path, FakeDaemonHandler)
+
+
+class FakeDaemonHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def _drop(self) -> bool:
+        """Close the connection without answering the first request to /drop/*"""
+        hits = self.server.hits[self.path] = self.server.hits.get(self.path, 0) + 1
+        if self.path.startswith("/drop/") and hits == 1:
+            self.close_connection = True
+            return True
+        return False
+
+    def address_string(self) -> str:
+        return "fake"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: bytes = b"", content_type: str = "application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self._drop():
+            return
+        if self.path == "/_ping":
+            self._send(200, b"OK", "text/plain")
+        elif self.path == "/version":
+            self._send(200, json.dumps({"Version": "25.0.0"}).encode())
+        else:
+            self._send(404, json.dumps({"message": "No such container"}).encode())
+
+    def do_POST(self):
+        if self._drop():
+            return
+        if self.path == "/containers/done/wait":
+            self._send(200, json.dumps({"StatusCode": 3}).encode())
+        elif self.path == "/containers/hang/wait":
+            # Block until the client goes away
+            while self.rfile.read(1):
+                pass
+            self.server.wait_closed.set()
+            self.close_connection = True
+        else:
+            self._send(404, json.dumps({"message": "No such container"}).encode())
+
+
+class DockerAPITest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.tmp_dir.name, "docker.sock")
+        self.daemon = FakeDaemon(self.socket_path)
+        threading.Thread(target=self.daemon.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.daemon.shutdown()
+        self.daemon.server_close()
+        self.tmp_dir.cleanup()
+
+    def test_requests_reuse_connection(self):
+        client = DockerClient(self.socket_path)
+        self.assertTrue(client.ping())
+        self.assertEqual(client.version()["Version"], "25.0.0")
+        self.assertTrue(client.ping())
+        self.assertEqual(self.daemon.connections, 1)
+
+    def test_error_status(self):
+        client = DockerClient(self.socket_path)
+        with self.assertRaises(DockerAPIError) as raised:
+            client.inspect("missing")
+        self.assertEqual(raised.exception.status, 404)
+        self.assertEqual(str(raised.exception), "No such container")
+
+    def test_get_is_retried_after_dropped_connection(self):
+        client = DockerClient(self.socket_path)
+        self.assertEqual(client.request("GET", "/drop/info")[0], 404)
+        self.assertEqual(self.daemon.hits["/drop/info"], 2)
+
+    def test_post_is_not_retried_after_dropped_connection(self):
+        client = DockerClient(self.socket_path)
+        with self.assertRaises(DockerAPIError):
+            client.request("POST", "/drop/containers/web/start")
+        self.assertEqual(self.daemon.hits["/drop/containers/web/start"], 1)
+
+    def test_exit_watch_reports_wait_failure(self):
+        watch = Docker(self.socket_path).watch_exit("missing")
+        deadline = time.monotonic() + 5
+        while watch.poll() is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(watch.poll(), WAIT_FAILED)
+        watch.stop()
+
+    def test_exit_watch_reports_exit_code(self):
+        watch = Docker(self.socket_path).watch_exit("done")
+        deadline = time.monotonic() + 5
+        while watch.poll() is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(watch.poll(), 3)
+        watch.stop()
+
+    def test_exit_watch_stop_releases_thread_and_connection(self):
+        watch = Docker(self.socket_path).watch_exit("hang")
+        time.sleep(0.1)
+        self.assertIsNone(watch.poll())
+        watch.stop()
+        self.assertTrue(self.daemon.wait_closed.wait(5))
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and any(
+                thread.name == "exit-watch-hang" for thread in threading.enumerate()):
+            time.sleep(0.01)
+        self.assertFalse(any(thread.name == "exit-watch-hang" for thread in threading.enumerate()))
+        self.assertIsNone(watch.poll())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+==================================
+Inventory Discovery Tests
+Each source against a temp file, a fake daemon or a stubbed resolver
+==================================
+"""
+
+import json
+import os
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "ansible-control", "scripts"))
+
+from inventory_discovery import (  # noqa: E402
+    FALLBACK_HOSTS, DnsSweepSource, DockerSource, StaticFileSource, discover_hosts
+)
+
+
+class FakeDockerDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serves /containers/json from a fixed list and records the filters"""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, containers, status: int = 200):
+        self.containers = containers
+        self.status = status
+        self.filters = None
+        super().__init__(socket_path, FakeDockerHandler)
+
+
+class FakeDockerHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def address_string(self) -> str:
+        return "fake"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/containers/json":
+            self.server.filters = json.loads(parse_qs(url.query).get("filters", ["{}"])[0])
+            status, body = self.server.status, self.server.containers
+        else:
+            status, body = 404, {"message": "page not found"}
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class StaticFileSourceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "nodes.yml")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _write(self, text: str):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_yaml_inventory(self):
+        self._write("all:\n"
+                    "  vars:\n"
+                    "    hosts: [not-a-host]\n"
+                    "  children:\n"
+                    "    web:\n"
+                    "      hosts:\n"
+                    "        web-1: {server_id: 1}\n"
+                    "        web-2:\n"
+                    "    db:\n"
+                    "      hosts:\n"
+                    "        db-1: {server_id: 3}\n")
+        self.assertEqual(StaticFileSource(self.path).discover(),
+                         {"web-1": {"server_id": 1}, "web-2": {}, "db-1": {"server_id": 3}})
+
+    def test_plain_host_list(self):
+        self._write("- node-a\n- node-b\n")
+        self.assertEqual(list(StaticFileSource(self.path).discover()), ["node-a", "node-b"])
+
+    def test_missing_or_invalid_file(self):
+        self.assertEqual(StaticFileSource(self.path).discover(), {})
+        self._write("hosts: [unclosed\n")
+        self.assertEqual(StaticFileSource(self.path).discover(), {})
+
+
+class DockerSourceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.tmp_dir.name, "docker.sock")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _serve(self, containers, status: int = 200) -> FakeDockerDaemon:
+        daemon = FakeDockerDaemon(self.socket_path, containers, status)
+        threading.Thread(target=daemon.serve_forever, daemon=True).start()
+        self.addCleanup(daemon.server_close)
+        self.addCleanup(daemon.shutdown)
+        return daemon
+
+    def test_containers_by_label_and_network(self):
+        daemon = self._serve([{"Names": ["/centos9-node-1"]}, {"Names": ["/centos9-node-2", "/alias"]}, {"Names": []}])
+        source = DockerSource(self.socket_path, label="ansible.managed=true", network="lab")
+        self.assertEqual(source.discover(), {"centos9-node-1": {}, "centos9-node-2": {}})
+        self.assertEqual(daemon.filters, {"label": ["ansible.managed=true"], "network": ["lab"]})
+
+    def test_error_status(self):
+        self._serve({"message": "server error"}, status=500)
+        self.assertEqual(DockerSource(self.socket_path).discover(), {})
+
+    def test_missing_socket(self):
+        self.assertEqual(DockerSource(self.socket_path).discover(), {})
+
+
+class DnsSweepSourceTest(unittest.TestCase):
+
+    def test_name_pattern(self):
+        def getaddrinfo(host, port):
+            if host not in ("node-1", "node-3"):
+                raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+            return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("172.20.0.2", 0))]
+
+        with mock.patch("inventory_discovery.socket.getaddrinfo", side_effect=getaddrinfo):
+            hosts = DnsSweepSource(pattern="node-{}", max_index=5, workers=2).discover()
+        self.assertEqual(hosts, {"node-1": {}, "node-3": {}})
+
+    def test_reverse_cidr(self):
+        names = {"10.0.0.2": "web-1.ansible-network", "10.0.0.5": "db-1.ansible-network"}
+
+        def gethostbyaddr(address):
+            if address not in names:
+                raise socket.herror(1, "Unknown host")
+            return names[address], [], [address]
+
+        with mock.patch("inventory_discovery.socket.gethostbyaddr", side_effect=gethostbyaddr):
+            hosts = DnsSweepSource(cidr="10.0.0.0/29", workers=2).discover()
+        self.assertEqual(hosts, {"web-1": {}, "db-1": {}})
+
+    def test_cidr_too_large(self):
+        with self.assertRaises(ValueError):
+            DnsSweepSource(cidr="10.0.0.0/8").discover()
+
+
+class DiscoverHostsTest(unittest.TestCase):
+
+    class _Source:
+        def __init__(self, hosts):
+            self.hosts = hosts
+
+        def discover(self):
+            return self.hosts
+
+    def test_earlier_source_wins(self):
+        merged = discover_hosts([self._Source({"a": {"x": 1}}), self._Source({"b": {}, "a": {"x": 2, "y": 3}})])
+        self.assertEqual(merged, {"a": {"x": 1, "y": 3}, "b": {}})
+
+    def test_fallback_when_every_source_is_empty(self):
+        self.assertEqual(list(discover_hosts([self._Source({})])), FALLBACK_HOSTS)
+
+
+if __name__ == "__main__":
+    unittest.main()
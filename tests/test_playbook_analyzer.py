@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+==================================
+Playbook Analyzer Tests
+Cached results against the vars files a playbook reads
+==================================
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playbook_analyzer import HAS_JINJA2, Inventory, PlaybookAnalyzer  # noqa: E402
+
+PLAYBOOK = os.path.join("playbooks", "site.yml")
+INVENTORY = {os.path.join("inventory", "hosts.yml"): {"all": {"children": {"web": {"hosts": {"web-1": {}}}}}}}
+
+
+@unittest.skipUnless(HAS_JINJA2, "jinja2 is not installed")
+class PlaybookAnalyzerCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self.tmp_dir.name
+        self._write(PLAYBOOK, "- hosts: web\n"
+                              "  gather_facts: false\n"
+                              "  vars_files:\n"
+                              "    - vars/app.yml\n"
+                              "  tasks:\n"
+                              "    - ansible.builtin.debug:\n"
+                              "        msg: \"{{ app_port }} {{ app_user }}\"\n")
+        self._write(os.path.join("playbooks", "vars", "app.yml"), "app_port: 80\n")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _write(self, path: str, content: str):
+        path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def _undefined(self):
+        # A new analyzer per run, like each pre_commit_check.py invocation
+        issues = PlaybookAnalyzer(self.root, inventory=Inventory(INVENTORY)).analyze([PLAYBOOK])
+        return sorted(issue.message.rsplit(" ", 1)[-1] for issue in issues if "undefined variable" in issue.message)
+
+    def test_vars_file_edit_invalidates_cache(self):
+        self.assertEqual(self._undefined(), ["'app_user'"])
+        self._write(os.path.join("playbooks", "vars", "app.yml"), "app_port: 80\napp_user: www\n")
+        self.assertEqual(self._undefined(), [])
+        self._write(os.path.join("playbooks", "vars", "app.yml"), "app_user: www\n")
+        self.assertEqual(self._undefined(), ["'app_port'"])
+
+    def test_missing_vars_file_created_later(self):
+        os.remove(os.path.join(self.root, "playbooks", "vars", "app.yml"))
+        # Unreadable vars_files make the variables unknown, not undefined
+        self.assertEqual(self._undefined(), [])
+        self._write(os.path.join("playbooks", "vars", "app.yml"), "app_port: 80\n")
+        self.assertEqual(self._undefined(), ["'app_user'"])
+
+    def test_playbook_group_and_host_vars(self):
+        self.assertEqual(self._undefined(), ["'app_user'"])
+        self._write(os.path.join("playbooks", "group_vars", "web", "main.yml"), "app_user: www\n")
+        self.assertEqual(self._undefined(), [])
+        os.remove(os.path.join(self.root, "playbooks", "group_vars", "web", "main.yml"))
+        self._write(os.path.join("playbooks", "host_vars", "web-1.yml"), "app_user: www\n")
+        self.assertEqual(self._undefined(), [])
+        os.remove(os.path.join(self.root, "playbooks", "host_vars", "web-1.yml"))
+        self.assertEqual(self._undefined(), ["'app_user'"])
+
+
+if __name__ == "__main__":
+    unittest.main()
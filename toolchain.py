@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+==================================
+Toolchain Probe
+Cached detection of git, docker and docker compose
+==================================
+"""
+
+import hashlib
+import importlib.util
+import json
+import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
+
+# Probe results handed to child scripts (see Toolchain.child_env)
+TOOLCHAIN_ENV = "AUTOMATION_TOOLCHAIN"
+CACHE_FILE = os.environ.get("AUTOMATION_TOOLCHAIN_CACHE", ".toolchain-cache.json")
+CACHE_VERSION = 1
+TOOLS = ["git", "docker", "docker-compose"]
+# Candidate compose commands, in order of preference
+COMPOSE_COMMANDS = ["docker compose", "docker-compose"]
+PROBE_TIMEOUT = 30
+
+
+def _compose_plugin_dirs() -> List[str]:
+    """Where the docker CLI looks for the compose plugin"""
+    config_dir = os.environ.get("DOCKER_CONFIG", os.path.expanduser("~/.docker"))
+    return [os.path.join(config_dir, "cli-plugins"), "/usr/local/lib/docker/cli-plugins",
+            "/usr/local/libexec/docker/cli-plugins", "/usr/lib/docker/cli-plugins",
+            "/usr/libexec/docker/cli-plugins"]
+
+
+class Toolchain(NamedTuple):
+    key: str
+    # Tool -> first line of `<tool> --version`, None when unavailable
+    versions: Dict[str, Optional[str]]
+    compose: Optional[str]
+
+    @property
+    def has_yaml(self) -> bool:
+        # Depends on the interpreter, not on PATH: never cached
+        return importlib.util.find_spec("yaml") is not None
+
+    def child_env(self) -> Dict[str, str]:
+        """Environment that lets child scripts skip probing again"""
+        return {TOOLCHAIN_ENV: json.dumps(self._asdict())}
+
+
+def toolchain_key() -> str:
+    """Fingerprint of PATH and the tool binaries it resolves to.
+
+    Only stat() calls: a binary that is installed, removed, upgraded or
+    shadowed by another one on PATH changes the key.
+    """
+    digest = hashlib.sha256(f"{CACHE_VERSION}\0{os.environ.get('PATH', '')}\0".encode())
+    paths = [shutil.which(tool) for tool in TOOLS]
+    paths += [os.path.join(directory, "docker-compose") for directory in _compose_plugin_dirs()]
+    for path in paths:
+        try:
+            stat = os.stat(path) if path else None
+        except OSError:
+            stat = None
+        digest.update(f"{path}\0{stat.st_mtime_ns if stat else 0}\0{stat.st_size if stat else 0}\0".encode())
+    return digest.hexdigest()
+
+
+def _version(command: List[str]) -> Optional[str]:
+    try:
+        result = subprocess.run(command + ["--version"], capture_output=True, text=True,
+                                timeout=PROBE_TIMEOUT, check=False)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    lines = result.stdout.strip().splitlines()
+    return lines[0] if lines else ""
+
+
+def probe_tools(key: Optional[str] = None) -> Toolchain:
+    """Run the version probes (in parallel) without any cache"""
+    commands = {tool: [tool] for tool in ["git", "docker"]}
+    commands.update({compose: compose.split() for compose in COMPOSE_COMMANDS})
+    with ThreadPoolExecutor(max_workers=len(commands)) as pool:
+        results = dict(zip(commands, pool.map(_version, commands.values())))
+    compose = next((command for command in COMPOSE_COMMANDS if results[command] is not None), None)
+    return Toolchain(key or toolchain_key(), {"git": results["git"], "docker": results["docker"]}, compose)
+
+
+def _from_json(data: str, key: str) -> Optional[Toolchain]:
+    try:
+        toolchain = Toolchain(**json.loads(data))
+    except (TypeError, ValueError):
+        return None
+    return toolchain if toolchain.key == key else None
+
+
+def probe(cache_file: str = CACHE_FILE, refresh: bool = False) -> Toolchain:
+    """Toolchain of this machine, probing only when needed.
+
+    Results come from the parent process (TOOLCHAIN_ENV) or the cache
+    file when their key still matches PATH and the binaries; otherwise
+    the tools are probed and the cache is rewritten.
+    """
+    key = toolchain_key()
+    if not refresh:
+        toolchain = _from_json(os.environ.get(TOOLCHAIN_ENV, ""), key)
+        if toolchain is None:
+            try:
+                with open(cache_file, "r", encoding="utf-8") as f:
+                    toolchain = _from_json(f.read(), key)
+            except OSError:
+                toolchain = None
+        if toolchain is not None:
+            return toolchain
+
+    toolchain = probe_tools(key)
+    tmp_path = f"{cache_file}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(toolchain._asdict(), f)
+        os.replace(tmp_path, cache_file)
+    except OSError:
+        pass
+    return toolchain
@@ -6,7 +6,20 @@ Shared resources for automation scripts
 ==================================
 """
 
+import contextlib
+import fnmatch
+import hashlib
+import json
+import os
 import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional
 
 class Colors:
     """ANSI color codes for terminal output"""
@@ -29,3 +42,369 @@ class Colors:
                 for attr in dir(Colors):
                     if not attr.startswith("__") and isinstance(getattr(Colors, attr), str):
                         setattr(Colors, attr, "")
+
+
+def read_ssh_banner(host: str, port: int, timeout: float = 1.0) -> Optional[str]:
+    """Connect to host:port and return the SSH identification line.
+
+    Returns None if nothing answers with an SSH-2.0 banner within timeout.
+    Reading the banner (not just connecting) matters for published ports:
+    docker-proxy accepts connections even before sshd is listening.
+    """
+    try:
+        with socket.create_connection((host, port), timeout=timeout) as sock:
+            sock.settimeout(timeout)
+            banner = sock.recv(256)
+    except OSError:
+        return None
+    if banner.startswith(b"SSH-2.0-"):
+        return banner.split(b"\r\n", 1)[0].decode("ascii", "replace")
+    return None
+
+
+def _dockerignore_patterns(context: str) -> List[str]:
+    try:
+        with open(os.path.join(context, ".dockerignore"), "r", encoding="utf-8") as f:
+            lines = [line.strip() for line in f]
+    except OSError:
+        return []
+    return [line.rstrip("/") for line in lines if line and not line.startswith(("#", "!"))]
+
+
+def hash_build_context(context: str) -> str:
+    """SHA-256 of a Docker build context (paths, exec bits and contents).
+
+    Files matched by the context's .dockerignore are left out, so the
+    hash changes exactly when the files sent to the daemon change.
+    """
+    ignored = _dockerignore_patterns(context)
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(context):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            relative = os.path.relpath(path, context).replace(os.sep, "/")
+            if any(fnmatch.fnmatch(relative, pattern) or relative.startswith(pattern + "/")
+                   for pattern in ignored):
+                continue
+            executable = os.access(path, os.X_OK)
+            digest.update(f"{relative}\0{int(executable)}\0".encode())
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 16), b""):
+                    digest.update(chunk)
+            digest.update(b"\0")
+    return digest.hexdigest()
+
+
+# ===================================
+# Streaming process output
+# ===================================
+
+# Lines of each stream kept in memory; the rest is only echoed/spilled
+OUTPUT_TAIL_LINES = int(os.environ.get("AUTOMATION_OUTPUT_TAIL_LINES", "500"))
+# Where full logs of long commands are spilled
+LOG_DIR = os.environ.get("AUTOMATION_LOG_DIR", ".automation-logs")
+
+Echo = Callable[[str, str], None]
+
+
+def console_echo(line: str, stream: str):
+    """Echo a line to the console stream it came from"""
+    print(line, file=sys.stderr if stream == "stderr" else sys.stdout, flush=True)
+
+
+class OutputTee:
+    """Tee of process output, line by line, to an echo callback, a bounded
+    per-stream ring buffer and an optional spill file with the full log.
+
+    Memory stays bounded by max_lines per stream however long the output.
+    """
+
+    def __init__(self, echo: Optional[Echo] = None, max_lines: int = OUTPUT_TAIL_LINES,
+                 spill_path: Optional[str] = None):
+        self.echo = echo
+        self.spill_path = spill_path
+        self.tails: Dict[str, deque] = {"stdout": deque(maxlen=max_lines), "stderr": deque(maxlen=max_lines)}
+        self.line_counts = {"stdout": 0, "stderr": 0}
+        self._partial = {"stdout": "", "stderr": ""}
+        self._lock = threading.Lock()
+        self._spill = None
+        if spill_path:
+            os.makedirs(os.path.dirname(spill_path) or ".", exist_ok=True)
+            self._spill = open(spill_path, "w", encoding="utf-8")
+
+    def write(self, stream: str, text: str):
+        """Feed text (any chunking) from stream "stdout" or "stderr" """
+        text = self._partial[stream] + text
+        *lines, self._partial[stream] = text.split("\n")
+        for line in lines:
+            self._line(stream, line)
+
+    def _line(self, stream: str, line: str):
+        line = line.rstrip("\r")
+        with self._lock:
+            self.tails[stream].append(line + "\n")
+            self.line_counts[stream] += 1
+            if self._spill:
+                self._spill.write(line + "\n")
+            if self.echo:
+                self.echo(line, stream)
+
+    def close(self):
+        for stream, partial in self._partial.items():
+            if partial:
+                self._line(stream, partial)
+                self._partial[stream] = ""
+        if self._spill:
+            self._spill.close()
+            self._spill = None
+
+    def text(self, stream: str) -> str:
+        """The kept tail of a stream, noting how much was dropped"""
+        tail = self.tails[stream]
+        dropped = self.line_counts[stream] - len(tail)
+        if dropped <= 0:
+            return "".join(tail)
+        where = f", full log in {self.spill_path}" if self.spill_path else ""
+        return f"... ({dropped} earlier lines omitted{where})\n" + "".join(tail)
+
+
+def run_streaming(command: List[str], echo: Optional[Echo] = None, timeout: Optional[float] = None,
+                  spill_path: Optional[str] = None, max_lines: int = OUTPUT_TAIL_LINES,
+                  **popen_kwargs: Any) -> subprocess.CompletedProcess:
+    """Run a command, streaming its output instead of buffering it.
+
+    Both pipes are read line by line as the process writes them and fed
+    to an OutputTee, so output can be echoed live, memory stays bounded
+    and the full log can be spilled to a file. Returns a CompletedProcess
+    whose stdout/stderr hold the kept tails (returncode 124 on timeout).
+    """
+    tee = OutputTee(echo, max_lines, spill_path)
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                               errors="replace", bufsize=1, **popen_kwargs)
+
+    def pump(pipe, stream: str):
+        for line in iter(pipe.readline, ""):
+            tee.write(stream, line)
+        pipe.close()
+
+    readers = [threading.Thread(target=pump, args=(process.stdout, "stdout"), daemon=True),
+               threading.Thread(target=pump, args=(process.stderr, "stderr"), daemon=True)]
+    for reader in readers:
+        reader.start()
+    try:
+        returncode = process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+        returncode = 124
+    for reader in readers:
+        # Grandchildren may still hold the pipes after a kill
+        reader.join(timeout=5 if returncode == 124 else None)
+    tee.close()
+    stderr = tee.text("stderr") + ("Command timed out\n" if returncode == 124 else "")
+    return subprocess.CompletedProcess(command, returncode, tee.text("stdout"), stderr)
+
+
+# ===================================
+# Dependency-aware task scheduling
+# ===================================
+
+class TaskGraph:
+    """Run tasks concurrently as soon as their dependencies have passed.
+
+    A task is a callable returning True on success. When a task fails (or
+    raises), everything that depends on it is skipped without running;
+    independent tasks carry on. Total time follows the critical path.
+    """
+
+    PASSED, FAILED, SKIPPED = "passed", "failed", "skipped"
+
+    def __init__(self):
+        self.tasks: Dict[str, Callable[[], bool]] = {}
+        self.dependencies: Dict[str, List[str]] = {}
+
+    def add(self, name: str, func: Callable[[], bool], depends_on: Optional[List[str]] = None):
+        self.tasks[name] = func
+        self.dependencies[name] = list(depends_on or [])
+
+    def _check(self):
+        for name, deps in self.dependencies.items():
+            for dep in deps:
+                if dep not in self.tasks:
+                    raise ValueError(f"Task '{name}' depends on unknown task '{dep}'")
+        # Kahn's algorithm: every task must become ready at some point
+        remaining = {name: set(deps) for name, deps in self.dependencies.items()}
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Dependency cycle between: {', '.join(sorted(remaining))}")
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+
+    def run(self, max_workers: int = 4) -> Dict[str, str]:
+        """Run the graph and return {task: passed|failed|skipped}"""
+        self._check()
+        results: Dict[str, str] = {}
+        pending = dict(self.dependencies)
+        running = {}
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            while pending or running:
+                for name, deps in list(pending.items()):
+                    if any(results.get(dep) in (self.FAILED, self.SKIPPED) for dep in deps):
+                        results[name] = self.SKIPPED
+                        del pending[name]
+                    elif all(results.get(dep) == self.PASSED for dep in deps):
+                        running[pool.submit(self.tasks[name])] = name
+                        del pending[name]
+                if not running:
+                    # Only tasks blocked on skipped ones are left
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = self.PASSED if future.result() else self.FAILED
+                    except Exception:
+                        results[name] = self.FAILED
+        return results
+
+
+# ===================================
+# Timing instrumentation
+# ===================================
+
+# Directory where every process appends its spans (set by automation.py
+# for the scripts it runs); tracing is a no-op when it is unset
+TRACE_DIR_ENV = "AUTOMATION_TRACE_DIR"
+# Phase path ("a/b") of the parent process, so child spans nest under it
+TRACE_PARENT_ENV = "AUTOMATION_TRACE_PARENT"
+SPANS_FILE = "spans.jsonl"
+CHROME_TRACE_FILE = "trace.json"
+
+
+class Tracer:
+    """Nested phase timer.
+
+    span() records one JSON object per finished phase (name, parent,
+    depth, start and duration in microseconds, pid/tid, args) and appends
+    it as a line to <trace_dir>/spans.jsonl, so several processes can
+    share one trace directory. Spans nest per thread.
+    """
+
+    def __init__(self, trace_dir: Optional[str] = None, root: Optional[List[str]] = None):
+        self.trace_dir = trace_dir
+        self.root = root or []
+        self.records: List[Dict[str, Any]] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "Tracer":
+        parent = os.environ.get(TRACE_PARENT_ENV, "")
+        return cls(os.environ.get(TRACE_DIR_ENV) or None, [name for name in parent.split("/") if name])
+
+    def child_env(self) -> Dict[str, str]:
+        """Environment for a subprocess whose spans belong to the current phase"""
+        if not self.trace_dir:
+            return {}
+        return {TRACE_DIR_ENV: self.trace_dir, TRACE_PARENT_ENV: "/".join(self.root + self._stack())}
+
+    def _stack(self) -> List[str]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextlib.contextmanager
+    def span(self, name: str, **args: Any) -> Iterator[Dict[str, Any]]:
+        """Time the enclosed block as phase `name`.
+
+        Usable as a context manager or a decorator; the yielded dict can
+        be updated with extra args (e.g. the result) before the block ends.
+        """
+        stack = self._stack()
+        record: Dict[str, Any] = {
+            "name": name,
+            "parent": stack[-1] if stack else None,
+            "depth": len(stack),
+            "root": self.root,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": dict(args),
+        }
+        stack.append(name)
+        start_wall, start = time.time(), time.perf_counter()
+        try:
+            yield record["args"]
+        finally:
+            record["ts"] = int(start_wall * 1_000_000)
+            record["dur"] = int((time.perf_counter() - start) * 1_000_000)
+            stack.pop()
+            self._emit(record)
+
+    def _emit(self, record: Dict[str, Any]):
+        with self._lock:
+            self.records.append(record)
+            if not self.trace_dir:
+                return
+            try:
+                os.makedirs(self.trace_dir, exist_ok=True)
+                with open(os.path.join(self.trace_dir, SPANS_FILE), "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, default=str) + "\n")
+            except OSError:
+                pass
+
+
+def load_spans(trace_dir: str) -> List[Dict[str, Any]]:
+    """Read the spans every process wrote to trace_dir"""
+    records = []
+    try:
+        with open(os.path.join(trace_dir, SPANS_FILE), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return records
+
+
+def write_chrome_trace(records: List[Dict[str, Any]], path: str):
+    """Write spans as a Chrome trace (chrome://tracing, ui.perfetto.dev)"""
+    events = [
+        {"name": r["name"], "cat": "automation", "ph": "X", "ts": r["ts"], "dur": r["dur"],
+         "pid": r["pid"], "tid": r["tid"], "args": r.get("args", {})}
+        for r in sorted(records, key=lambda r: r["ts"])
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+def phase_breakdown(records: List[Dict[str, Any]]) -> List[str]:
+    """Indented per-phase lines (name, calls, total seconds) in start order"""
+    # Children are listed under their parent; equal paths are aggregated
+    by_path: Dict[tuple, Dict[str, Any]] = {}
+    paths = {}
+    for record in sorted(records, key=lambda r: (r["ts"], -r["dur"])):
+        key = (record["pid"], record["tid"])
+        stack = paths.setdefault(key, [])
+        while stack and stack[-1][1] <= record["ts"]:
+            stack.pop()
+        path = tuple(record.get("root", [])) + tuple(name for name, _ in stack) + (record["name"],)
+        stack.append((record["name"], record["ts"] + record["dur"]))
+        entry = by_path.setdefault(path, {"calls": 0, "dur": 0})
+        entry["calls"] += 1
+        entry["dur"] += record["dur"]
+    lines = []
+    for path, entry in by_path.items():
+        label = "  " * (len(path) - 1) + path[-1]
+        calls = f"x{entry['calls']}" if entry["calls"] > 1 else ""
+        lines.append(f"{label:<48} {calls:>5} {entry['dur'] / 1_000_000:9.2f}s")
+    return lines
+
+
+tracer = Tracer.from_env()
+span = tracer.span
@@ -15,7 +15,7 @@ from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Optional
 
-from utils import Colors
+from utils import Colors, console_echo, run_streaming, span
 
 class GitVersionControl:
     """Git version control automation"""
@@ -25,18 +25,10 @@ class GitVersionControl:
         self.branch = "main"
         self.project_root = Path.cwd()
         
-    def run_command(self, command: List[str], capture_output: bool = True, shell: bool = False) -> subprocess.CompletedProcess:
-        """Run a shell command and return the result"""
+    def run_command(self, command: List[str], stream: bool = False, shell: bool = False) -> subprocess.CompletedProcess:
+        """Run a shell command and return the result (output shown live with stream=True)"""
         try:
-            result = subprocess.run(
-                command,
-                capture_output=capture_output,
-                text=True,
-                check=False,
-                cwd=self.project_root,
-                shell=shell
-            )
-            return result
+            return run_streaming(command, console_echo if stream else None, cwd=self.project_root, shell=shell)
         except Exception as e:
             print(f"{Colors.RED}❌ Command failed: {e}{Colors.NC}")
             return subprocess.CompletedProcess(command, 1, "", str(e))
@@ -61,6 +53,7 @@ class GitVersionControl:
         print(result.stdout.strip())
         return True
 
+    @span("create_structured_commits")
     def create_structured_commits(self):
         """Create structured commits based on file categories"""
         self.print_status("\n📝 Creating structured commits...", Colors.BLUE)
@@ -116,6 +109,7 @@ class GitVersionControl:
                  self.print_status("❌ Failed to create final commit.", Colors.RED)
                  print(final_commit_result.stderr)
 
+    @span("create_tag")
     def create_tag(self):
         """Create and push a git tag"""
         tag = f"v{self.version}"
@@ -168,6 +162,7 @@ class GitHubReleaseCreator:
             print("💡 Run: gh auth login")
             return False
 
+    @span("create_release")
     def create_release(self):
         """Create a new GitHub release"""
         if not self.check_gh_cli() or not self.check_gh_auth():
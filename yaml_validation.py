@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+==================================
+Incremental YAML Validation
+Content-hash cached, parallel YAML syntax checks
+==================================
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+try:
+    import yaml
+    HAS_YAML = True
+    # libyaml-based loader when PyYAML was built with it
+    SAFE_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+except ImportError:
+    HAS_YAML = False
+
+YAML_EXTENSIONS = (".yml", ".yaml")
+# Directories never searched (hidden ones, e.g. .git, are skipped too)
+IGNORED_DIRS = {"node_modules", "venv", "__pycache__"}
+CACHE_FILE = ".yaml-validation-cache.json"
+CACHE_VERSION = 2
+# mtimes this close to the time a file was checked are not trusted
+# (the file may have changed again within the timestamp granularity)
+MTIME_GRACE_NS = 2_000_000_000
+# Below this many files to parse, a process pool costs more than it saves
+PARALLEL_THRESHOLD = 16
+
+
+class YamlResult(NamedTuple):
+    path: str
+    error: Optional[str]
+    cached: bool
+
+
+def find_yaml_files(root: str = ".") -> List[str]:
+    """YAML files under root (relative paths), pruning ignored directories"""
+    found = []
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not d.startswith(".") and d not in IGNORED_DIRS)
+        for name in sorted(files):
+            if name.endswith(YAML_EXTENSIONS) and not name.startswith("."):
+                found.append(os.path.relpath(os.path.join(directory, name), root))
+    return found
+
+
+def changed_yaml_files(root: str = ".", staged: bool = False) -> Optional[List[str]]:
+    """YAML files changed according to git (None when git is unavailable).
+
+    With staged=True only the index is considered (pre-commit hook);
+    otherwise staged, unstaged and untracked files.
+    """
+    commands = [["git", "diff", "--name-only", "--cached", "--diff-filter=ACMR"]]
+    if not staged:
+        commands += [["git", "diff", "--name-only", "--diff-filter=ACMR"],
+                     ["git", "ls-files", "--others", "--exclude-standard"]]
+    changed = set()
+    for command in commands:
+        try:
+            result = subprocess.run(command, capture_output=True, text=True, cwd=root, check=False)
+        except FileNotFoundError:
+            return None
+        if result.returncode != 0:
+            return None
+        changed.update(line.strip() for line in result.stdout.splitlines() if line.strip())
+    return sorted(path for path in changed
+                  if path.endswith(YAML_EXTENSIONS) and os.path.exists(os.path.join(root, path)))
+
+
+def parse_yaml_file(path: str) -> Optional[str]:
+    """Parse one file; returns the error message or None when valid"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            yaml.load(f, Loader=SAFE_LOADER)
+    except Exception as e:
+        return str(e)
+    return None
+
+
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class YamlValidator:
+    """YAML syntax validation with a persistent content-hash cache.
+
+    A file whose size and mtime match the cache is not even read; one
+    whose content hash matches is not parsed again. Only the remaining
+    files are parsed, in a process pool when there are many of them.
+    """
+
+    def __init__(self, root: str = ".", cache_file: str = CACHE_FILE, workers: Optional[int] = None):
+        self.root = root
+        self.cache_path = os.path.join(root, cache_file)
+        self.workers = workers
+        self.cache: Dict[str, Dict] = {}
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        self.cache = data.get("files", {}) if data.get("version") == CACHE_VERSION else {}
+
+    def _save_cache(self):
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "files": self.cache}, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            pass
+
+    def _parse(self, paths: List[str]) -> List[Optional[str]]:
+        full_paths = [os.path.join(self.root, path) for path in paths]
+        if len(full_paths) < PARALLEL_THRESHOLD:
+            return [parse_yaml_file(path) for path in full_paths]
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(parse_yaml_file, full_paths, chunksize=8))
+
+    def validate(self, paths: Optional[Iterable[str]] = None) -> List[YamlResult]:
+        """Validate the given files (default: every YAML file under root)"""
+        self._load_cache()
+        full_scan = paths is None
+        paths = find_yaml_files(self.root) if full_scan else list(paths)
+        results: Dict[str, YamlResult] = {}
+        misses: List[str] = []
+        for path in paths:
+            try:
+                stat = os.stat(os.path.join(self.root, path))
+            except OSError as e:
+                results[path] = YamlResult(path, str(e), False)
+                continue
+            entry = self.cache.get(path)
+            if (entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size
+                    and stat.st_mtime_ns < entry["checked_ns"] - MTIME_GRACE_NS):
+                results[path] = YamlResult(path, entry["error"], True)
+                continue
+            sha256 = _sha256_file(os.path.join(self.root, path))
+            if entry and entry["sha256"] == sha256:
+                entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size, checked_ns=time.time_ns())
+                results[path] = YamlResult(path, entry["error"], True)
+                continue
+            self.cache[path] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": sha256,
+                                "checked_ns": time.time_ns(), "error": None}
+            misses.append(path)
+
+        for path, error in zip(misses, self._parse(misses)):
+            self.cache[path]["error"] = error
+            results[path] = YamlResult(path, error, False)
+
+        if full_scan:
+            # Forget files that no longer exist
+            self.cache = {path: entry for path, entry in self.cache.items() if path in results}
+        self._save_cache()
+        return [results[path] for path in paths]